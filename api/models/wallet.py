@@ -1,5 +1,22 @@
+from functools import lru_cache
+from typing import List
 from pydantic import BaseModel
+from solders.pubkey import Pubkey
 
 class WalletBody(BaseModel):
     wallet: str
 
+
+class WalletsBody(BaseModel):
+    wallets: List[str]
+
+
+# Bulk ingestion sees the same wallets again and again
+@lru_cache(maxsize=65536)
+def is_valid_pubkey(s: str) -> bool:
+    """Check if string is a valid Solana public key"""
+    try:
+        Pubkey.from_string(s)
+        return True
+    except Exception:
+        return False
@@ -2,6 +2,7 @@ from fastapi import APIRouter
 from api.routes.wallet import router as wallet_router
 from api.routes.quest import router as quest_router
 from api.routes.upload import router as upload_router
+from api.routes.metrics import router as metrics_router
 
 # Create main API router that combines all route modules
 api_router = APIRouter()
@@ -10,3 +11,4 @@ api_router = APIRouter()
 api_router.include_router(wallet_router)
 api_router.include_router(quest_router)
 api_router.include_router(upload_router)
+api_router.include_router(metrics_router)
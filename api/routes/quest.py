@@ -1,31 +1,44 @@
-from fastapi import APIRouter, Query, HTTPException
-from api.models.wallet import WalletBody
-from api.services.token_service import token_service
-from api.services.points_service import points_service
+from typing import TYPE_CHECKING
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from api.models.wallet import WalletBody, is_valid_pubkey
+from api.services import get_ingest_service, get_points_service, get_quest_service
+from api.services.quest_service import QUEST_REWARDS, today
+
+if TYPE_CHECKING:
+    from api.services.ingest_service import EventIngestService
+    from api.services.points_service import PointsService
+    from api.services.quest_service import QuestService
 
 router = APIRouter(prefix="/quest", tags=["quest"])
 
 @router.post("/complete")
-def quest_complete(body: WalletBody, quest_type: str = Query(..., description="Type of quest completed")):
+def quest_complete(
+    body: WalletBody,
+    quest_type: str = Query(..., description="Type of quest completed"),
+    points_service: "PointsService" = Depends(get_points_service),
+    quest_service: "QuestService" = Depends(get_quest_service),
+):
     """Award points for completing different types of quests"""
     w = body.wallet
-    if not token_service.is_valid_pubkey(w):
+    if not is_valid_pubkey(w):
         raise HTTPException(400, "Invalid wallet")
     
-    # Define point rewards for different quest types
-    quest_rewards = {
-        "daily": 10,
-        "upload": 50,
-        "social": 25,
-        "referral": 100,
-        "profile": 30
-    }
-    
-    if quest_type not in quest_rewards:
+    if quest_type not in QUEST_REWARDS:
         raise HTTPException(400, "Invalid quest type")
     
-    reward_points = quest_rewards[quest_type]
-    total_points = points_service.add_points(w, reward_points)
+    # Each quest type pays out once per wallet per UTC day
+    day = today()
+    if not quest_service.complete(w, quest_type, day):
+        raise HTTPException(409, "Quest already completed today")
+    
+    reward_points = QUEST_REWARDS[quest_type]
+    try:
+        total_points = points_service.add_points(w, reward_points)
+    except Exception:
+        # Nothing was awarded: free the day's slot so the quest can be completed again
+        quest_service.revert_many([(w, quest_type)], day)
+        raise
     
     return {
         "ok": True, 
@@ -34,3 +47,34 @@ def quest_complete(body: WalletBody, quest_type: str = Query(..., description="T
         "total_points": total_points
     }
 
+
+@router.get("/history")
+def quest_history(
+    wallet: str = Query(..., description="User devnet public key"),
+    days: int = Query(7, ge=1, le=90),
+    quest_service: "QuestService" = Depends(get_quest_service),
+):
+    """Get the quests a wallet completed per day"""
+    return quest_service.get_history(wallet, days)
+
+
+# The body is read as a stream; describe it for /docs
+NDJSON_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/x-ndjson": {
+                "schema": {"type": "string", "example": '{"wallet": "<pubkey>", "quest_type": "daily"}\n{"wallet": "<pubkey>", "quest_type": "checkin"}'},
+            }
+        },
+    }
+}
+
+@router.post("/events", openapi_extra=NDJSON_BODY)
+async def ingest_events(request: Request, ingest_service: "EventIngestService" = Depends(get_ingest_service)):
+    """Apply a batch of quest completions and check-ins (quest_type "checkin"), one JSON event per line.
+
+    Streams back one NDJSON result per line, then a summary line.
+    """
+    statuses, summary = await ingest_service.ingest(request.stream())
+    return StreamingResponse(ingest_service.results(statuses, summary), media_type="application/x-ndjson")
@@ -1,62 +1,116 @@
-from fastapi import APIRouter, Query, HTTPException
-from api.models.wallet import WalletBody
-from api.services.token_service import token_service
-from api.services.points_service import points_service
+from typing import TYPE_CHECKING
+from fastapi import APIRouter, Depends, Query, HTTPException
+from api.models.wallet import WalletBody, WalletsBody, is_valid_pubkey
+from api.services import get_claim_service, get_points_service, get_token_service
+from api.services.quest_service import CHECKIN_REWARD
+
+if TYPE_CHECKING:
+    from api.services.claim_service import ClaimService
+    from api.services.points_service import PointsService
+    from api.services.token_service import TokenService
 
 router = APIRouter(prefix="/wallet", tags=["wallet"])
 
+async def claim_service_dependency():
+    """The claim service, or 503 in a worker that could not take a claim outbox slot"""
+    try:
+        return await get_claim_service()
+    except RuntimeError as e:
+        raise HTTPException(503, str(e))
+
 @router.get("/eligible")
-def eligible(wallet: str = Query(..., description="User devnet public key")):
+async def eligible(wallet: str = Query(..., description="User devnet public key"), points_service: "PointsService" = Depends(get_points_service)):
     """Get points for a wallet"""
     return {"wallet": wallet, "points": points_service.get_points(wallet)}
 
+@router.get("/leaderboard")
+async def leaderboard(limit: int = Query(10, ge=1, le=100), offset: int = Query(0, ge=0), points_service: "PointsService" = Depends(get_points_service)):
+    """Get the top wallets by points"""
+    return points_service.get_leaderboard(limit, offset)
+
+@router.get("/rank")
+async def rank(wallet: str = Query(..., description="User devnet public key"), points_service: "PointsService" = Depends(get_points_service)):
+    """Get a wallet's leaderboard rank"""
+    result = points_service.get_rank(wallet)
+    if result is None:
+        raise HTTPException(404, "Wallet has no points")
+    return result
+
 @router.get("/balance")
-def get_balance(wallet: str = Query(..., description="User devnet public key")):
+async def get_balance(wallet: str = Query(..., description="User devnet public key"), token_service: "TokenService" = Depends(get_token_service)):
     """Get token balance for a wallet"""
-    return token_service.get_token_balance(wallet)
+    return await token_service.get_token_balance(wallet)
+
+@router.post("/balances")
+async def get_balances(body: WalletsBody, token_service: "TokenService" = Depends(get_token_service)):
+    """Get token balances for many wallets"""
+    return await token_service.get_token_balances(body.wallets)
+
+@router.get("/balance-cache")
+async def get_balance_cache_stats(token_service: "TokenService" = Depends(get_token_service)):
+    """Get balance cache hit/miss counters"""
+    return token_service.get_balance_cache_stats()
+
+@router.get("/rpc")
+async def get_rpc_stats(token_service: "TokenService" = Depends(get_token_service)):
+    """Get RPC endpoint latency and error statistics"""
+    return token_service.get_rpc_stats()
 
 @router.get("/treasury")
-def get_treasury_info():
+async def get_treasury_info(token_service: "TokenService" = Depends(get_token_service)):
     """Get treasury wallet information"""
-    return token_service.get_treasury_info()
+    return await token_service.get_treasury_info()
+
+@router.get("/tx/{signature}")
+async def get_transaction_status(signature: str, token_service: "TokenService" = Depends(get_token_service)):
+    """Get confirmation status of a payout transaction"""
+    return token_service.get_transaction_status(signature)
 
 @router.post("/checkin")
-def checkin(body: WalletBody):
+async def checkin(body: WalletBody, points_service: "PointsService" = Depends(get_points_service)):
     """Check in and earn points"""
     w = body.wallet
-    if not token_service.is_valid_pubkey(w):
+    if not is_valid_pubkey(w):
         raise HTTPException(400, "Invalid wallet")
     
     # Toggle: check-in ko instant reward banana ho to True karo
     INSTANT_CHECKIN = False
     
     if INSTANT_CHECKIN:
-        sig = token_service.transfer_tokens_now(w, 10)
+        sig = await (await get_token_service()).transfer_tokens_now(w, 10)
         return {"ok": True, "mode": "instant", "tx": sig, "reward": 10}
     
     # batched: just accumulate
-    new_points = points_service.add_points(w, 10)
+    new_points = points_service.add_points(w, CHECKIN_REWARD)
     return {"ok": True, "mode": "batched", "points": new_points}
 
 @router.post("/claim")
-def claim(body: WalletBody):
+async def claim(body: WalletBody, claim_service: "ClaimService" = Depends(claim_service_dependency)):
     """Claim accumulated points as tokens"""
     w = body.wallet
-    if not token_service.is_valid_pubkey(w):
+    if not is_valid_pubkey(w):
         raise HTTPException(400, "Invalid wallet")
     
-    amt = points_service.claim_points(w)
-    if amt <= 0:
-        raise HTTPException(400, "Nothing to claim")
-    
-    sig = token_service.transfer_tokens_now(w, amt)
-    return {"ok": True, "tx": sig, "amount_tokens": amt}
+    # Points are moved into the outbox; paid out in the background, poll
+    # /wallet/claim/{claim_id} for the transaction
+    claim, amt = await claim_service.claim(w)
+    return {"ok": True, "claim_id": claim["id"], "status": claim["status"], "amount_tokens": amt}
+
+@router.get("/claim/{claim_id}")
+async def get_claim(claim_id: str, claim_service: "ClaimService" = Depends(claim_service_dependency)):
+    """Get payout status of a claim"""
+    return claim_service.get_claim(claim_id)
+
+@router.get("/claims")
+async def get_claim_stats(claim_service: "ClaimService" = Depends(claim_service_dependency)):
+    """Get claim outbox counters"""
+    return claim_service.stats()
 
 @router.post("/reset-points")
-def reset_points(body: WalletBody):
+async def reset_points(body: WalletBody, points_service: "PointsService" = Depends(get_points_service)):
     """Reset points for a specific wallet"""
     w = body.wallet
-    if not token_service.is_valid_pubkey(w):
+    if not is_valid_pubkey(w):
         raise HTTPException(400, "Invalid wallet")
     
     points_service.reset_points(w)
@@ -1,2 +1,105 @@
 # Services package
+"""Service singletons, built on first use and injected into routes with ``Depends``.
 
+No service module is imported until its getter is first called, so importing
+the app stays cheap and services read their configuration after
+``load_dotenv()`` has run.
+"""
+import asyncio
+import threading
+from typing import Callable, Generic, Optional, TypeVar
+from instrumentation import log
+
+T = TypeVar("T")
+# Getters call each other (claims need tokens and points), so the lock is reentrant
+_lock = threading.RLock()
+
+
+class LazyService(Generic[T]):
+    """One shared instance of ``factory()``, built on first use.
+
+    Awaiting the object (as a FastAPI dependency) builds it in a worker
+    thread so the event loop keeps serving; ``get`` builds it in place.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self.factory = factory
+        self.instance: Optional[T] = None
+
+    def get(self) -> T:
+        if self.instance is None:
+            with _lock:
+                if self.instance is None:
+                    self.instance = self.factory()
+        return self.instance
+
+    async def __call__(self) -> T:
+        if self.instance is None:
+            await asyncio.to_thread(self.get)
+        return self.instance
+
+
+def _points_service():
+    from api.services.points_service import PointsService
+    return PointsService()
+
+
+def _token_service():
+    from api.services.token_service import TokenService
+    return TokenService()
+
+
+def _claim_service():
+    from api.services.claim_service import ClaimService
+    return ClaimService(get_token_service.get(), get_points_service.get())
+
+
+def _quest_service():
+    from api.services.quest_service import QuestService
+    return QuestService()
+
+
+def _upload_service():
+    from api.services.upload_service import UploadService
+    return UploadService()
+
+
+def _ingest_service():
+    from api.services.ingest_service import EventIngestService
+    return EventIngestService(get_points_service.get(), get_quest_service.get())
+
+
+get_points_service = LazyService(_points_service)
+get_token_service = LazyService(_token_service)
+get_claim_service = LazyService(_claim_service)
+get_quest_service = LazyService(_quest_service)
+get_upload_service = LazyService(_upload_service)
+get_ingest_service = LazyService(_ingest_service)
+
+
+async def start_payouts(warm_up: bool = False) -> None:
+    """Resume claims left in the outbox and start treasury upkeep; with ``warm_up``, prefetch RPC state too."""
+    try:
+        token_service = await get_token_service()
+        # Reconcile and rebalance treasury ledgers on a timer, not only when paying
+        token_service.treasuries.start()
+        claim_service = await get_claim_service()
+        claim_service.start()
+        if warm_up:
+            await token_service.warm_up()
+    except Exception as e:
+        log.error("startup_failed", error=str(e))
+
+
+async def close() -> None:
+    """Shut down the services that were built, dependents first."""
+    if get_claim_service.instance is not None:
+        await get_claim_service.instance.close()
+    if get_token_service.instance is not None:
+        await get_token_service.instance.close()
+    if get_upload_service.instance is not None:
+        await get_upload_service.instance.close()
+    if get_quest_service.instance is not None:
+        get_quest_service.instance.close()
+    if get_points_service.instance is not None:
+        get_points_service.instance.close()
@@ -0,0 +1,421 @@
+import os
+import re
+import json
+import time
+import uuid
+import random
+import asyncio
+import functools
+from collections import ChainMap, OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from fastapi import HTTPException
+from instrumentation import log, register_collector
+from api.services.points_store import WriteAheadLog, lock_single_owner, replay_log
+
+# Claim states; sent (transaction confirmed) and failed are terminal
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+# Outbox slots a worker tries before giving up on owning one
+MAX_OUTBOX_SLOTS = 256
+
+
+def outbox_path(path: str, slot: int) -> str:
+    """File of outbox ``slot``: ``path`` itself for slot 0, ``claims.<slot>.log`` beside it otherwise."""
+    if slot == 0:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{slot}{ext}"
+
+
+def outbox_paths(path: str) -> List[str]:
+    """Every existing outbox slot file of ``path``."""
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory or "."):
+        return []
+    root, ext = os.path.splitext(os.path.basename(path))
+    pattern = re.compile(re.escape(root) + r"(\.\d+)?" + re.escape(ext))
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory or ".") if pattern.fullmatch(name))
+
+
+class ClaimOutbox:
+    """Persistent log of claims awaiting payout.
+
+    Every state change appends the full claim record as a JSON line through a
+    group-committed ``WriteAheadLog``; on startup the latest record per claim
+    wins. Claims interrupted before their transaction was signed are pending
+    again after a restart; signed ones stay sending with their signature. The
+    file is rewritten with only live and recent claims once it grows past
+    twice their number. All methods must be called from the event loop thread.
+
+    Only one process may own the outbox: another one replaying the same file
+    would pay its claims again, and compaction would drop its appends. An
+    exclusive lock on ``<path>.lock`` is held until ``close``.
+    """
+
+    def __init__(self, path: str, keep_done: int = 10000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock_file = lock_single_owner(path, f"Claim outbox {path} is owned by another process; claims are paid out by a single worker")
+        self.keep_done = keep_done
+        self.claims: Dict[str, dict] = {}
+        self._done: "OrderedDict[str, None]" = OrderedDict()
+        self._open_by_wallet: Dict[str, str] = {}
+        self._lines = 0
+        if os.path.exists(path):
+            self._replay()
+        self.wal = WriteAheadLog(path)
+
+    def pending(self) -> List[dict]:
+        return [c for c in self.claims.values() if c["status"] == PENDING]
+
+    def signed(self) -> List[dict]:
+        """Claims whose transaction was signed and may have been sent."""
+        return [c for c in self.claims.values() if c["status"] == SENDING and c.get("tx")]
+
+    def open_claim(self, wallet: str) -> Optional[dict]:
+        """The wallet's claim that has not started sending yet, if any."""
+        claim_id = self._open_by_wallet.get(wallet)
+        return self.claims[claim_id] if claim_id is not None else None
+
+    def write(self, claim: dict) -> tuple:
+        """Record ``claim``'s current state; returns ``(wal, lsn)`` to wait on for durability."""
+        self._apply(claim)
+        wal = self.wal
+        lsn = wal.append(json.dumps(claim, separators=(",", ":")) + "\n")
+        self._lines += 1
+        if self._lines > 2 * max(len(self.claims), 1000):
+            self._compact()
+        return wal, lsn
+
+    def close(self) -> None:
+        self.wal.close()
+        # Closing the file releases the lock
+        self._lock_file.close()
+
+    def _apply(self, claim: dict) -> None:
+        claim_id, wallet = claim["id"], claim["wallet"]
+        self.claims[claim_id] = claim
+        if claim["status"] == PENDING:
+            self._open_by_wallet[wallet] = claim_id
+        elif self._open_by_wallet.get(wallet) == claim_id:
+            del self._open_by_wallet[wallet]
+        if claim["status"] in (SENT, FAILED):
+            self._done[claim_id] = None
+            while len(self._done) > self.keep_done:
+                old, _ = self._done.popitem(last=False)
+                self.claims.pop(old, None)
+
+    def _replay(self) -> None:
+        def apply(line: bytes) -> None:
+            claim = json.loads(line)
+            if claim["status"] == SENDING and not claim.get("tx"):
+                # Never signed, so never sent
+                claim["status"] = PENDING
+            self._apply(claim)
+
+        self._lines += replay_log(self.path, apply)
+
+    def _compact(self) -> None:
+        self.wal.close()
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            f.write("".join(json.dumps(c, separators=(",", ":")) + "\n" for c in self.claims.values()))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.path + ".tmp", self.path)
+        self._lines = len(self.claims)
+        self.wal = WriteAheadLog(self.path)
+
+
+class ClaimOutboxes:
+    """The claim outboxes owned by this worker process.
+
+    Each ``uvicorn --workers N`` process pays out its own claims: it takes
+    the first outbox slot of ``path`` (``claims.log``, ``claims.1.log``, ...)
+    that no other process holds and records new claims there. A slot nobody
+    holds was left by a worker that is gone; if it has unfinished claims it
+    is adopted, so they resume in whichever worker starts next. A claim stays
+    in the file it was created in. Same interface as ``ClaimOutbox``.
+    """
+
+    def __init__(self, path: str, keep_done: int = 10000):
+        self.path = path
+        self.own = self._take_slot(path, keep_done)
+        self.outboxes = [self.own]
+        for other in outbox_paths(path):
+            if other == self.own.path:
+                continue
+            try:
+                outbox = ClaimOutbox(other, keep_done)
+            except RuntimeError:
+                # Owned by a live worker
+                continue
+            if outbox.pending() or outbox.signed():
+                self.outboxes.append(outbox)
+            else:
+                outbox.close()
+        self.claims = ChainMap(*(outbox.claims for outbox in self.outboxes))
+
+    def pending(self) -> List[dict]:
+        return [claim for outbox in self.outboxes for claim in outbox.pending()]
+
+    def signed(self) -> List[dict]:
+        return [claim for outbox in self.outboxes for claim in outbox.signed()]
+
+    def open_claim(self, wallet: str) -> Optional[dict]:
+        for outbox in self.outboxes:
+            claim = outbox.open_claim(wallet)
+            if claim is not None:
+                return claim
+        return None
+
+    def write(self, claim: dict) -> tuple:
+        """Record ``claim`` in the outbox holding it, new claims in this worker's own slot."""
+        for outbox in self.outboxes:
+            if claim["id"] in outbox.claims:
+                return outbox.write(claim)
+        return self.own.write(claim)
+
+    def find(self, claim_id: str) -> Optional[dict]:
+        """Latest state of a claim owned by this or any other worker."""
+        claim = self.claims.get(claim_id)
+        if claim is not None:
+            return claim
+        owned = {outbox.path for outbox in self.outboxes}
+        for path in outbox_paths(self.path):
+            if path in owned:
+                continue
+            try:
+                with open(path, "rb") as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # A torn tail being written by its owner
+                            break
+                        if record["id"] == claim_id:
+                            claim = record
+            except FileNotFoundError:
+                continue
+            if claim is not None:
+                return claim
+        return None
+
+    def close(self) -> None:
+        for outbox in self.outboxes:
+            outbox.close()
+
+    @staticmethod
+    def _take_slot(path: str, keep_done: int) -> ClaimOutbox:
+        for slot in range(MAX_OUTBOX_SLOTS):
+            try:
+                return ClaimOutbox(outbox_path(path, slot), keep_done)
+            except RuntimeError:
+                continue
+        raise RuntimeError(f"All {MAX_OUTBOX_SLOTS} claim outbox slots of {path} are owned by other processes")
+
+
+class ClaimService:
+    """Pays out claims from the outbox with a pool of async workers.
+
+    ``claim`` durably records the claim and returns at once; workers settle
+    it through the token service. Failed payouts are retried with capped
+    exponential backoff and full jitter; after ``max_attempts`` (or on a
+    client error) the claim fails and its points are returned to the wallet.
+    A new claim for a wallet whose previous claim has not started sending is
+    merged into it.
+
+    A claim's signature and last valid block height are made durable before
+    its transaction is sent. The claim then stays sending until the
+    confirmation tracker settles that transaction, even if the send failed
+    or the process restarted in between: it is sent once the transaction
+    confirms, fails with its points refunded if the transaction fails, and
+    is retried, signing anew, only once the transaction provably expired.
+    """
+
+    def __init__(self, token_service, points_service):
+        self.token_service = token_service
+        self.points_service = points_service
+        self.outbox = ClaimOutboxes(
+            os.getenv("CLAIM_OUTBOX_PATH", os.path.join(os.getenv("POINTS_DATA_DIR", "data"), "claims.log")),
+        )
+        # A worker waits on its claim's whole flush; by default keep two settlement
+        # batches' worth in flight so each flush fills up instead of waiting out the window
+        self.workers = int(os.getenv("CLAIM_WORKERS") or 2 * token_service.settlement.max_batch)
+        self.max_attempts = int(os.getenv("CLAIM_MAX_ATTEMPTS", "8"))
+        self.retry_base = int(os.getenv("CLAIM_RETRY_BASE_MS", "1000")) / 1000
+        self.retry_max = int(os.getenv("CLAIM_RETRY_MAX_MS", "60000")) / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._following: Set[asyncio.Task] = set()
+        register_collector(self.metric_lines)
+
+    def start(self) -> None:
+        """Start the worker pool and queue claims left pending by a previous run."""
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+        for claim in self.outbox.pending():
+            self._schedule(claim)
+        for claim in self.outbox.signed():
+            self._follow(claim)
+
+    async def close(self) -> None:
+        for timer in self._timers.values():
+            timer.cancel()
+        for task in self._tasks + list(self._following):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._following, return_exceptions=True)
+        self._tasks = []
+        self.outbox.close()
+
+    async def claim(self, wallet: str) -> Tuple[dict, int]:
+        """Turn all of ``wallet``'s points into a claim; returns the claim and the points taken.
+
+        The points are taken and the claim is appended to the outbox in one
+        step on the event loop, before waiting for either log to be fsynced.
+        If the claim cannot be recorded the points are given back.
+        """
+        self.start()
+        amount = self.points_service.claim_points(wallet, wait=False)
+        if amount <= 0:
+            raise HTTPException(400, "Nothing to claim")
+        try:
+            claim, wal, lsn = self._record(wallet, amount)
+        except Exception:
+            self.points_service.add_points(wallet, amount)
+            raise
+        await asyncio.gather(
+            asyncio.to_thread(self.points_service.wait_durable),
+            asyncio.to_thread(wal.wait_durable, lsn),
+        )
+        return claim, amount
+
+    def _record(self, wallet: str, whole_tokens: int) -> Tuple[dict, WriteAheadLog, int]:
+        """Append a claim for ``wallet`` to the outbox, merging into its open claim; returns it with ``(wal, lsn)``."""
+        claim = self.outbox.open_claim(wallet)
+        if claim is not None:
+            # Not sent yet: pay both amounts in one transfer
+            claim = dict(claim, amount=claim["amount"] + whole_tokens)
+            wal, lsn = self.outbox.write(claim)
+        else:
+            claim = {
+                "id": uuid.uuid4().hex,
+                "wallet": wallet,
+                "amount": whole_tokens,
+                "status": PENDING,
+                "attempts": 0,
+                "next_attempt_at": time.time(),
+                "tx": None,
+                "last_valid_block_height": None,
+                "error": None,
+                "created_at": time.time(),
+            }
+            wal, lsn = self.outbox.write(claim)
+            self._schedule(claim)
+        return claim, wal, lsn
+
+    def get_claim(self, claim_id: str) -> dict:
+        """Get a claim's payout state, with its transaction status once sent"""
+        claim = self.outbox.find(claim_id)
+        if claim is None:
+            raise HTTPException(404, "Unknown claim")
+        result = dict(claim)
+        if claim["tx"]:
+            result["tx_status"] = self.token_service.token_manager.confirmations.status(claim["tx"])
+        return result
+
+    def stats(self) -> dict:
+        counts: Dict[str, int] = {}
+        for claim in self.outbox.claims.values():
+            counts[claim["status"]] = counts.get(claim["status"], 0) + 1
+        return {"workers": self.workers, "queued": self._queue.qsize() if self._queue else 0, "claims": counts}
+
+    def metric_lines(self) -> List[str]:
+        stats = self.stats()
+        lines = ["# TYPE claims gauge"]
+        lines += [f'claims{{status="{status}"}} {count}' for status, count in sorted(stats["claims"].items())]
+        lines += ["# TYPE claims_queued gauge", f"claims_queued {stats['queued']}"]
+        return lines
+
+    def _schedule(self, claim: dict) -> None:
+        delay = claim["next_attempt_at"] - time.time()
+        if delay <= 0:
+            self._queue.put_nowait(claim["id"])
+            return
+        self._timers[claim["id"]] = asyncio.get_running_loop().call_later(delay, self._enqueue_due, claim["id"])
+
+    def _enqueue_due(self, claim_id: str) -> None:
+        self._timers.pop(claim_id, None)
+        self._queue.put_nowait(claim_id)
+
+    async def _work(self) -> None:
+        while True:
+            claim_id = await self._queue.get()
+            claim = self.outbox.claims.get(claim_id)
+            if claim is None or claim["status"] != PENDING:
+                continue
+            claim = dict(claim, status=SENDING, attempts=claim["attempts"] + 1)
+            self.outbox.write(claim)
+            try:
+                await self.token_service.settle_claim(claim["wallet"], claim["amount"], functools.partial(self._record_signature, claim))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                signed = self.outbox.claims.get(claim["id"])
+                if signed is None or not signed.get("tx"):
+                    self._retry_or_fail(claim, e)
+                    continue
+                # The node may have received it anyway; signing again could pay twice
+                log.warning("claim_send_uncertain", claim_id=claim["id"], tx=signed["tx"], error=str(e))
+            self._follow(self.outbox.claims[claim["id"]])
+
+    async def _record_signature(self, claim: dict, signature: str, last_valid_block_height: int) -> None:
+        """Make ``claim``'s transaction signature durable before the transaction is sent."""
+        wal, lsn = self.outbox.write(dict(claim, tx=signature, last_valid_block_height=last_valid_block_height))
+        await asyncio.to_thread(wal.wait_durable, lsn)
+
+    def _follow(self, claim: dict) -> None:
+        confirmations = self.token_service.token_manager.confirmations
+        if confirmations.status(claim["tx"]) is None:
+            # Signed before a restart: the raw transaction is gone, so only watch for it
+            confirmations.track(claim["tx"], None, claim["last_valid_block_height"], None, None)
+        task = asyncio.get_running_loop().create_task(self._await_transaction(claim))
+        self._following.add(task)
+        task.add_done_callback(self._following.discard)
+
+    async def _await_transaction(self, claim: dict) -> None:
+        """Finish a signed claim once its transaction is confirmed, failed or expired."""
+        record = await self.token_service.token_manager.confirmations.settled(claim["tx"])
+        if record["status"] == "confirmed":
+            self.outbox.write(dict(claim, status=SENT, error=None))
+        elif record["status"] == "failed":
+            self._fail(claim, f"Transaction {claim['tx']} failed: {record['err']}")
+        else:
+            # Past its last valid block height and in neither the status cache nor the
+            # transaction history: it can no longer land, so signing again is safe
+            self._retry_or_fail(dict(claim, tx=None, last_valid_block_height=None), Exception(f"Transaction {claim['tx']} expired"))
+
+    def _fail(self, claim: dict, message: str) -> None:
+        self.outbox.write(dict(claim, status=FAILED, error=message))
+        # Give the points back so the wallet can claim again
+        self.points_service.add_points(claim["wallet"], claim["amount"])
+        log.error("claim_failed", claim_id=claim["id"], wallet=claim["wallet"], attempts=claim["attempts"], error=message)
+
+    def _retry_or_fail(self, claim: dict, error: Exception) -> None:
+        message = error.detail if isinstance(error, HTTPException) else str(error)
+        permanent = isinstance(error, HTTPException) and error.status_code < 500
+        if permanent or claim["attempts"] >= self.max_attempts:
+            self._fail(claim, message)
+            return
+        delay = random.uniform(0, min(self.retry_max, self.retry_base * 2 ** (claim["attempts"] - 1)))
+        claim = dict(claim, status=PENDING, next_attempt_at=time.time() + delay, error=message)
+        self.outbox.write(claim)
+        self._schedule(claim)
+        log.warning("claim_retry", claim_id=claim["id"], attempts=claim["attempts"], delay_seconds=round(delay, 3), error=message)
@@ -0,0 +1,127 @@
+import os
+import json
+from typing import AsyncIterator, Dict, Iterator, List, Tuple
+from fastapi import HTTPException
+from api.models.wallet import is_valid_pubkey
+from api.services.quest_service import CHECKIN_REWARD, QUEST_REWARDS, today
+
+# Event types accepted in a batch; a line's status byte is its type's index when accepted
+EVENT_TYPES = ["checkin"] + list(QUEST_REWARDS)
+EVENT_REWARDS = [CHECKIN_REWARD] + list(QUEST_REWARDS.values())
+# Status bytes of rejected lines
+INVALID_JSON = 250
+INVALID_WALLET = 251
+INVALID_TYPE = 252
+ALREADY_COMPLETED = 253
+BLANK = 255
+ERRORS = {
+    INVALID_JSON: "Invalid JSON",
+    INVALID_WALLET: "Invalid wallet",
+    INVALID_TYPE: "Invalid quest type",
+    ALREADY_COMPLETED: "Quest already completed today",
+}
+# Result lines per response chunk
+RESULT_CHUNK = 1000
+# Longest event line buffered while waiting for its newline
+MAX_LINE_BYTES = 4096
+
+
+class EventIngestService:
+    """Applies batches of check-in and quest events from NDJSON bodies.
+
+    Lines are parsed as the body streams in; each keeps one status byte and
+    accepted check-ins are summed per wallet on the way. Quest completions
+    then go through the per-day caps in one call, and all rewards are applied
+    with a single bulk points update, so a batch that fails part-way (too
+    many events, client gone) awards nothing. If the points update itself
+    fails, the quest completions are reverted so a retry is not capped.
+    Per-line results are rendered from the status bytes afterwards.
+    """
+
+    def __init__(self, points_service, quest_service):
+        self.points_service = points_service
+        self.quest_service = quest_service
+        self.max_events = int(os.getenv("MAX_BATCH_EVENTS", "1000000"))
+        self._types = {event: i for i, event in enumerate(EVENT_TYPES)}
+
+    async def ingest(self, chunks: AsyncIterator[bytes]) -> Tuple[bytearray, dict]:
+        """Apply every event in the NDJSON stream; returns per-line status bytes and a summary."""
+        statuses = bytearray()
+        rewards: Dict[str, int] = {}
+        quests: List[Tuple[str, str]] = []
+        quest_lines: List[int] = []
+        tail = b""
+        async for chunk in chunks:
+            lines = (tail + chunk).split(b"\n")
+            tail = lines.pop()
+            if len(tail) > MAX_LINE_BYTES:
+                raise HTTPException(400, f"Event line {len(statuses) + len(lines) + 1} longer than {MAX_LINE_BYTES} bytes")
+            self._parse(lines, statuses, rewards, quests, quest_lines)
+        if tail.strip():
+            self._parse([tail], statuses, rewards, quests, quest_lines)
+
+        # Quests are capped per wallet and day, in line order
+        day = today()
+        recorded = self.quest_service.complete_many(quests, day)
+        for (wallet, quest), line, ok in zip(quests, quest_lines, recorded):
+            if ok:
+                rewards[wallet] = rewards.get(wallet, 0) + QUEST_REWARDS[quest]
+            else:
+                statuses[line] = ALREADY_COMPLETED
+        try:
+            self.points_service.add_points_many(rewards)
+        except Exception:
+            # Nothing was awarded: free the cap slots so the batch can be sent again
+            self.quest_service.revert_many([q for q, ok in zip(quests, recorded) if ok], day)
+            raise
+
+        accepted = sum(statuses.count(i) for i in range(len(EVENT_TYPES)))
+        return statuses, {
+            "done": True,
+            "accepted": accepted,
+            "rejected": len(statuses) - accepted - statuses.count(BLANK),
+            "wallets": len(rewards),
+            "points_awarded": sum(rewards.values()),
+        }
+
+    def results(self, statuses: bytearray, summary: dict) -> Iterator[bytes]:
+        """NDJSON result per non-blank line (numbered from 1), then the summary line."""
+        rendered = {
+            i: f'"ok":true,"event":"{event}","points":{reward}}}'
+            for i, (event, reward) in enumerate(zip(EVENT_TYPES, EVENT_REWARDS))
+        }
+        rendered.update({code: f'"ok":false,"error":"{error}"}}' for code, error in ERRORS.items()})
+        for start in range(0, len(statuses), RESULT_CHUNK):
+            yield "".join(
+                f'{{"line":{start + i + 1},{rendered[code]}\n'
+                for i, code in enumerate(statuses[start:start + RESULT_CHUNK]) if code != BLANK
+            ).encode()
+        yield (json.dumps(summary) + "\n").encode()
+
+    def _parse(self, lines: List[bytes], statuses: bytearray, rewards: Dict[str, int], quests: list, quest_lines: list) -> None:
+        types = self._types
+        for line in lines:
+            if len(statuses) >= self.max_events:
+                raise HTTPException(413, f"At most {self.max_events} events per batch")
+            if not line.strip():
+                statuses.append(BLANK)
+                continue
+            try:
+                event = json.loads(line)
+                wallet, event_type = event.get("wallet"), event.get("quest_type")
+            except (ValueError, AttributeError):
+                statuses.append(INVALID_JSON)
+                continue
+            if not isinstance(wallet, str) or not is_valid_pubkey(wallet):
+                statuses.append(INVALID_WALLET)
+                continue
+            index = types.get(event_type) if isinstance(event_type, str) else None
+            if index is None:
+                statuses.append(INVALID_TYPE)
+                continue
+            if index == 0:
+                rewards[wallet] = rewards.get(wallet, 0) + CHECKIN_REWARD
+            else:
+                quests.append((wallet, event_type))
+                quest_lines.append(len(statuses))
+            statuses.append(index)
@@ -0,0 +1,82 @@
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sortedcontainers import SortedList
+
+
+class Leaderboard:
+    """Order-statistics index of wallets by points.
+
+    Entries are kept in a ``SortedList`` of ``(-points, wallet)`` so the top
+    of the board comes first and ties break by wallet. Updates, top-N slices
+    and rank lookups are all O(log n). Wallets with 0 points are not ranked.
+    """
+
+    def __init__(self, items: Iterable[Tuple[str, int]] = ()):
+        self._lock = threading.Lock()
+        self._points: Dict[str, int] = {}
+        self._sorted = SortedList()
+        # Wallets synced while a rebuild is reading its items; None when none is running
+        self._touched: Optional[Set[str]] = None
+        self.rebuild(lambda: items)
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def sync(self, wallets: Iterable[str], read: Callable[[str], int]) -> None:
+        """Set each of ``wallets``' scores to ``read(wallet)``, read under the index lock.
+
+        Callers sync after every change to the points store, so whichever
+        sync runs last sees the latest total even when concurrent changes
+        and their syncs interleave.
+        """
+        with self._lock:
+            for wallet in wallets:
+                self._set(wallet, read(wallet))
+                if self._touched is not None:
+                    self._touched.add(wallet)
+
+    def rebuild(self, load: Callable[[], Iterable[Tuple[str, int]]], read: Optional[Callable[[str], int]] = None) -> None:
+        """Replace the index with the ``(wallet, points)`` pairs returned by ``load()``.
+
+        Other threads may keep syncing while ``load`` reads the store; with
+        ``read`` the wallets synced from the moment it is called are read
+        again once the new index is in place, so their newer totals are not
+        lost.
+        """
+        with self._lock:
+            self._touched = set()
+        points = {wallet: p for wallet, p in load() if p > 0}
+        entries = SortedList((-p, wallet) for wallet, p in points.items())
+        with self._lock:
+            touched, self._touched = self._touched, None
+            self._points, self._sorted = points, entries
+            if read is not None:
+                for wallet in touched:
+                    self._set(wallet, read(wallet))
+
+    def top(self, limit: int = 10, offset: int = 0) -> List[dict]:
+        """Entries ranked ``offset + 1`` to ``offset + limit``; equal scores share a rank."""
+        with self._lock:
+            entries = list(self._sorted.islice(offset, offset + limit))
+            ranks = [self._sorted.bisect_left((score,)) + 1 for score, _ in entries]
+        return [
+            {"rank": rank, "wallet": wallet, "points": -score}
+            for rank, (score, wallet) in zip(ranks, entries)
+        ]
+
+    def rank(self, wallet: str) -> Optional[dict]:
+        """``wallet``'s rank and score, or None if it has no points."""
+        with self._lock:
+            points = self._points.get(wallet)
+            if points is None:
+                return None
+            rank = self._sorted.bisect_left((-points,)) + 1
+            return {"rank": rank, "wallet": wallet, "points": points, "total": len(self._points)}
+
+    def _set(self, wallet: str, points: int) -> None:
+        old = self._points.pop(wallet, 0)
+        if old > 0:
+            self._sorted.remove((-old, wallet))
+        if points > 0:
+            self._points[wallet] = points
+            self._sorted.add((-points, wallet))
@@ -1,31 +1,82 @@
-from typing import Dict
+import os
+import time
+import threading
+from typing import Dict, Optional
+from api.services.points_store import create_points_backend
+from api.services.leaderboard import Leaderboard
 
 class PointsService:
-    def __init__(self):
-        # In-memory points storage (demo)
-        self.points: Dict[str, int] = {}  # wallet -> whole tokens (not raw units)
-        # Clear all points on startup for fresh start
-        self.points.clear()
+    def __init__(self, backend=None):
+        # Pluggable storage: durable WAL-backed by default, see POINTS_BACKEND
+        self.backend = backend if backend is not None else create_points_backend()
+        # Ranked index kept in step with every mutation below: each one re-reads
+        # the wallet's total, so racing updates cannot leave a stale score
+        self.leaderboard = Leaderboard(self.backend.items())
+        self.leaderboard_refresh = int(os.getenv("LEADERBOARD_REFRESH_MS", "5000")) / 1000
+        self._leaderboard_built = time.monotonic()
+        self._rebuild_lock = threading.Lock()
+        self._rebuilding = False
     
     def get_points(self, wallet: str) -> int:
         """Get points for a wallet"""
-        return self.points.get(wallet, 0)
+        return self.backend.get(wallet)
     
     def add_points(self, wallet: str, amount: int) -> int:
         """Add points to a wallet"""
-        self.points[wallet] = self.points.get(wallet, 0) + amount
-        return self.points[wallet]
+        total = self.backend.add(wallet, amount)
+        self.leaderboard.sync([wallet], self.backend.get)
+        return total
+    
+    def add_points_many(self, amounts: Dict[str, int]) -> Dict[str, int]:
+        """Add points to many wallets in one bulk update; returns their new totals"""
+        totals = self.backend.add_many(amounts)
+        self.leaderboard.sync(totals, self.backend.get)
+        return totals
     
     def reset_points(self, wallet: str) -> None:
         """Reset points for a wallet"""
-        self.points[wallet] = 0
+        self.backend.reset(wallet)
+        self.leaderboard.sync([wallet], self.backend.get)
     
-    def claim_points(self, wallet: str) -> int:
-        """Claim all points for a wallet and reset to 0"""
-        amount = self.points.get(wallet, 0)
-        self.points[wallet] = 0
+    def claim_points(self, wallet: str, wait: bool = True) -> int:
+        """Claim all points for a wallet and reset to 0; blocks until the claim is durable unless ``wait`` is False"""
+        amount = self.backend.claim(wallet, wait)
+        self.leaderboard.sync([wallet], self.backend.get)
         return amount
-
-# Global instance
-points_service = PointsService()
-
+    
+    def wait_durable(self) -> None:
+        """Block until every points change made so far is durable"""
+        self.backend.wait_durable()
+    
+    def get_leaderboard(self, limit: int = 10, offset: int = 0) -> dict:
+        """Get the top wallets by points"""
+        self._refresh_leaderboard()
+        return {"total": len(self.leaderboard), "entries": self.leaderboard.top(limit, offset)}
+    
+    def get_rank(self, wallet: str) -> Optional[dict]:
+        """Get a wallet's leaderboard rank, or None if it has no points"""
+        self._refresh_leaderboard()
+        return self.leaderboard.rank(wallet)
+    
+    def close(self) -> None:
+        """Flush and close the storage backend"""
+        self.backend.close()
+    
+    def _refresh_leaderboard(self) -> None:
+        # Other worker processes write to a shared backend; rebuild from it periodically.
+        # Walking the whole table is slow, so it runs in the background and
+        # readers get the last built copy meanwhile
+        if not getattr(self.backend, "shared", False) or time.monotonic() - self._leaderboard_built <= self.leaderboard_refresh:
+            return
+        with self._rebuild_lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_leaderboard, name="leaderboard-rebuild", daemon=True).start()
+    
+    def _rebuild_leaderboard(self) -> None:
+        try:
+            self.leaderboard.rebuild(self.backend.items, self.backend.get)
+        finally:
+            self._leaderboard_built = time.monotonic()
+            self._rebuilding = False
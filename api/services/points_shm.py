@@ -0,0 +1,86 @@
+import struct
+from typing import Dict
+from api.services.shm_table import SharedHashTable
+
+
+class SharedMemoryPointsBackend(SharedHashTable):
+    """Points table shared by every worker process on the host.
+
+    A ``SharedHashTable`` of wallet keys to int64 counters, so workers
+    started with ``uvicorn --workers N`` see consistent totals. Like the
+    table itself, points survive worker restarts but are not fsynced per
+    update like the WAL backend.
+    """
+
+    MAGIC = b"PTS1"
+    NAME = "Points table"
+    # Slot layout: int64 value, uint8 key length, key bytes
+    SLOT_SIZE = 72
+    KEY_OFFSET = 8
+    MAX_KEY_BYTES = SLOT_SIZE - 9
+
+    # Other processes update the table too; in-process indexes must be rebuilt from items()
+    shared = True
+
+    def get(self, wallet: str) -> int:
+        found_key = self._lookup_key(wallet)
+        if found_key is None:
+            return 0
+        key, h = found_key
+        with self._locked(self._stripe(h)):
+            offset, found = self._find(key, h)
+            return struct.unpack_from("<q", self._map, offset)[0] if found else 0
+
+    def add(self, wallet: str, amount: int) -> int:
+        key, h = self._key(wallet)
+        with self._locked(self._stripe(h)):
+            offset = self._slot(key, h)
+            total = struct.unpack_from("<q", self._map, offset)[0] + amount
+            struct.pack_into("<q", self._map, offset, total)
+        return total
+
+    def reset(self, wallet: str) -> None:
+        key, h = self._key(wallet)
+        with self._locked(self._stripe(h)):
+            offset, found = self._find(key, h)
+            if found:
+                struct.pack_into("<q", self._map, offset, 0)
+
+    def claim(self, wallet: str, wait: bool = True) -> int:
+        key, h = self._key(wallet)
+        with self._locked(self._stripe(h)):
+            offset, found = self._find(key, h)
+            if not found:
+                return 0
+            amount = struct.unpack_from("<q", self._map, offset)[0]
+            struct.pack_into("<q", self._map, offset, 0)
+        return amount
+
+    def add_many(self, amounts: Dict[str, int]) -> Dict[str, int]:
+        """Add to many wallets taking each stripe lock once; returns their new totals.
+
+        Stripes are locked one at a time rather than all together so other
+        workers are not stalled for the whole batch.
+        """
+        by_stripe: Dict[int, list] = {}
+        for wallet, amount in amounts.items():
+            key, h = self._key(wallet)
+            by_stripe.setdefault(self._stripe(h), []).append((wallet, key, h, amount))
+        totals = {}
+        for stripe in sorted(by_stripe):
+            with self._locked(stripe):
+                for wallet, key, h, amount in by_stripe[stripe]:
+                    offset = self._slot(key, h)
+                    total = struct.unpack_from("<q", self._map, offset)[0] + amount
+                    struct.pack_into("<q", self._map, offset, total)
+                    totals[wallet] = total
+        return totals
+
+    def wait_durable(self) -> None:
+        # Updates live in the page cache; there is nothing to wait for
+        pass
+
+    def items(self):
+        """Snapshot of every ``(wallet, points)`` pair in the table."""
+        m = self._map
+        return [(wallet, struct.unpack_from("<q", m, offset)[0]) for wallet, offset in self._records()]
@@ -0,0 +1,396 @@
+import os
+import json
+import fcntl
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class InMemoryPointsBackend:
+    """Volatile points storage with per-wallet lock striping."""
+
+    def __init__(self, stripes: int = 64):
+        self.points: Dict[str, int] = {}  # wallet -> whole tokens (not raw units)
+        self._stripes = [threading.Lock() for _ in range(stripes)]
+
+    def lock_for(self, wallet: str) -> threading.Lock:
+        """Lock guarding read-modify-write on ``wallet``."""
+        return self._stripes[hash(wallet) % len(self._stripes)]
+
+    def get(self, wallet: str) -> int:
+        return self.points.get(wallet, 0)
+
+    def add(self, wallet: str, amount: int) -> int:
+        with self.lock_for(wallet):
+            total = self.points.get(wallet, 0) + amount
+            self.points[wallet] = total
+        return total
+
+    def reset(self, wallet: str) -> None:
+        with self.lock_for(wallet):
+            self.points[wallet] = 0
+
+    def claim(self, wallet: str, wait: bool = True) -> int:
+        with self.lock_for(wallet):
+            amount = self.points.get(wallet, 0)
+            self.points[wallet] = 0
+        return amount
+
+    def wait_durable(self) -> None:
+        """Block until every change made so far is durable."""
+
+    def add_many(self, amounts: Dict[str, int]) -> Dict[str, int]:
+        """Add to many wallets in one critical section; returns their new totals."""
+        for lock in self._stripes:
+            lock.acquire()
+        try:
+            return self._add_many(amounts)
+        finally:
+            for lock in self._stripes:
+                lock.release()
+
+    def items(self) -> List[Tuple[str, int]]:
+        """Snapshot of every ``(wallet, points)`` pair."""
+        return list(self.points.items())
+
+    def close(self) -> None:
+        pass
+
+    def _add_many(self, amounts: Dict[str, int]) -> Dict[str, int]:
+        """Apply ``amounts``; caller holds every stripe lock."""
+        points = self.points
+        totals = {}
+        for wallet, amount in amounts.items():
+            totals[wallet] = points[wallet] = points.get(wallet, 0) + amount
+        return totals
+
+
+def replay_log(path: str, apply: Callable[[bytes], None]) -> int:
+    """Pass each complete line of the append-only log at ``path`` to ``apply``; returns how many were applied.
+
+    Replay stops at the first line ``apply`` rejects with ``ValueError``.
+    That line, everything after it and a final line without its newline are
+    what a crash mid-write leaves behind: the file is truncated there so the
+    next append starts on a fresh line and is not lost on the next replay.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    applied = valid = 0
+    for line in data.split(b"\n")[:-1]:
+        try:
+            apply(line)
+        except ValueError:
+            break
+        applied += 1
+        valid += len(line) + 1
+    if valid < len(data):
+        with open(path, "r+b") as f:
+            f.truncate(valid)
+    return applied
+
+
+def lock_single_owner(path: str, error: str):
+    """Take an exclusive lock on ``<path>.lock`` so only this process uses ``path``.
+
+    Returns the lock file; closing it releases the lock. Raises
+    ``RuntimeError(error)`` if another process holds it.
+    """
+    lock_file = open(path + ".lock", "a")
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        raise RuntimeError(error)
+    return lock_file
+
+
+class WriteAheadLog:
+    """Append-only log with group commit.
+
+    ``append`` only buffers the record; a flusher thread writes everything
+    buffered since the last flush and covers it with a single fsync. Callers
+    that need durability wait on ``wait_durable`` for their log sequence number.
+    """
+
+    def __init__(self, path: str, on_flush=None):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._buffer: List[str] = []
+        # Pending rotations: (buffered records that belong to the old file, new path)
+        self._cuts: List[Tuple[int, str]] = []
+        self._appended_lsn = 0
+        self._durable_lsn = 0
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._closed = False
+        self._on_flush = on_flush
+        self._thread = threading.Thread(target=self._run, name="points-wal", daemon=True)
+        self._thread.start()
+
+    def append(self, record: str) -> int:
+        """Buffer ``record`` and return its log sequence number."""
+        with self._cond:
+            self._buffer.append(record)
+            self._appended_lsn += 1
+            self._cond.notify_all()
+            return self._appended_lsn
+
+    def append_many(self, records: List[str]) -> int:
+        """Buffer ``records`` together and return the last one's log sequence number."""
+        with self._cond:
+            self._buffer.extend(records)
+            self._appended_lsn += len(records)
+            self._cond.notify_all()
+            return self._appended_lsn
+
+    def wait_durable(self, lsn: int) -> None:
+        """Block until the record with ``lsn`` has been fsynced."""
+        with self._cond:
+            while self._durable_lsn < lsn and not self._closed:
+                self._cond.wait()
+
+    def sync(self) -> None:
+        """Block until every record appended so far has been fsynced."""
+        with self._cond:
+            lsn = self._appended_lsn
+        self.wait_durable(lsn)
+
+    def rotate(self, path: str) -> None:
+        """Continue in ``path`` after the records appended so far.
+
+        Only marks the cut; the flusher writes and fsyncs the earlier records
+        to the current file before it switches, so this never waits on disk.
+        """
+        with self._cond:
+            self._cuts.append((len(self._buffer), path))
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._io_lock:
+            self._flush()
+            self._file.close()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _flush(self) -> int:
+        """Write and fsync everything buffered; caller holds ``_io_lock``."""
+        with self._cond:
+            records, self._buffer = self._buffer, []
+            cuts, self._cuts = self._cuts, []
+            lsn = self._appended_lsn
+        start = 0
+        for end, path in cuts:
+            self._write(records[start:end])
+            self._file.close()
+            self.path = path
+            self._file = open(path, "a", encoding="utf-8")
+            start = end
+        self._write(records[start:])
+        with self._cond:
+            self._durable_lsn = lsn
+            self._cond.notify_all()
+        return len(records)
+
+    def _write(self, records: List[str]) -> None:
+        if records:
+            self._file.write("".join(records))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._buffer and not self._cuts and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+            with self._io_lock:
+                if self._file.closed:
+                    return
+                flushed = self._flush()
+            if self._on_flush is not None:
+                self._on_flush(flushed)
+
+
+class WALPointsBackend(InMemoryPointsBackend):
+    """Durable points storage: write-ahead log with group commit plus compacted snapshots.
+
+    Every mutation is applied in memory and logged under the wallet's stripe
+    lock, so per-wallet log order matches apply order. Adds return once
+    buffered; claims wait for their record to be fsynced before returning the
+    amount, so a claimed balance can never be paid out twice after a restart.
+
+    Files in ``data_dir``: ``points.snapshot`` holds the state as of a WAL
+    generation, ``points.wal.<generation>`` hold the mutations since.
+    ``points.wal.lock`` is held by the one process using them until ``close``;
+    multi-worker deployments use ``SharedMemoryPointsBackend`` instead.
+    """
+
+    def __init__(self, data_dir: str, stripes: int = 64, snapshot_every: int = 100000):
+        super().__init__(stripes)
+        self.data_dir = data_dir
+        self.snapshot_every = snapshot_every
+        self._since_snapshot = 0
+        self._snapshot_lock = threading.Lock()
+        self._snapshotter: Optional[threading.Thread] = None
+        # Guards starting a snapshot thread against close joining it
+        self._snapshotter_lock = threading.Lock()
+        self._closing = False
+        os.makedirs(data_dir, exist_ok=True)
+        # Totals live in this process: workers sharing the log would diverge and
+        # one's snapshot would delete segments another is still appending to
+        self._lock_file = lock_single_owner(
+            os.path.join(data_dir, "points.wal"),
+            f"Points log in {data_dir} is used by another process; run a single worker or set POINTS_BACKEND=shared",
+        )
+
+        self.generation = self._replay()
+        self.wal = WriteAheadLog(self._wal_path(self.generation), on_flush=self._after_flush)
+
+    def add(self, wallet: str, amount: int) -> int:
+        with self.lock_for(wallet):
+            total = self.points.get(wallet, 0) + amount
+            self.points[wallet] = total
+            self.wal.append(f"A {wallet} {amount}\n")
+        return total
+
+    def reset(self, wallet: str) -> None:
+        with self.lock_for(wallet):
+            self.points[wallet] = 0
+            self.wal.append(f"S {wallet} 0\n")
+
+    def claim(self, wallet: str, wait: bool = True) -> int:
+        """Zero ``wallet``'s points; with ``wait`` False the caller waits on ``wait_durable`` later."""
+        with self.lock_for(wallet):
+            amount = self.points.get(wallet, 0)
+            if amount == 0:
+                return 0
+            self.points[wallet] = 0
+            lsn = self.wal.append(f"C {wallet} {amount}\n")
+        if wait:
+            # Wait outside the stripe lock so other wallets on this stripe keep going
+            self.wal.wait_durable(lsn)
+        return amount
+
+    def wait_durable(self) -> None:
+        self.wal.sync()
+
+    def add_many(self, amounts: Dict[str, int]) -> Dict[str, int]:
+        # Every stripe is held, so the batch is logged as one contiguous run
+        for lock in self._stripes:
+            lock.acquire()
+        try:
+            totals = self._add_many(amounts)
+            self.wal.append_many([f"A {wallet} {amount}\n" for wallet, amount in amounts.items()])
+        finally:
+            for lock in self._stripes:
+                lock.release()
+        return totals
+
+    def snapshot(self) -> None:
+        """Write a compacted snapshot and drop the WAL segments it covers.
+
+        Writers are held only while the WAL is cut and the points are copied;
+        the copy is written out after they resume.
+        """
+        with self._snapshot_lock:
+            for lock in self._stripes:
+                lock.acquire()
+            try:
+                generation = self.generation + 1
+                self.wal.rotate(self._wal_path(generation))
+                state = dict(self.points)
+                self.generation = generation
+                self._since_snapshot = 0
+            finally:
+                for lock in self._stripes:
+                    lock.release()
+
+            path = os.path.join(self.data_dir, "points.snapshot")
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"generation": generation, "points": {w: p for w, p in state.items() if p}}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            for old in self._wal_generations():
+                if old < generation:
+                    os.remove(self._wal_path(old))
+
+    def close(self) -> None:
+        with self._snapshotter_lock:
+            self._closing = True
+        if self._snapshotter is not None:
+            self._snapshotter.join()
+        self.wal.close()
+        # Closing the file releases the lock
+        self._lock_file.close()
+
+    def _after_flush(self, flushed: int) -> None:
+        # Runs on the flusher thread: snapshot on a separate one so group commits keep going
+        self._since_snapshot += flushed
+        if self._since_snapshot < self.snapshot_every:
+            return
+        with self._snapshotter_lock:
+            if self._closing or (self._snapshotter is not None and self._snapshotter.is_alive()):
+                return
+            self._snapshotter = threading.Thread(target=self.snapshot, name="points-snapshot", daemon=True)
+            self._snapshotter.start()
+
+    def _replay(self) -> int:
+        """Load the snapshot and replay newer WAL segments; return the next generation."""
+        generation = 0
+        path = os.path.join(self.data_dir, "points.snapshot")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            generation = snapshot["generation"]
+            self.points.update(snapshot["points"])
+
+        segments = [g for g in self._wal_generations() if g >= generation]
+        for g in segments:
+            self._replay_segment(self._wal_path(g))
+        return max(segments + [generation])
+
+    def _replay_segment(self, path: str) -> None:
+        points = self.points
+
+        def apply(line: bytes) -> None:
+            op, wallet, value = line.split(b" ")
+            wallet, value = wallet.decode(), int(value)
+            if op == b"A":
+                points[wallet] = points.get(wallet, 0) + value
+            else:
+                points[wallet] = 0
+
+        replay_log(path, apply)
+
+    def _wal_generations(self) -> List[int]:
+        prefix = "points.wal."
+        return sorted(
+            int(name[len(prefix):])
+            for name in os.listdir(self.data_dir)
+            if name.startswith(prefix) and name[len(prefix):].isdigit()
+        )
+
+    def _wal_path(self, generation: int) -> str:
+        return os.path.join(self.data_dir, f"points.wal.{generation}")
+
+
+def create_points_backend(kind: Optional[str] = None):
+    """Build the points backend selected by ``POINTS_BACKEND`` (``wal``, ``shared`` or ``memory``)."""
+    kind = kind or os.getenv("POINTS_BACKEND", "wal")
+    if kind == "memory":
+        return InMemoryPointsBackend()
+    if kind == "shared":
+        # fcntl/mmap based, only needed for multi-worker deployments
+        from api.services.points_shm import SharedMemoryPointsBackend
+        return SharedMemoryPointsBackend(
+            os.getenv("POINTS_SHM_PATH", os.path.join(os.getenv("POINTS_DATA_DIR", "data"), "points.table")),
+            capacity=int(os.getenv("POINTS_SHM_CAPACITY", "262144")),
+        )
+    if kind == "wal":
+        return WALPointsBackend(
+            os.getenv("POINTS_DATA_DIR", "data"),
+            snapshot_every=int(os.getenv("POINTS_SNAPSHOT_EVERY", "100000")),
+        )
+    raise ValueError(f"Unknown POINTS_BACKEND: {kind}")
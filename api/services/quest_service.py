@@ -0,0 +1,231 @@
+import os
+import time
+import threading
+from array import array
+from typing import Dict, List, Optional, Tuple
+from api.services.points_store import WriteAheadLog, lock_single_owner, replay_log
+
+# Points per quest type; the order fixes each type's bit in the daily bitmap (max 8)
+QUEST_REWARDS = {
+    "daily": 10,
+    "upload": 50,
+    "social": 25,
+    "referral": 100,
+    "profile": 30,
+}
+QUEST_BITS = {quest: 1 << i for i, quest in enumerate(QUEST_REWARDS)}
+# Points per check-in; check-ins are not capped per day
+CHECKIN_REWARD = 10
+SECONDS_PER_DAY = 86400
+
+
+def today() -> int:
+    """Current UTC day number."""
+    return int(time.time() // SECONDS_PER_DAY)
+
+
+class BaseQuestCompletionIndex:
+    """Queries shared by the completion indexes; subclasses provide ``window`` and ``day_bits``."""
+
+    window: int
+
+    def completed(self, wallet: str, quest: str, day: Optional[int] = None) -> bool:
+        """Whether ``wallet`` completed ``quest`` on ``day`` (default today)."""
+        return bool(self.day_bits(wallet, today() if day is None else day) & QUEST_BITS[quest])
+
+    def history(self, wallet: str, days: int = 7) -> List[dict]:
+        """Completed quests per day, newest first, for the last ``days`` days."""
+        current = today()
+        result = []
+        for day in range(current, current - min(days, self.window), -1):
+            bits = self.day_bits(wallet, day)
+            result.append({
+                "date": time.strftime("%Y-%m-%d", time.gmtime(day * SECONDS_PER_DAY)),
+                "quests": [quest for quest, bit in QUEST_BITS.items() if bits & bit],
+            })
+        return result
+
+
+class QuestCompletionIndex(BaseQuestCompletionIndex):
+    """Per-wallet daily quest completion bitmaps over a rolling window of days.
+
+    Each wallet owns a row of ``window_days`` bytes in one shared bytearray,
+    used as a ring: day ``d`` lives at ``d % window_days`` and holds one bit
+    per quest type. ``_latest`` records the newest day written to each row;
+    moving it forward clears the slots of the skipped days, so days older
+    than the window expire without a sweep. Lookups and updates are O(1).
+
+    Completions are appended to ``path`` through a group-committed
+    ``WriteAheadLog`` and replayed on startup; the log is rewritten without
+    expired entries when more than half of it has aged out. The bitmaps live
+    in one process, so the log is locked (``<path>.lock``) until ``close``:
+    worker processes sharing it would each enforce their own caps. Multi-worker
+    deployments use ``SharedQuestCompletionIndex`` instead.
+    """
+
+    def __init__(self, path: Optional[str] = None, window_days: int = 90):
+        self.path = path
+        self.window = window_days
+        self._rows: Dict[str, int] = {}
+        self._bits = bytearray()
+        self._latest = array("l")
+        self._lock = threading.Lock()
+        self.wal: Optional[WriteAheadLog] = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._lock_file = lock_single_owner(path, f"Quest log {path} is used by another process; run a single worker or set POINTS_BACKEND=shared")
+            if os.path.exists(path):
+                self._replay()
+            self.wal = WriteAheadLog(path)
+
+    def complete(self, wallet: str, quest: str, day: Optional[int] = None) -> bool:
+        """Record a completion; returns False if it was already recorded for that day."""
+        day = today() if day is None else day
+        with self._lock:
+            if not self._set(wallet, QUEST_BITS[quest], day):
+                return False
+            if self.wal is not None:
+                self.wal.append(f"{wallet} {day} {QUEST_BITS[quest]}\n")
+        return True
+
+    def complete_many(self, completions: List[Tuple[str, str]], day: Optional[int] = None) -> List[bool]:
+        """Record ``(wallet, quest)`` completions in order under one lock; False for repeats."""
+        day = today() if day is None else day
+        with self._lock:
+            recorded = [self._set(wallet, QUEST_BITS[quest], day) for wallet, quest in completions]
+            if self.wal is not None:
+                self.wal.append_many([
+                    f"{wallet} {day} {QUEST_BITS[quest]}\n"
+                    for (wallet, quest), ok in zip(completions, recorded) if ok
+                ])
+        return recorded
+
+    def revert_many(self, completions: List[Tuple[str, str]], day: int) -> None:
+        """Forget ``(wallet, quest)`` completions recorded for ``day``, freeing their caps."""
+        with self._lock:
+            for wallet, quest in completions:
+                self._clear(wallet, QUEST_BITS[quest], day)
+            if self.wal is not None:
+                # Negative bits clear on replay
+                self.wal.append_many([f"{wallet} {day} {-QUEST_BITS[quest]}\n" for wallet, quest in completions])
+
+    def day_bits(self, wallet: str, day: int) -> int:
+        row = self._rows.get(wallet)
+        if row is None or not self._in_window(row, day):
+            return 0
+        return self._bits[row * self.window + day % self.window]
+
+    def stats(self) -> dict:
+        return {"wallets": len(self._rows), "window_days": self.window, "bitmap_bytes": len(self._bits)}
+
+    def close(self) -> None:
+        if self.wal is not None:
+            self.wal.close()
+            # Closing the file releases the lock
+            self._lock_file.close()
+
+    def _in_window(self, row: int, day: int) -> bool:
+        latest = self._latest[row]
+        return latest - self.window < day <= latest
+
+    def _set(self, wallet: str, bit: int, day: int) -> bool:
+        row = self._rows.get(wallet)
+        if row is None:
+            row = len(self._rows)
+            self._rows[wallet] = row
+            self._bits.extend(bytes(self.window))
+            self._latest.append(day)
+        latest = self._latest[row]
+        if day <= latest - self.window:
+            # Older than the window: treat as expired
+            return False
+        start = row * self.window
+        if day > latest:
+            # Clear the slots of days skipped since the row was last written
+            for d in range(max(latest + 1, day - self.window + 1), day + 1):
+                self._bits[start + d % self.window] = 0
+            self._latest[row] = day
+        slot = start + day % self.window
+        if self._bits[slot] & bit == bit:
+            return False
+        self._bits[slot] |= bit
+        return True
+
+    def _clear(self, wallet: str, bit: int, day: int) -> None:
+        row = self._rows.get(wallet)
+        if row is not None and self._in_window(row, day):
+            self._bits[row * self.window + day % self.window] &= ~bit
+
+    def _replay(self) -> None:
+        oldest = today() - self.window
+        live = 0
+
+        def apply(line: bytes) -> None:
+            nonlocal live
+            wallet, day, bits = line.split(b" ")
+            day, bits = int(day), int(bits)
+            if day > oldest:
+                if bits < 0:
+                    self._clear(wallet.decode(), -bits, day)
+                else:
+                    self._set(wallet.decode(), bits, day)
+                live += 1
+
+        entries = replay_log(self.path, apply)
+        if live * 2 < entries:
+            # Drop expired entries
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                for wallet, row in self._rows.items():
+                    for day in range(self._latest[row] - self.window + 1, self._latest[row] + 1):
+                        bits = self._bits[row * self.window + day % self.window]
+                        if bits and day > oldest:
+                            f.write(f"{wallet} {day} {bits}\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(self.path + ".tmp", self.path)
+
+
+def create_quest_index(kind: Optional[str] = None):
+    """Build the completion index matching ``POINTS_BACKEND``: shared across workers for ``shared``."""
+    kind = kind or os.getenv("POINTS_BACKEND", "wal")
+    window_days = int(os.getenv("QUEST_HISTORY_DAYS", "90"))
+    if kind == "shared":
+        # fcntl/mmap based, only needed for multi-worker deployments
+        from api.services.quest_shm import SharedQuestCompletionIndex
+        return SharedQuestCompletionIndex(
+            os.getenv("QUEST_SHM_PATH", os.path.join(os.getenv("POINTS_DATA_DIR", "data"), "quests.table")),
+            window_days=window_days,
+            capacity=int(os.getenv("QUEST_SHM_CAPACITY", "262144")),
+        )
+    return QuestCompletionIndex(
+        os.getenv("QUEST_INDEX_PATH", os.path.join(os.getenv("POINTS_DATA_DIR", "data"), "quests.log")),
+        window_days=window_days,
+    )
+
+
+class QuestService:
+    def __init__(self):
+        # Completion history for per-day caps, see QUEST_HISTORY_DAYS
+        self.completions = create_quest_index()
+
+    def complete(self, wallet: str, quest_type: str, day: Optional[int] = None) -> bool:
+        """Record the completion of ``quest_type`` on ``day`` (default today); False if already completed"""
+        return self.completions.complete(wallet, quest_type, day)
+
+    def complete_many(self, completions: List[Tuple[str, str]], day: Optional[int] = None) -> List[bool]:
+        """Record ``(wallet, quest_type)`` completions for ``day`` (default today); False for each already completed"""
+        return self.completions.complete_many(completions, day)
+
+    def revert_many(self, completions: List[Tuple[str, str]], day: int) -> None:
+        """Undo completions recorded by ``complete_many`` for ``day``"""
+        self.completions.revert_many(completions, day)
+    
+    def get_history(self, wallet: str, days: int = 7) -> dict:
+        """Get a wallet's completed quests per day"""
+        return {"wallet": wallet, "days": self.completions.history(wallet, days)}
+
+    def close(self) -> None:
+        """Flush the completion log"""
+        self.completions.close()
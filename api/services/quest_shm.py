@@ -0,0 +1,106 @@
+import struct
+from typing import Dict, List, Optional, Tuple
+from api.services.quest_service import QUEST_BITS, BaseQuestCompletionIndex, today
+from api.services.shm_table import SharedHashTable
+
+# Slot layout: int32 latest day, uint8 key length, key bytes, then one byte per day of the window
+BITS_OFFSET = 64
+
+
+class SharedQuestCompletionIndex(SharedHashTable, BaseQuestCompletionIndex):
+    """Quest completion bitmaps shared by every worker process on the host.
+
+    The same ring of daily bitmaps as ``QuestCompletionIndex``, one row per
+    wallet, kept in a ``SharedHashTable`` so the per-day caps hold across
+    ``uvicorn --workers N``. The window is fixed when the table is created.
+    """
+
+    MAGIC = b"QST1"
+    NAME = "Quest table"
+    KEY_OFFSET = 4
+    MAX_KEY_BYTES = BITS_OFFSET - 5
+
+    def __init__(self, path: str, window_days: int = 90, capacity: int = 262144, stripes: int = 64):
+        super().__init__(path, capacity, stripes, params=(window_days,))
+        self.window = self.params[0]
+
+    def slot_size(self, params: Tuple[int, ...]) -> int:
+        return BITS_OFFSET + params[0]
+
+    def complete(self, wallet: str, quest: str, day: Optional[int] = None) -> bool:
+        day = today() if day is None else day
+        key, h = self._key(wallet)
+        with self._locked(self._stripe(h)):
+            return self._set(self._slot(key, h, day), QUEST_BITS[quest], day)
+
+    def complete_many(self, completions: List[Tuple[str, str]], day: Optional[int] = None) -> List[bool]:
+        """Record ``(wallet, quest)`` completions taking each stripe lock once; False for repeats.
+
+        A wallet's completions share a stripe and keep their relative order.
+        """
+        day = today() if day is None else day
+        by_stripe: Dict[int, list] = {}
+        for i, (wallet, quest) in enumerate(completions):
+            key, h = self._key(wallet)
+            by_stripe.setdefault(self._stripe(h), []).append((i, key, h, QUEST_BITS[quest]))
+        recorded = [False] * len(completions)
+        for stripe in sorted(by_stripe):
+            with self._locked(stripe):
+                for i, key, h, bit in by_stripe[stripe]:
+                    recorded[i] = self._set(self._slot(key, h, day), bit, day)
+        return recorded
+
+    def revert_many(self, completions: List[Tuple[str, str]], day: int) -> None:
+        """Forget ``(wallet, quest)`` completions recorded for ``day``, freeing their caps."""
+        for wallet, quest in completions:
+            found_key = self._lookup_key(wallet)
+            if found_key is None:
+                continue
+            key, h = found_key
+            with self._locked(self._stripe(h)):
+                offset, found = self._find(key, h)
+                if found:
+                    latest = struct.unpack_from("<i", self._map, offset)[0]
+                    if latest - self.window < day <= latest:
+                        self._map[offset + BITS_OFFSET + day % self.window] &= ~QUEST_BITS[quest]
+
+    def day_bits(self, wallet: str, day: int) -> int:
+        found_key = self._lookup_key(wallet)
+        if found_key is None:
+            return 0
+        key, h = found_key
+        with self._locked(self._stripe(h)):
+            offset, found = self._find(key, h)
+            if not found:
+                return 0
+            latest = struct.unpack_from("<i", self._map, offset)[0]
+            if not latest - self.window < day <= latest:
+                return 0
+            return self._map[offset + BITS_OFFSET + day % self.window]
+
+    def stats(self) -> dict:
+        wallets = self.count
+        return {"wallets": wallets, "window_days": self.window, "bitmap_bytes": wallets * self.window}
+
+    def _init_record(self, offset: int, day: int) -> None:
+        # New rows start at the day of their first completion
+        struct.pack_into("<i", self._map, offset, day)
+
+    def _set(self, offset: int, bit: int, day: int) -> bool:
+        """Set ``bit`` for ``day`` in the row at ``offset``; caller holds its stripe lock."""
+        m = self._map
+        latest = struct.unpack_from("<i", m, offset)[0]
+        if day <= latest - self.window:
+            # Older than the window: treat as expired
+            return False
+        bits = offset + BITS_OFFSET
+        if day > latest:
+            # Clear the slots of days skipped since the row was last written
+            for d in range(max(latest + 1, day - self.window + 1), day + 1):
+                m[bits + d % self.window] = 0
+            struct.pack_into("<i", m, offset, day)
+        slot = bits + day % self.window
+        if m[slot] & bit == bit:
+            return False
+        m[slot] |= bit
+        return True
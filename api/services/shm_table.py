@@ -0,0 +1,151 @@
+import os
+import mmap
+import fcntl
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+HEADER_SIZE = 4096
+# Header: magic, capacity, record count, then the subclass's parameters (all uint64)
+HEADER_FORMAT = "<4s4xQQ"
+COUNT_OFFSET = 16
+# Refuse new keys past this fill ratio to keep probe sequences short
+MAX_LOAD_FACTOR = 0.9
+
+
+class SharedHashTable:
+    """mmap-backed open-addressing hash table (linear probing) shared by every worker process on the host.
+
+    Each slot holds a fixed-size record keyed by a wallet: a uint8 key length
+    at ``KEY_OFFSET``, the key bytes right after it, and subclass-defined
+    fields elsewhere in the slot. Access holds a per-stripe lock that is both
+    a thread lock and an fcntl byte-range lock on the table file; inserting a
+    new key additionally holds the table-wide insert lock (byte 0).
+
+    Subclasses set ``MAGIC``, ``NAME``, ``KEY_OFFSET``, ``MAX_KEY_BYTES`` and
+    ``SLOT_SIZE``; layouts that depend on the ``params`` stored in the header
+    override ``slot_size``. New records start zero-filled unless
+    ``_init_record`` sets them up otherwise.
+
+    The table lives in the page cache; it survives worker restarts and is
+    flushed to disk on close, but is not fsynced per update.
+    """
+
+    MAGIC = b""
+    NAME = "Table"
+    KEY_OFFSET = 0
+    MAX_KEY_BYTES = 0
+    SLOT_SIZE = 0
+
+    def __init__(self, path: str, capacity: int = 262144, stripes: int = 64, params: Tuple[int, ...] = ()):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._stripes = stripes
+        # Index 0 is the insert lock, 1..stripes are the key stripes
+        self._thread_locks = [threading.Lock() for _ in range(stripes + 1)]
+
+        # The first worker to take the insert lock sizes and stamps the file
+        header = HEADER_FORMAT + "Q" * len(params)
+        with self._locked(0):
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, HEADER_SIZE + capacity * self.slot_size(params))
+                os.pwrite(self._fd, struct.pack(header, self.MAGIC, capacity, 0, *params), 0)
+            magic, self.capacity, _, *stored = struct.unpack(header, os.pread(self._fd, struct.calcsize(header), 0))
+        if magic != self.MAGIC:
+            raise ValueError(f"{path} is not a {self.NAME.lower()}")
+        # Parameters fixed when the table was created win over the ones passed in
+        self.params = tuple(stored)
+        self._slot_size = self.slot_size(self.params)
+        self._map = mmap.mmap(self._fd, HEADER_SIZE + self.capacity * self._slot_size)
+
+    def slot_size(self, params: Tuple[int, ...]) -> int:
+        """Bytes per slot for a table created with ``params``."""
+        return self.SLOT_SIZE
+
+    @property
+    def count(self) -> int:
+        """Number of keys in the table."""
+        return struct.unpack_from("<Q", self._map, COUNT_OFFSET)[0]
+
+    def close(self) -> None:
+        self._map.flush()
+        self._map.close()
+        os.close(self._fd)
+
+    def _init_record(self, offset: int, *init) -> None:
+        """Write the fields of a new record at ``offset``, before its key is published."""
+
+    def _stripe(self, h: int) -> int:
+        return 1 + h % self._stripes
+
+    def _key(self, wallet: str) -> Tuple[bytes, int]:
+        key = wallet.encode()
+        if len(key) > self.MAX_KEY_BYTES:
+            raise ValueError(f"Wallet key longer than {self.MAX_KEY_BYTES} bytes")
+        return key, zlib.crc32(key)
+
+    def _lookup_key(self, wallet: str) -> Optional[Tuple[bytes, int]]:
+        """Like ``_key`` for reads: None for a key too long to ever be stored."""
+        key = wallet.encode()
+        if len(key) > self.MAX_KEY_BYTES:
+            return None
+        return key, zlib.crc32(key)
+
+    def _records(self) -> Iterator[Tuple[str, int]]:
+        """``(wallet, slot_offset)`` of every record, without locking."""
+        m = self._map
+        length_at = self.KEY_OFFSET
+        for index in range(self.capacity):
+            offset = HEADER_SIZE + index * self._slot_size
+            length = m[offset + length_at]
+            if length:
+                yield m[offset + length_at + 1:offset + length_at + 1 + length].decode(), offset
+
+    def _find(self, key: bytes, h: int) -> Tuple[int, bool]:
+        """Return ``(slot_offset, found)``; when not found the offset is the first empty slot."""
+        m = self._map
+        length_at = self.KEY_OFFSET
+        index = h % self.capacity
+        for _ in range(self.capacity):
+            offset = HEADER_SIZE + index * self._slot_size
+            length = m[offset + length_at]
+            if length == 0:
+                return offset, False
+            if length == len(key) and m[offset + length_at + 1:offset + length_at + 1 + length] == key:
+                return offset, True
+            index = (index + 1) % self.capacity
+        raise RuntimeError(f"{self.NAME} is full")
+
+    def _slot(self, key: bytes, h: int, *init) -> int:
+        """Find or insert the record for ``key``, new ones set up by ``_init_record(offset, *init)``; caller holds the key's stripe lock."""
+        offset, found = self._find(key, h)
+        if found:
+            return offset
+        with self._locked(0):
+            # Another key may have claimed this slot since the lock-free probe
+            offset, found = self._find(key, h)
+            if found:
+                return offset
+            count = self.count
+            if count + 1 > self.capacity * MAX_LOAD_FACTOR:
+                raise RuntimeError(f"{self.NAME} is full")
+            self._init_record(offset, *init)
+            self._map[offset + self.KEY_OFFSET + 1:offset + self.KEY_OFFSET + 1 + len(key)] = key
+            # Publish the slot last so concurrent probes never see a partial key
+            self._map[offset + self.KEY_OFFSET] = len(key)
+            struct.pack_into("<Q", self._map, COUNT_OFFSET, count + 1)
+        return offset
+
+    @contextmanager
+    def _locked(self, index: int):
+        with self._thread_locks[index]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, index)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, index)
@@ -1,40 +1,440 @@
 import os
-from typing import Dict
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
 from fastapi import HTTPException
-from solders.pubkey import Pubkey
-from spl_token_utils import SPLTokenManager, load_keypair_from_env
+from spl.token.instructions import get_associated_token_address
+from solana.rpc.commitment import Commitment
+from instrumentation import log, register_collector
+from api.models.wallet import is_valid_pubkey
+from spl_token_utils import (
+    ATA_RENT_LAMPORTS,
+    LAMPORTS_PER_SIGNATURE,
+    AsyncSPLTokenManager,
+    BalanceCache,
+    KnownATAIndex,
+    load_keypair_from_env,
+    load_keypairs_from_env,
+)
 from solders.keypair import Keypair
 
+
+class TreasuryShard:
+    """One treasury keypair and its local ledger of token and SOL balances."""
+    
+    def __init__(self, keypair: Keypair):
+        self.keypair = keypair
+        # Ledger, net of reservations for sends in flight; None until seeded from chain
+        self.balance: Optional[int] = None  # raw token units
+        self.lamports: Optional[int] = None
+        self.in_flight = 0
+        self.reserved = 0
+        self.reserved_lamports = 0
+        # (time, raw, lamports) spent by sends that may not have landed yet; negative for inflows
+        self.recent: deque = deque()
+        self.drift = 0
+        self.drift_lamports = 0
+    
+    @property
+    def wallet(self) -> str:
+        return str(self.keypair.pubkey())
+
+
+class TreasuryPool:
+    """Routes payouts across several treasury keypairs, keeping a local ledger of their funds.
+
+    Every treasury has its own source ATA, so payouts from different shards
+    do not contend for one account's write lock or one signer. A payout goes
+    to the shard with the fewest sends in flight among those whose ledger can
+    cover its tokens and fees; both are reserved until the send resolves.
+    Because the ledger rejects underfunded payouts locally, sends can skip
+    preflight simulation.
+
+    The ledger is seeded from chain and reconciled every ``refresh_interval``
+    seconds: the on-chain balance minus sends still settling and reservations
+    is what the ledger should hold. A mismatch beyond the tolerance is
+    reported as drift and the ledger adopts the chain's view. A shard that
+    falls below ``rebalance_ratio`` of the pool average is topped up from the
+    richest shard. Once ``start`` is called a background task does both on
+    that interval, so drift is caught while no claims are being paid;
+    until then ``acquire`` reconciles when the ledger is stale.
+    """
+    
+    def __init__(
+        self,
+        token_manager: AsyncSPLTokenManager,
+        keypairs: List[Keypair],
+        refresh_interval: float = 30.0,
+        rebalance_ratio: float = 0.25,
+        settle_window: float = 90.0,
+        drift_tolerance_lamports: int = 100000,
+    ):
+        self.token_manager = token_manager
+        self.shards = [TreasuryShard(k) for k in keypairs]
+        self.refresh_interval = refresh_interval
+        self.rebalance_ratio = rebalance_ratio
+        self.settle_window = settle_window
+        self.drift_tolerance_lamports = drift_tolerance_lamports
+        self.drift_alerts = 0
+        self._refreshed_at: Optional[float] = None
+        self._refresh_lock = asyncio.Lock()
+        self._refreshing: Optional[asyncio.Task] = None
+        self._rebalancing: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def primary(self) -> Keypair:
+        return self.shards[0].keypair
+    
+    def estimate_lamports(self, wallets: List[str]) -> int:
+        """Upper bound on SOL spent paying ``wallets``: one fee per payout plus rent for new ATAs."""
+        new_atas = sum(1 for w in wallets if w not in self.token_manager.known_atas)
+        return LAMPORTS_PER_SIGNATURE * len(wallets) + ATA_RENT_LAMPORTS * new_atas
+    
+    def start(self) -> None:
+        """Start reconciling and rebalancing in the background on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Stop the background task and any rebalance it started."""
+        for task in (self._task, self._rebalancing):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*(t for t in (self._task, self._rebalancing) if t is not None), return_exceptions=True)
+        self._task = None
+    
+    async def refresh(self) -> None:
+        """Reconcile every shard's ledger with its on-chain token and SOL balances."""
+        async with self._refresh_lock:
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            try:
+                balances, accounts = await asyncio.gather(
+                    self.token_manager.get_token_balances([s.wallet for s in self.shards]),
+                    self.token_manager.client.get_multiple_accounts([s.keypair.pubkey() for s in self.shards], commitment=Commitment("confirmed")),
+                )
+            except Exception as e:
+                log.warning("treasury_refresh_failed", error=str(e))
+                return
+            for shard, account in zip(self.shards, accounts.value):
+                self._reconcile(shard, balances[shard.wallet], account.lamports if account is not None else 0, started)
+            self._refreshed_at = started
+    
+    async def acquire(self, raw_amount: int, lamports: int = 0) -> TreasuryShard:
+        """Pick a shard for a payout and reserve its tokens and fees on the ledger."""
+        loop = asyncio.get_running_loop()
+        if self._refreshed_at is None:
+            await self.refresh()
+        elif loop.time() - self._refreshed_at > self.refresh_interval and (self._refreshing is None or self._refreshing.done()):
+            # Reconcile in the background; the ledger stays usable meanwhile
+            self._refreshing = loop.create_task(self.refresh())
+        # Shards whose ledger could not be seeded are tried rather than excluded
+        candidates = [
+            s for s in self.shards
+            if (s.balance is None or s.balance >= raw_amount) and (s.lamports is None or s.lamports >= lamports)
+        ]
+        if not candidates:
+            self._schedule_rebalance()
+            raise Exception("Insufficient treasury funds for this payout")
+        shard = min(candidates, key=lambda s: (s.in_flight, -(s.balance or 0)))
+        shard.in_flight += 1
+        shard.reserved += raw_amount
+        shard.reserved_lamports += lamports
+        if shard.balance is not None:
+            shard.balance -= raw_amount
+        if shard.lamports is not None:
+            shard.lamports -= lamports
+        return shard
+    
+    def release(self, shard: TreasuryShard, raw_amount: int, lamports: int = 0, spent: int = 0, spent_lamports: int = 0) -> None:
+        """Settle a reservation of ``raw_amount``/``lamports``; ``spent``/``spent_lamports`` actually went out."""
+        shard.in_flight -= 1
+        shard.reserved -= raw_amount
+        shard.reserved_lamports -= lamports
+        if shard.balance is not None:
+            shard.balance += raw_amount - spent
+        if shard.lamports is not None:
+            shard.lamports += lamports - spent_lamports
+        if spent or spent_lamports:
+            shard.recent.append((asyncio.get_running_loop().time(), spent, spent_lamports))
+        self._schedule_rebalance()
+    
+    async def rebalance(self) -> None:
+        """Top up shards below the low-water mark from the richest shard."""
+        known = [s for s in self.shards if s.balance is not None]
+        if len(known) < 2:
+            return
+        average = sum(s.balance for s in known) // len(known)
+        for shard in sorted(known, key=lambda s: s.balance):
+            if shard.balance >= average * self.rebalance_ratio:
+                break
+            donor = max(known, key=lambda s: s.balance)
+            amount = min(average - shard.balance, donor.balance - average)
+            if donor is shard or amount <= 0:
+                break
+            fees = self.estimate_lamports([shard.wallet])
+            donor.balance -= amount
+            try:
+                tx = await self.token_manager.transfer_tokens(donor.keypair, shard.wallet, amount)
+            except Exception as e:
+                donor.balance += amount
+                log.error("treasury_rebalance_failed", error=str(e))
+                return
+            now = asyncio.get_running_loop().time()
+            donor.recent.append((now, amount, fees))
+            if donor.lamports is not None:
+                donor.lamports -= fees
+            shard.balance += amount
+            shard.recent.append((now, -amount, 0))
+            log.info("treasury_rebalanced", source=donor.wallet, dest=shard.wallet, raw_amount=amount, tx=tx)
+    
+    def info(self) -> List[dict]:
+        return [
+            {
+                "wallet": s.wallet,
+                "raw_balance": s.balance,
+                "lamports": s.lamports,
+                "in_flight": s.in_flight,
+                "drift": s.drift,
+                "drift_lamports": s.drift_lamports,
+            }
+            for s in self.shards
+        ]
+    
+    def _reconcile(self, shard: TreasuryShard, chain_balance: int, chain_lamports: int, now: float) -> None:
+        while shard.recent and now - shard.recent[0][0] > self.settle_window:
+            shard.recent.popleft()
+        # Sends still settling may or may not be reflected on chain yet
+        unsettled = sum(raw for _, raw, _ in shard.recent)
+        unsettled_lamports = sum(lamports for _, _, lamports in shard.recent)
+        expected = (chain_balance - shard.reserved - unsettled, chain_balance - shard.reserved)
+        expected_lamports = (chain_lamports - shard.reserved_lamports - unsettled_lamports, chain_lamports - shard.reserved_lamports)
+        if shard.balance is None or shard.lamports is None:
+            shard.balance, shard.lamports = expected[0], expected_lamports[0]
+            return
+        
+        shard.drift = self._outside(shard.balance, expected, 0)
+        shard.drift_lamports = self._outside(shard.lamports, expected_lamports, self.drift_tolerance_lamports)
+        if shard.drift or shard.drift_lamports:
+            self.drift_alerts += 1
+            log.error("treasury_ledger_drift", wallet=shard.wallet, drift=shard.drift, drift_lamports=shard.drift_lamports)
+            shard.balance = min(max(shard.balance, expected[0]), expected[1])
+            shard.lamports = min(max(shard.lamports, expected_lamports[0]), expected_lamports[1])
+            shard.recent.clear()
+    
+    @staticmethod
+    def _outside(value: int, bounds: Tuple[int, int], tolerance: int) -> int:
+        """How far ``value`` lies outside ``bounds`` beyond ``tolerance`` (0 if within)."""
+        low, high = min(bounds), max(bounds)
+        if value < low - tolerance:
+            return value - low
+        if value > high + tolerance:
+            return value - high
+        return 0
+    
+    async def _run(self) -> None:
+        while True:
+            # refresh logs and swallows RPC errors itself
+            await self.refresh()
+            self._schedule_rebalance()
+            await asyncio.sleep(self.refresh_interval)
+    
+    def _schedule_rebalance(self) -> None:
+        if len(self.shards) < 2 or (self._rebalancing is not None and not self._rebalancing.done()):
+            return
+        known = [s.balance for s in self.shards if s.balance is not None]
+        if not known or min(known) >= (sum(known) // len(known)) * self.rebalance_ratio:
+            return
+        self._rebalancing = asyncio.get_running_loop().create_task(self.rebalance())
+
+
+class ClaimSettlementEngine:
+    """Queues pending claims and settles them together in packed multi-transfer transactions.
+
+    A flush happens when ``max_batch`` claims are waiting or the oldest claim has
+    waited ``window_ms``, whichever comes first. A claim's ``on_signed``
+    callback receives its transaction's signature and last valid block height
+    before the transaction is sent.
+    """
+    
+    def __init__(self, token_manager: AsyncSPLTokenManager, treasuries: TreasuryPool, max_batch: int = 20, window_ms: int = 250):
+        self.token_manager = token_manager
+        self.treasuries = treasuries
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self._pending: List[Tuple[str, int, asyncio.Future, Optional[Callable]]] = []
+        self._oldest = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight: Set[asyncio.Task] = set()
+    
+    def submit(self, wallet: str, raw_amount: int, on_signed: Optional[Callable[[str, int], Awaitable[None]]] = None) -> asyncio.Future:
+        """Queue a payout; the future resolves to the claim's settlement result."""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+        future = loop.create_future()
+        if not self._pending:
+            self._oldest = loop.time()
+        self._pending.append((wallet, raw_amount, future, on_signed))
+        self._wakeup.set()
+        return future
+    
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending and len(self._pending) < self.max_batch:
+                remaining = self._oldest + self.window - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+            if not self._pending:
+                continue
+            
+            batch = self._pending[:self.max_batch]
+            self._pending = self._pending[self.max_batch:]
+            if self._pending:
+                self._oldest = loop.time()
+                self._wakeup.set()
+            
+            # Settle in the background so the next window fills while this one is in flight
+            task = loop.create_task(self._settle(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+    
+    async def _settle(self, batch: List[Tuple[str, int, asyncio.Future, Optional[Callable]]]) -> None:
+        payouts = [(wallet, raw_amount) for wallet, raw_amount, _, _ in batch]
+        
+        async def before_send(indexes: List[int], signature: str, last_valid_block_height: int) -> None:
+            await asyncio.gather(*(batch[i][3](signature, last_valid_block_height) for i in indexes if batch[i][3] is not None))
+        
+        total = sum(raw_amount for _, raw_amount in payouts)
+        lamports = self.treasuries.estimate_lamports([wallet for wallet, _ in payouts])
+        new_atas = {wallet for wallet, _ in payouts if wallet not in self.token_manager.known_atas}
+        shard = None
+        try:
+            shard = await self.treasuries.acquire(total, lamports)
+            results = await self.token_manager.transfer_tokens_batch(shard.keypair, payouts, before_send)
+        except Exception as e:
+            results = [e] * len(batch)
+        if shard is not None:
+            sent = [(wallet, raw_amount, outcome) for (wallet, raw_amount), outcome in zip(payouts, results) if not isinstance(outcome, Exception)]
+            spent_lamports = (
+                LAMPORTS_PER_SIGNATURE * len({outcome for _, _, outcome in sent})
+                + ATA_RENT_LAMPORTS * len({wallet for wallet, _, _ in sent if wallet in new_atas})
+            )
+            self.treasuries.release(shard, total, lamports, sum(raw_amount for _, raw_amount, _ in sent), spent_lamports)
+        
+        for (wallet, raw_amount, future, _), outcome in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(outcome, Exception):
+                future.set_exception(outcome)
+            else:
+                future.set_result({"tx": outcome, "batch_size": len(batch), "treasury": shard.wallet})
+
+
 class TokenService:
     def __init__(self):
         # Load configuration
         self.RPC_URL = os.getenv("RPC_URL", "https://api.devnet.solana.com")
+        # Optional comma-separated endpoint pool; overrides RPC_URL
+        self.RPC_URLS = [u.strip() for u in os.getenv("RPC_URLS", "").split(",") if u.strip()] or [self.RPC_URL]
         self.MINT_ADDRESS = os.getenv("MINT", "11111111111111111111111111111111")
         self.DECIMALS = int(os.getenv("DECIMALS", "6"))
+        self.MAX_BALANCE_WALLETS = int(os.getenv("MAX_BALANCE_WALLETS", "1000"))
         
-        # Initialize SPL Token Manager
-        self.token_manager = SPLTokenManager(self.RPC_URL, self.MINT_ADDRESS, self.DECIMALS)
+        # Initialize SPL Token Manager (async, pooled keep-alive connections)
+        self.token_manager = AsyncSPLTokenManager(
+            self.RPC_URLS,
+            self.MINT_ADDRESS,
+            self.DECIMALS,
+            timeout=float(os.getenv("RPC_TIMEOUT", "10")),
+            max_connections=int(os.getenv("RPC_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("RPC_MAX_KEEPALIVE", "20")),
+            blockhash_refresh_interval=int(os.getenv("BLOCKHASH_REFRESH_MS", "1000")) / 1000,
+            known_atas=KnownATAIndex(os.getenv("ATA_INDEX_PATH", os.path.join(os.getenv("POINTS_DATA_DIR", "data"), "known_atas.txt"))),
+            balance_cache=BalanceCache(
+                ttl=int(os.getenv("BALANCE_CACHE_TTL_MS", "2000")) / 1000,
+                max_entries=int(os.getenv("BALANCE_CACHE_SIZE", "10000")),
+            ),
+        )
         
-        # Load treasury keypair
+        # Load treasury keypairs: TREASURY_SECRET_KEYS shards payouts across several
         try:
-            self.treasury = load_keypair_from_env("TREASURY_SECRET_KEY")
-            print(f"✅ Loaded treasury wallet: {self.treasury.pubkey()}")
+            if os.getenv("TREASURY_SECRET_KEYS"):
+                keypairs = load_keypairs_from_env("TREASURY_SECRET_KEYS")
+            else:
+                keypairs = [load_keypair_from_env("TREASURY_SECRET_KEY")]
+            for keypair in keypairs:
+                log.info("treasury_loaded", wallet=str(keypair.pubkey()))
         except Exception as e:
-            print(f"❌ Error loading treasury keypair: {e}")
-            print("   Please set TREASURY_SECRET_KEY in your .env file")
             # Generate a random keypair for demo
-            self.treasury = Keypair()
-            print(f"   Using demo keypair: {self.treasury.pubkey()}")
+            keypairs = [Keypair()]
+            log.warning("treasury_load_failed", error=str(e), hint="set TREASURY_SECRET_KEY in your .env file", demo_wallet=str(keypairs[0].pubkey()))
+        self.treasuries = TreasuryPool(
+            self.token_manager,
+            keypairs,
+            refresh_interval=int(os.getenv("TREASURY_REFRESH_MS", "30000")) / 1000,
+            rebalance_ratio=float(os.getenv("TREASURY_REBALANCE_RATIO", "0.25")),
+            drift_tolerance_lamports=int(os.getenv("TREASURY_DRIFT_LAMPORTS", "100000")),
+        )
+        # The ledger rejects underfunded payouts, so the node need not simulate them
+        self.token_manager.skip_preflight = os.getenv("SKIP_PREFLIGHT", "1") == "1"
+        # Primary treasury owns the lookup tables
+        self.treasury = self.treasuries.primary
+        
+        # v0 transactions through treasury-owned address lookup tables; opt-in, since
+        # creating and extending tables spends treasury SOL
+        if os.getenv("LOOKUP_TABLES", "0") == "1":
+            self.token_manager.enable_lookup_tables(
+                self.treasury,
+                os.getenv("LOOKUP_TABLE_CACHE", os.path.join(os.getenv("POINTS_DATA_DIR", "data"), "lookup_tables.json")),
+                extra_addresses=[get_associated_token_address(k.pubkey(), self.token_manager.mint_address) for k in keypairs[1:]],
+            )
+        
+        # Claim settlement: batch payouts by size or time window
+        self.settlement = ClaimSettlementEngine(
+            self.token_manager,
+            self.treasuries,
+            max_batch=int(os.getenv("SETTLEMENT_MAX_BATCH", "20")),
+            window_ms=int(os.getenv("SETTLEMENT_WINDOW_MS", "250")),
+        )
+        register_collector(self.metric_lines)
     
     def is_valid_pubkey(self, s: str) -> bool:
         """Check if string is a valid Solana public key"""
-        try:
-            Pubkey.from_string(s)
-            return True
-        except Exception:
-            return False
+        return is_valid_pubkey(s)
     
-    def transfer_tokens_now(self, to_wallet: str, whole_tokens: int) -> str:
+    async def close(self) -> None:
+        """Stop treasury upkeep and release RPC connections."""
+        await self.treasuries.stop()
+        await self.token_manager.close()
+    
+    async def warm_up(self) -> None:
+        """Prefetch mint info, treasury balances and a blockhash so the first payout skips them."""
+        self.token_manager.blockhash.start()
+        results = await asyncio.gather(
+            self.token_manager.get_mint_info(),
+            self.treasuries.refresh(),
+            self.token_manager.blockhash.refresh(),
+            return_exceptions=True,
+        )
+        errors = [str(r) for r in results if isinstance(r, Exception)]
+        if errors:
+            log.warning("warm_up_failed", errors=errors)
+        else:
+            log.info("warm_up_done", treasuries=len(self.treasuries.shards))
+    
+    async def transfer_tokens_now(self, to_wallet: str, whole_tokens: int) -> str:
         """Send SPL tokens from treasury to user ATA immediately."""
         if whole_tokens <= 0:
             raise HTTPException(400, "amount must be > 0")
@@ -45,28 +445,54 @@ class TokenService:
             # Convert whole tokens to raw units (considering decimals)
             raw_amount = whole_tokens * (10 ** self.DECIMALS)
             
-            # Use real SPL token transfer
-            tx_signature = self.token_manager.transfer_tokens(
-                self.treasury, 
-                to_wallet, 
-                raw_amount
-            )
+            # Use real SPL token transfer from the least loaded treasury shard
+            lamports = self.treasuries.estimate_lamports([to_wallet])
+            shard = await self.treasuries.acquire(raw_amount, lamports)
+            try:
+                tx_signature = await self.token_manager.transfer_tokens(
+                    shard.keypair,
+                    to_wallet,
+                    raw_amount
+                )
+            except Exception:
+                self.treasuries.release(shard, raw_amount, lamports)
+                raise
+            self.treasuries.release(shard, raw_amount, lamports, raw_amount, lamports)
             
-            print(f"✅ Transferred {whole_tokens} tokens to {to_wallet}")
-            print(f"📝 Transaction: {tx_signature}")
+            log.info("tokens_transferred", wallet=to_wallet, amount_tokens=whole_tokens, tx=tx_signature)
             return tx_signature
             
         except Exception as e:
-            print(f"❌ Transfer failed: {e}")
+            log.error("transfer_failed", wallet=to_wallet, error=str(e))
             raise HTTPException(500, f"Token transfer failed: {str(e)}")
     
-    def get_token_balance(self, wallet: str):
+    async def settle_claim(self, to_wallet: str, whole_tokens: int, on_signed: Optional[Callable[[str, int], Awaitable[None]]] = None) -> dict:
+        """Queue a claim payout for batched settlement and wait for its transaction.
+
+        ``on_signed(signature, last_valid_block_height)`` is awaited before the
+        transaction is sent.
+        """
+        if whole_tokens <= 0:
+            raise HTTPException(400, "amount must be > 0")
+        if not self.is_valid_pubkey(to_wallet):
+            raise HTTPException(400, "Invalid wallet address")
+        
+        raw_amount = whole_tokens * (10 ** self.DECIMALS)
+        try:
+            result = await self.settlement.submit(to_wallet, raw_amount, on_signed)
+            log.info("claim_settled", wallet=to_wallet, amount_tokens=whole_tokens, batch_size=result["batch_size"], tx=result["tx"])
+            return result
+        except Exception as e:
+            log.error("settlement_failed", wallet=to_wallet, error=str(e))
+            raise HTTPException(500, f"Token transfer failed: {str(e)}")
+    
+    async def get_token_balance(self, wallet: str):
         """Get token balance for a wallet"""
         if not self.is_valid_pubkey(wallet):
             raise HTTPException(400, "Invalid wallet address")
         
         try:
-            balance = self.token_manager.get_token_balance(wallet)
+            balance = await self.token_manager.get_token_balance(wallet)
             # Convert raw balance to whole tokens
             whole_tokens = balance / (10 ** self.DECIMALS)
             return {
@@ -78,10 +504,70 @@ class TokenService:
         except Exception as e:
             raise HTTPException(500, f"Failed to get balance: {str(e)}")
     
-    def get_treasury_info(self):
-        """Get treasury wallet information"""
+    async def get_token_balances(self, wallets: List[str]):
+        """Get token balances for many wallets at once"""
+        if len(wallets) > self.MAX_BALANCE_WALLETS:
+            raise HTTPException(400, f"At most {self.MAX_BALANCE_WALLETS} wallets per request")
+        invalid = [w for w in wallets if not self.is_valid_pubkey(w)]
+        if invalid:
+            raise HTTPException(400, f"Invalid wallet address: {invalid[0]}")
+        
         try:
-            treasury_balance = self.token_manager.get_token_balance(str(self.treasury.pubkey()))
+            balances = await self.token_manager.get_token_balances(wallets)
+            return {
+                "decimals": self.DECIMALS,
+                "balances": [
+                    {
+                        "wallet": wallet,
+                        "balance": raw / (10 ** self.DECIMALS),
+                        "raw_balance": raw,
+                    }
+                    for wallet, raw in balances.items()
+                ],
+            }
+        except Exception as e:
+            raise HTTPException(500, f"Failed to get balances: {str(e)}")
+    
+    def get_transaction_status(self, signature: str) -> dict:
+        """Get the tracked confirmation status of a transaction we sent"""
+        status = self.token_manager.confirmations.status(signature)
+        if status is None:
+            raise HTTPException(404, "Unknown transaction")
+        return status
+    
+    def metric_lines(self) -> List[str]:
+        """Balance cache, confirmation and treasury ledger metrics for /metrics"""
+        cache = self.token_manager.balance_cache.stats()
+        lines = ["# TYPE balance_cache_requests_total counter"]
+        for outcome in ("hits", "misses", "coalesced"):
+            lines.append(f'balance_cache_requests_total{{outcome="{outcome}"}} {cache[outcome]}')
+        lines += [
+            "# TYPE transactions_unconfirmed gauge",
+            f"transactions_unconfirmed {self.token_manager.confirmations.in_flight}",
+            "# TYPE treasury_drift_alerts_total counter",
+            f"treasury_drift_alerts_total {self.treasuries.drift_alerts}",
+            "# TYPE treasury_sends_in_flight gauge",
+        ]
+        lines += [f'treasury_sends_in_flight{{wallet="{s.wallet}"}} {s.in_flight}' for s in self.treasuries.shards]
+        return lines
+    
+    def get_balance_cache_stats(self) -> dict:
+        """Get balance cache hit/miss counters"""
+        return self.token_manager.balance_cache.stats()
+    
+    def get_rpc_stats(self) -> dict:
+        """Get per-endpoint RPC latency and error statistics"""
+        provider = self.token_manager.client._provider
+        if hasattr(provider, "stats"):
+            return provider.stats()
+        return {"endpoints": [{"url": str(provider.endpoint_uri)}], "hedges": 0, "hedge_wins": 0}
+    
+    async def get_treasury_info(self):
+        """Get treasury wallet information, per shard and in aggregate"""
+        try:
+            # Served from the balance cache when fresh; the pool refresh does the authoritative reads
+            balances = await self.token_manager.get_token_balances([s.wallet for s in self.treasuries.shards], cached=True)
+            treasury_balance = sum(balances.values())
             whole_tokens = treasury_balance / (10 ** self.DECIMALS)
             
             return {
@@ -89,11 +575,21 @@ class TokenService:
                 "balance": whole_tokens,
                 "raw_balance": treasury_balance,
                 "decimals": self.DECIMALS,
-                "mint_address": self.MINT_ADDRESS
+                "mint_address": self.MINT_ADDRESS,
+                "shards": [
+                    {
+                        "wallet": shard["wallet"],
+                        "balance": balances[shard["wallet"]] / (10 ** self.DECIMALS),
+                        "raw_balance": balances[shard["wallet"]],
+                        "available_raw_balance": shard["raw_balance"],
+                        "lamports": shard["lamports"],
+                        "in_flight": shard["in_flight"],
+                        "drift": shard["drift"],
+                        "drift_lamports": shard["drift_lamports"],
+                    }
+                    for shard in self.treasuries.info()
+                ],
+                "drift_alerts": self.treasuries.drift_alerts,
             }
         except Exception as e:
             raise HTTPException(500, f"Failed to get treasury info: {str(e)}")
-
-# Global instance
-token_service = TokenService()
-
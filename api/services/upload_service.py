@@ -0,0 +1,318 @@
+import os
+import asyncio
+import hashlib
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import httpx
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+from instrumentation import log
+from api.services.points_store import replay_log
+
+PINATA_URL = "https://api.pinata.cloud/pinning/pinFileToIPFS"
+# Room for multipart framing and small form fields on top of MAX_UPLOAD_MB
+MULTIPART_OVERHEAD = 64 * 1024
+# Read size when streaming a spooled upload to Pinata
+CHUNK_SIZE = 64 * 1024
+# CIDv0 ("Qm" + base58 multihash) length and shortest base32 CIDv1 ("b...")
+CID_V0_LENGTH = 46
+CID_V1_MIN_LENGTH = 59
+
+
+class CIDIndex:
+    """Persistent, size-bounded SHA-256 -> CID index for uploaded content.
+
+    Entries are appended to ``path`` as ``<sha256> <cid>`` lines and replayed
+    on startup up to the first torn or malformed line, where the file is
+    truncated; the least recently used entries are evicted past
+    ``max_entries`` and the file is compacted when it grows to twice that.
+    ``put`` writes the file, so async callers run it in a worker thread;
+    file writes happen outside the lock that ``get`` takes.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lines = 0
+        self._lock = threading.Lock()
+        # Taken before _lock is released, so file writes keep the order of their updates
+        self._io_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if path and os.path.exists(path):
+            self._replay()
+            self.evictions = 0
+
+    def get(self, file_hash: str) -> Optional[str]:
+        """Return the CID recorded for ``file_hash``, counting a hit or miss."""
+        with self._lock:
+            cid = self._entries.get(file_hash)
+            if cid is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(file_hash)
+            self.hits += 1
+            return cid
+
+    def put(self, file_hash: str, cid: str) -> None:
+        """Record the CID Pinata returned for ``file_hash``."""
+        with self._lock:
+            self._store(file_hash, cid)
+            if not self.path:
+                return
+            if self._lines >= 2 * self.max_entries:
+                data = "".join(f"{h} {c}\n" for h, c in self._entries.items())
+                self._lines = len(self._entries)
+            else:
+                data = None
+                self._lines += 1
+            self._io_lock.acquire()
+        try:
+            if data is not None:
+                self._compact(data)
+            else:
+                with open(self.path, "a") as f:
+                    f.write(f"{file_hash} {cid}\n")
+        finally:
+            self._io_lock.release()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _store(self, file_hash: str, cid: str) -> None:
+        self._entries[file_hash] = cid
+        self._entries.move_to_end(file_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _replay(self) -> None:
+        def apply(line: bytes) -> None:
+            parts = line.decode("ascii", "replace").split(" ")
+            if len(parts) != 2 or not _valid_entry(parts[0], parts[1]):
+                raise ValueError("Malformed CID index entry")
+            self._store(parts[0], parts[1])
+
+        self._lines += replay_log(self.path, apply)
+
+    def _compact(self, data: str) -> None:
+        with open(self.path + ".tmp", "w") as f:
+            f.write(data)
+        os.replace(self.path + ".tmp", self.path)
+
+
+def _valid_entry(file_hash: str, cid: str) -> bool:
+    if len(file_hash) != 64 or any(c not in "0123456789abcdef" for c in file_hash):
+        return False
+    if cid.startswith("Qm"):
+        return len(cid) == CID_V0_LENGTH
+    return cid.startswith("b") and len(cid) >= CID_V1_MIN_LENGTH
+
+
+class UploadService:
+    def __init__(self):
+        # Load configuration
+        self.PINATA_JWT = os.getenv("PINATA_JWT")  # required for /upload
+        self.MAX_MB = int(os.getenv("MAX_UPLOAD_MB", "25"))
+        self.PINATA_URL = os.getenv("PINATA_URL", PINATA_URL)
+        self.client = httpx.AsyncClient(timeout=60)
+        # Content-addressed dedup: repeat uploads return the known CID
+        self.cid_index = CIDIndex(
+            os.getenv("UPLOAD_INDEX_PATH", os.path.join(os.getenv("POINTS_DATA_DIR", "data"), "cid_index.txt")),
+            max_entries=int(os.getenv("UPLOAD_INDEX_SIZE", "100000")),
+        )
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    async def close(self) -> None:
+        """Release Pinata connections."""
+        await self.client.aclose()
+
+    async def pin_stream(self, request: Request) -> dict:
+        """Receive the ``file`` part of a multipart request and pin it to Pinata.
+
+        The body is read chunk by chunk into a temporary file: the size limit
+        is enforced as bytes arrive and the SHA-256 is computed on the fly.
+        Content already in the CID index is not uploaded again, and concurrent
+        uploads of the same content share one Pinata upload. Falls back to a
+        mock CID derived from the hash if Pinata fails.
+        """
+        max_bytes = self.MAX_MB * 1024 * 1024
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD:
+            raise HTTPException(400, f"Max {self.MAX_MB}MB")
+
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise HTTPException(400, "Expected multipart/form-data")
+
+        spool = await asyncio.to_thread(tempfile.TemporaryFile)
+        try:
+            filename, file_type, size, file_hash = await self._receive(request, params[b"boundary"], spool, max_bytes)
+        except BaseException:
+            spool.close()
+            raise
+
+        cid = self.cid_index.get(file_hash)
+        if cid is not None:
+            spool.close()
+            log.info("upload_deduplicated", filename=filename, cid=cid)
+            return {"cid": cid, "sha256": file_hash, "size": size, "filename": filename, "deduplicated": True}
+
+        task = self._in_flight.get(file_hash)
+        if task is None:
+            # The upload task owns the spool from here on
+            task = asyncio.ensure_future(self._pin_file(spool, filename, file_type, size, file_hash))
+            self._in_flight[file_hash] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(file_hash, None))
+        else:
+            spool.close()
+            self.cid_index.coalesced += 1
+
+        try:
+            cid = await asyncio.shield(task)
+            log.info("upload_pinned", filename=filename, cid=cid, size=size)
+        except Exception as e:
+            # Fallback to mock upload if Pinata fails
+            cid = f"Qm{file_hash[:44]}"  # Mock IPFS CID format
+            log.warning("pinata_upload_failed", filename=filename, error=str(e), mock_cid=cid)
+
+        return {"cid": cid, "sha256": file_hash, "size": size, "filename": filename, "deduplicated": False}
+
+    async def _receive(self, request: Request, boundary: bytes, spool, max_bytes: int) -> Tuple[str, str, int, str]:
+        """Stream the body into ``spool``; return ``(filename, content_type, size, sha256)``."""
+        events: List[Tuple] = []
+        parser = MultipartParser(boundary, self._parser_callbacks(events))
+
+        sha256 = hashlib.sha256()
+        size = 0
+        filename: Optional[str] = None
+        file_type = "application/octet-stream"
+        in_file = False
+        complete = False
+
+        async for chunk in request.stream():
+            parser.write(chunk)
+            data: List[bytes] = []
+            for event in events:
+                if event[0] == "file" and filename is None:
+                    filename, file_type = event[1], event[2]
+                    in_file = True
+                elif event[0] == "data" and in_file:
+                    size += len(event[1])
+                    if size > max_bytes:
+                        raise HTTPException(400, f"Max {self.MAX_MB}MB")
+                    sha256.update(event[1])
+                    data.append(event[1])
+                elif event[0] == "end" and in_file:
+                    in_file = False
+                    complete = True
+            events.clear()
+            if data:
+                # One disk write per received chunk, off the event loop
+                await asyncio.to_thread(spool.write, b"".join(data))
+        parser.finalize()
+
+        if filename is None:
+            raise HTTPException(400, "file missing")
+        if not complete:
+            raise HTTPException(400, "Incomplete multipart body")
+        return filename, file_type, size, sha256.hexdigest()
+
+    async def _pin_file(self, spool, filename: str, content_type: str, size: int, file_hash: str) -> str:
+        """Upload the spooled file to Pinata and record its CID."""
+        boundary = uuid.uuid4().hex
+        safe_name = filename.replace('"', "%22")
+        head = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{safe_name}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+        tail = f"\r\n--{boundary}--\r\n".encode()
+
+        async def body():
+            yield head
+            spool.seek(0)
+            while True:
+                chunk = await asyncio.to_thread(spool.read, CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+            yield tail
+
+        try:
+            r = await self.client.post(
+                self.PINATA_URL,
+                headers={
+                    "Authorization": f"Bearer {self.PINATA_JWT}",
+                    "Content-Type": f"multipart/form-data; boundary={boundary}",
+                    # The size is known, so send a plain body rather than a chunked one
+                    "Content-Length": str(len(head) + size + len(tail)),
+                },
+                content=body(),
+            )
+            if r.status_code >= 300:
+                raise Exception(f"Pinata error: {r.text}")
+            cid = r.json()["IpfsHash"]
+        finally:
+            spool.close()
+        await asyncio.to_thread(self.cid_index.put, file_hash, cid)
+        return cid
+
+    def _parser_callbacks(self, events: List[Tuple]) -> dict:
+        """Multipart callbacks that record the file part's boundaries and data in ``events``."""
+        part = {"headers": {}, "field": b"", "value": b"", "is_file": False}
+
+        def on_part_begin():
+            part.update(headers={}, field=b"", value=b"", is_file=False)
+
+        def on_header_field(data, start, end):
+            part["field"] += data[start:end]
+
+        def on_header_value(data, start, end):
+            part["value"] += data[start:end]
+
+        def on_header_end():
+            part["headers"][part["field"].lower()] = part["value"]
+            part["field"], part["value"] = b"", b""
+
+        def on_headers_finished():
+            _, options = parse_options_header(part["headers"].get(b"content-disposition", b""))
+            if options.get(b"name") == b"file":
+                part["is_file"] = True
+                filename = options.get(b"filename", b"upload").decode("utf-8", "replace")
+                file_type = part["headers"].get(b"content-type", b"application/octet-stream").decode("latin-1")
+                events.append(("file", filename, file_type))
+
+        def on_part_data(data, start, end):
+            if part["is_file"]:
+                events.append(("data", bytes(data[start:end])))
+
+        def on_part_end():
+            if part["is_file"]:
+                events.append(("end",))
+
+        return {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        }
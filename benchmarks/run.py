@@ -0,0 +1,289 @@
+"""Offline load test of main.app against local Solana RPC and Pinata stand-ins.
+
+    python -m benchmarks.run --requests 2000 --concurrency 32 \
+        --out benchmarks/results/latest.json --baseline benchmarks/results/baseline.json
+
+Runs a mixed phase plus isolated claim and balance phases, then reports
+p50/p99 latency, throughput and RPC calls per request for each. With
+``--baseline`` the run is compared against an earlier result file.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import contextlib
+import platform
+import subprocess
+import tempfile
+from typing import Dict, List, Optional
+import httpx
+from solders.keypair import Keypair
+from benchmarks.stubs import StubPinataServer, StubRPCServer
+
+DEFAULT_MIX = "checkin=35,quest=20,claim=10,balance=30,upload=5"
+# Phases whose regressions fail --fail-on-regression
+GATED_PHASES = ("claim", "balance")
+QUEST_TYPES = ("daily", "upload", "social", "referral", "profile")
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    weights = {}
+    for part in mix.split(","):
+        op, weight = part.split("=")
+        weights[op.strip()] = int(weight)
+    return weights
+
+
+def configure_env(rpc_url: str, pinata_url: str, data_dir: str) -> None:
+    """Point every service at the stubs and keep its state in ``data_dir``."""
+    os.environ.update({
+        "RPC_URL": rpc_url,
+        "PINATA_URL": pinata_url,
+        "PINATA_JWT": "benchmark",
+        "POINTS_DATA_DIR": data_dir,
+        "ATA_INDEX_PATH": os.path.join(data_dir, "known_atas.txt"),
+        "UPLOAD_INDEX_PATH": os.path.join(data_dir, "cid_index.txt"),
+        "LOOKUP_TABLE_CACHE": os.path.join(data_dir, "lookup_tables.json"),
+        # Stub accounts are token accounts, not lookup tables
+        "LOOKUP_TABLES": "0",
+        "LOG_SAMPLE_RATE": "0",
+    })
+    os.environ.pop("RPC_URLS", None)
+
+
+class LoadRunner:
+    """Drives the app in-process through an ASGI transport."""
+
+    def __init__(self, client: httpx.AsyncClient, rpc: StubRPCServer, wallets: int):
+        self.client = client
+        self.rpc = rpc
+        self.wallets = [str(Keypair().pubkey()) for _ in range(wallets)]
+        # Wallets holding points, claimed once each before falling back to random wallets
+        self.funded: List[str] = []
+
+    async def checkin(self) -> httpx.Response:
+        return await self.client.post("/wallet/checkin", json={"wallet": random.choice(self.wallets)})
+
+    async def quest(self) -> httpx.Response:
+        return await self.client.post(
+            "/quest/complete",
+            params={"quest_type": random.choice(QUEST_TYPES)},
+            json={"wallet": random.choice(self.wallets)},
+        )
+
+    async def claim(self) -> httpx.Response:
+        wallet = self.funded.pop() if self.funded else random.choice(self.wallets)
+        return await self.client.post("/wallet/claim", json={"wallet": wallet})
+
+    async def balance(self) -> httpx.Response:
+        return await self.client.get("/wallet/balance", params={"wallet": random.choice(self.wallets)})
+
+    async def upload(self) -> httpx.Response:
+        # Half the uploads repeat earlier content, exercising the dedup index
+        content = f"benchmark file {random.randrange(50)}".encode() * 64 if random.random() < 0.5 else os.urandom(4096)
+        return await self.client.post(
+            "/upload/file",
+            params={"wallet": random.choice(self.wallets)},
+            files={"file": ("bench.bin", content, "application/octet-stream")},
+        )
+
+    async def run_phase(self, mix: Dict[str, int], requests: int, concurrency: int) -> dict:
+        ops = random.choices(list(mix), weights=list(mix.values()), k=requests)
+        latencies: Dict[str, List[float]] = {op: [] for op in mix}
+        statuses: Dict[str, Dict[str, int]] = {op: {} for op in mix}
+        queue = iter(ops)
+        self.rpc.reset_counts()
+
+        async def worker():
+            for op in queue:
+                started = time.perf_counter()
+                try:
+                    status = str((await getattr(self, op)()).status_code)
+                except Exception as e:
+                    status = type(e).__name__
+                latencies[op].append(time.perf_counter() - started)
+                statuses[op][status] = statuses[op].get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        duration = time.perf_counter() - started
+        await drain_payouts()
+        rpc_calls = self.rpc.reset_counts()
+        total_rpc = sum(rpc_calls.values())
+        return {
+            "requests": requests,
+            "duration_s": round(duration, 3),
+            "throughput_rps": round(requests / duration, 1),
+            "rpc_calls": total_rpc,
+            "rpc_calls_per_request": round(total_rpc / requests, 3),
+            "rpc_methods": dict(sorted(rpc_calls.items())),
+            "ops": {
+                op: {
+                    "count": len(latencies[op]),
+                    "p50_ms": round(percentile(latencies[op], 0.50) * 1000, 2),
+                    "p99_ms": round(percentile(latencies[op], 0.99) * 1000, 2),
+                    "errors": sum(n for s, n in statuses[op].items() if not s.isdigit() or int(s) >= 500),
+                    "statuses": statuses[op],
+                }
+                for op in mix if latencies[op]
+            },
+        }
+
+
+async def drain_payouts(timeout: float = 30.0) -> None:
+    """Wait for queued claims to be sent and confirmed so their RPC calls are counted."""
+    from api.services import get_claim_service, get_token_service
+    claim_service, token_service = get_claim_service.get(), get_token_service.get()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        claims = claim_service.stats()["claims"]
+        if not claims.get("pending") and not claims.get("sending") and token_service.token_manager.confirmations.in_flight == 0:
+            return
+        await asyncio.sleep(0.05)
+
+
+async def run(args) -> dict:
+    rpc = StubRPCServer(args.rpc_latency_ms, args.rpc_jitter_ms, args.rpc_error_rate).start()
+    pinata = StubPinataServer(args.pinata_latency_ms, 0, args.pinata_error_rate).start()
+    data_dir = tempfile.mkdtemp(prefix="tokens-bench-")
+    configure_env(rpc.url, pinata.url + "/pinning/pinFileToIPFS", data_dir)
+
+    # Services read their configuration when first built
+    import main
+    from api.services import get_points_service
+
+    phases = {}
+    quiet = sys.stdout if args.verbose else open(os.devnull, "w")
+    try:
+        # Keep the app's own request logging out of the report
+        with contextlib.redirect_stdout(quiet):
+            async with main.lifespan(main.app):
+                transport = httpx.ASGITransport(app=main.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                    runner = LoadRunner(client, rpc, args.wallets)
+                    phases["mixed"] = await runner.run_phase(parse_mix(args.mix), args.requests, args.concurrency)
+
+                    # Isolated phases: every wallet holds points and claims once
+                    isolated = max(args.requests // 5, 1)
+                    runner.wallets = [str(Keypair().pubkey()) for _ in range(isolated)]
+                    runner.funded = list(runner.wallets)
+                    for wallet in runner.funded:
+                        get_points_service.get().add_points(wallet, 10)
+                    phases["claim"] = await runner.run_phase({"claim": 1}, isolated, args.concurrency)
+                    phases["balance"] = await runner.run_phase({"balance": 1}, isolated, args.concurrency)
+    finally:
+        rpc.stop()
+        pinata.stop()
+        if quiet is not sys.stdout:
+            quiet.close()
+
+    return {
+        "name": args.name,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "wallets": args.wallets,
+            "mix": args.mix,
+            "rpc_latency_ms": args.rpc_latency_ms,
+            "rpc_jitter_ms": args.rpc_jitter_ms,
+            "rpc_error_rate": args.rpc_error_rate,
+            "pinata_latency_ms": args.pinata_latency_ms,
+            "pinata_error_rate": args.pinata_error_rate,
+        },
+        "phases": phases,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """Describe changes beyond ``threshold`` (relative); regressions are prefixed with REGRESSION."""
+    notes = []
+    for phase, result in current["phases"].items():
+        base = baseline.get("phases", {}).get(phase)
+        if base is None:
+            continue
+        checks = [("throughput_rps", result["throughput_rps"], base["throughput_rps"], False),
+                  ("rpc_calls_per_request", result["rpc_calls_per_request"], base["rpc_calls_per_request"], True)]
+        for op, stats in result["ops"].items():
+            if op in base["ops"]:
+                checks.append((f"{op}.p50_ms", stats["p50_ms"], base["ops"][op]["p50_ms"], True))
+                checks.append((f"{op}.p99_ms", stats["p99_ms"], base["ops"][op]["p99_ms"], True))
+        for metric, value, old, lower_is_better in checks:
+            if not old:
+                continue
+            change = (value - old) / old
+            if abs(change) <= threshold:
+                continue
+            worse = change > 0 if lower_is_better else change < 0
+            prefix = "REGRESSION" if worse else "improved"
+            notes.append(f"{prefix} {phase}.{metric}: {old} -> {value} ({change:+.0%})")
+    return notes
+
+
+def print_report(result: dict) -> None:
+    for phase, stats in result["phases"].items():
+        print(f"== {phase}: {stats['requests']} requests in {stats['duration_s']}s "
+              f"({stats['throughput_rps']} req/s, {stats['rpc_calls_per_request']} RPC calls/request)")
+        for op, s in stats["ops"].items():
+            print(f"   {op:<8} n={s['count']:<6} p50={s['p50_ms']:>8.2f}ms p99={s['p99_ms']:>8.2f}ms errors={s['errors']} {s['statuses']}")
+        print(f"   rpc: {stats['rpc_methods']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--name", default="local")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--wallets", type=int, default=500)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="op=weight list over checkin, quest, claim, balance, upload")
+    parser.add_argument("--rpc-latency-ms", type=float, default=20)
+    parser.add_argument("--rpc-jitter-ms", type=float, default=10)
+    parser.add_argument("--rpc-error-rate", type=float, default=0.0)
+    parser.add_argument("--pinata-latency-ms", type=float, default=50)
+    parser.add_argument("--pinata-error-rate", type=float, default=0.0)
+    parser.add_argument("--verbose", action="store_true", help="show the app's own log output")
+    parser.add_argument("--out", help="write the result JSON here")
+    parser.add_argument("--baseline", help="result JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change reported by the comparison")
+    parser.add_argument("--fail-on-regression", action="store_true", help=f"exit 1 if {'/'.join(GATED_PHASES)} regress")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print_report(result)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            notes = compare(result, json.load(f), args.threshold)
+        print("\n".join(notes) if notes else "No changes beyond threshold")
+        gated = [n for n in notes if n.startswith("REGRESSION") and n.split()[1].split(".")[0] in GATED_PHASES]
+        if gated and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import json
+import time
+import base64
+import random
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from solders.hash import Hash
+from solders.signature import Signature
+
+# Every token account the stub returns holds this many raw units
+STUB_TOKEN_BALANCE = 10 ** 15
+STUB_LAMPORTS = 10 ** 12
+STUB_BLOCKHASH = str(Hash(hashlib.sha256(b"stub-blockhash").digest()))
+TOKEN_PROGRAM = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+
+
+class StubServer:
+    """Threaded local HTTP server with injected latency and errors.
+
+    Each request sleeps ``latency_ms`` (plus up to ``jitter_ms``) and fails
+    with HTTP 503 with probability ``error_rate``. Requests are counted per
+    ``label`` returned by ``handle``; one that ``handle`` fails on gets a
+    500 and is counted as ``error``.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self) -> "StubServer":
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                time.sleep((stub.latency_ms + random.random() * stub.jitter_ms) / 1000)
+                if stub.error_rate and random.random() < stub.error_rate:
+                    self._reply(503, b'{"error": "injected"}')
+                    return
+                try:
+                    label, payload = stub.handle(self.path, self.headers, body)
+                    status = 200
+                except Exception as e:
+                    label, payload, status = "error", {"error": f"stub: {e!r}"}, 500
+                with stub._lock:
+                    stub.counts[label] = stub.counts.get(label, 0) + 1
+                self._reply(status, json.dumps(payload).encode())
+
+            def _reply(self, status: int, data: bytes):
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Hedged or cancelled requests hang up early
+                    pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts, self.counts = self.counts, {}
+        return counts
+
+    def handle(self, path: str, headers, body: bytes):
+        """Return ``(label, payload)`` for a request; subclasses override it.
+
+        The base server knows no methods and answers with a JSON-RPC
+        "method not found" error.
+        """
+        try:
+            request_id = json.loads(body).get("id")
+        except (ValueError, AttributeError):
+            request_id = None
+        return "unhandled", {"jsonrpc": "2.0", "id": request_id, "error": {"code": -32601, "message": "stub: method not found"}}
+
+
+class StubRPCServer(StubServer):
+    """Solana JSON-RPC stand-in: every account exists and is funded, every transaction lands."""
+
+    def handle(self, path, headers, body):
+        request = json.loads(body)
+        if isinstance(request, list):
+            return "batch", [self._result(r) for r in request]
+        return request["method"], self._result(request)
+
+    def _result(self, request: dict) -> dict:
+        method, params = request["method"], request.get("params", [])
+        context = {"slot": 1000}
+        if method == "getAccountInfo":
+            result = {"context": context, "value": _token_account()}
+        elif method == "getMultipleAccounts":
+            result = {"context": context, "value": [_token_account() for _ in params[0]]}
+        elif method == "getBalance":
+            result = {"context": context, "value": STUB_LAMPORTS}
+        elif method == "getLatestBlockhash":
+            result = {"context": context, "value": {"blockhash": STUB_BLOCKHASH, "lastValidBlockHeight": 1150}}
+        elif method == "getBlockHeight":
+            result = 1000
+        elif method == "getSlot":
+            result = 1000
+        elif method == "sendTransaction":
+            # First signature of the wire transaction: compact-u16 count, then 64 bytes
+            raw = base64.b64decode(params[0])
+            result = str(Signature.from_bytes(raw[1:65]))
+        elif method == "getSignatureStatuses":
+            status = {"slot": 1000, "confirmations": None, "err": None, "status": {"Ok": None}, "confirmationStatus": "finalized"}
+            result = {"context": context, "value": [status for _ in params[0]]}
+        else:
+            return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32601, "message": f"stub: {method} not supported"}}
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+
+class StubPinataServer(StubServer):
+    """Pinata pinFileToIPFS stand-in returning a CID derived from the request body."""
+
+    def handle(self, path, headers, body):
+        return "pinFileToIPFS", {"IpfsHash": "Qm" + hashlib.sha256(body).hexdigest()[:44], "PinSize": len(body)}
+
+
+def _token_account() -> dict:
+    # 165-byte SPL token account; the amount lives at bytes 64..72
+    data = bytearray(165)
+    data[64:72] = STUB_TOKEN_BALANCE.to_bytes(8, "little")
+    data[108] = 1  # initialized
+    return {
+        "data": [base64.b64encode(bytes(data)).decode(), "base64"],
+        "executable": False,
+        "lamports": STUB_LAMPORTS,
+        "owner": TOKEN_PROGRAM,
+        "rentEpoch": 0,
+        "space": 165,
+    }
@@ -0,0 +1,203 @@
+"""Columnar snapshots of every holder of the mint, for airdrops, audits and payout reconciliation.
+
+    python holder_snapshot.py take snapshots/today.npz
+    python holder_snapshot.py diff snapshots/yesterday.npz snapshots/today.npz
+    python holder_snapshot.py reconcile snapshots/today.npz data/claims.log
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Dict, List, Tuple
+import numpy as np
+from solders.pubkey import Pubkey
+from spl_token_utils import HOLDER_SLICE_LENGTH
+
+# One row per token account as returned by the snapshot's data slice
+HOLDER_DTYPE = np.dtype([("owner", "V32"), ("amount", "<u8")])
+assert HOLDER_DTYPE.itemsize == HOLDER_SLICE_LENGTH
+
+
+def owner_keys(wallets: List[str]) -> np.ndarray:
+    """Wallet addresses as a column comparable with ``HolderSnapshot.owners``."""
+    return np.frombuffer(b"".join(bytes(Pubkey.from_string(w)) for w in wallets), dtype="V32")
+
+
+def owner_strings(owners: np.ndarray) -> List[str]:
+    return [str(Pubkey.from_bytes(o.tobytes())) for o in owners]
+
+
+class HolderSnapshot:
+    """Token accounts of one mint as two columns: owner public keys and raw amounts.
+
+    Built from the concatenated owner/amount slices of every account, the
+    columns are views into that buffer. ``holders`` folds accounts into one
+    total per owner (a wallet may hold several token accounts); ``diff`` and
+    ``reconcile`` join on the sorted owner column with ``searchsorted``, so
+    neither does per-account Python work. Raw amounts are u64; deltas are
+    computed as i64, which holds any realistic supply.
+    """
+
+    def __init__(self, mint: str, owners: np.ndarray, amounts: np.ndarray, slot: int = 0, taken_at: float = 0.0):
+        self.mint = mint
+        self.owners = owners
+        self.amounts = amounts
+        self.slot = slot
+        self.taken_at = taken_at
+        self._holders = None
+
+    @classmethod
+    def from_buffer(cls, mint: str, buffer: bytes, slot: int = 0) -> "HolderSnapshot":
+        rows = np.frombuffer(buffer, dtype=HOLDER_DTYPE)
+        return cls(mint, rows["owner"], rows["amount"], slot, time.time())
+
+    @classmethod
+    def load(cls, path: str) -> "HolderSnapshot":
+        with np.load(path) as f:
+            return cls(str(f["mint"]), f["owners"], f["amounts"], int(f["slot"]), float(f["taken_at"]))
+
+    def save(self, path: str) -> None:
+        """Write the columns to an uncompressed ``.npz`` file (compression gains nothing on public keys)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, mint=self.mint, owners=self.owners, amounts=self.amounts, slot=self.slot, taken_at=self.taken_at)
+        os.replace(path + ".tmp", path)
+
+    def __len__(self) -> int:
+        return len(self.owners)
+
+    def holders(self) -> Tuple[np.ndarray, np.ndarray]:
+        """``(owners, balances)``: distinct owners in sorted order and their total raw balance."""
+        if self._holders is None:
+            if not len(self.owners):
+                return self.owners, self.amounts
+            order = np.argsort(self.owners, kind="stable")
+            owners = self.owners[order]
+            starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+            self._holders = owners[starts], np.add.reduceat(self.amounts[order], starts)
+        return self._holders
+
+    def balances_of(self, owners: np.ndarray) -> np.ndarray:
+        """Raw balance of each of ``owners`` (0 for wallets without an account)."""
+        held_owners, held = self.holders()
+        if not len(held_owners):
+            return np.zeros(len(owners), dtype=np.uint64)
+        index = np.minimum(np.searchsorted(held_owners, owners), len(held_owners) - 1)
+        return np.where(held_owners[index] == owners, held[index], 0).astype(np.uint64)
+
+    def summary(self) -> dict:
+        owners, balances = self.holders()
+        return {
+            "mint": self.mint,
+            "slot": self.slot,
+            "taken_at": self.taken_at,
+            "accounts": len(self),
+            "holders": int(np.count_nonzero(balances)),
+            "raw_supply_held": int(balances.sum()),
+        }
+
+    def diff(self, newer: "HolderSnapshot") -> dict:
+        """Owners whose balance changed between this snapshot and ``newer``, largest change first."""
+        owners = np.unique(np.concatenate([self.holders()[0], newer.holders()[0]]))
+        before = self.balances_of(owners).astype(np.int64)
+        after = newer.balances_of(owners).astype(np.int64)
+        changed = np.flatnonzero(before != after)
+        changed = changed[np.argsort(-np.abs(after[changed] - before[changed]), kind="stable")]
+        return {"owners": owners[changed], "before": before[changed], "after": after[changed]}
+
+    def reconcile(self, payouts: Dict[str, int]) -> dict:
+        """Join raw payout totals per wallet against held balances.
+
+        Wallets holding less than they were paid either moved tokens out or
+        were never credited; wallets with no balance at all are listed apart.
+        """
+        wallets = list(payouts)
+        paid = np.fromiter(payouts.values(), dtype=np.uint64, count=len(wallets))
+        held = self.balances_of(owner_keys(wallets)) if wallets else np.zeros(0, dtype=np.uint64)
+        missing = np.flatnonzero(held == 0)
+        short = np.flatnonzero((held > 0) & (held < paid))
+        return {
+            "wallets": len(wallets),
+            "raw_paid": int(paid.sum()),
+            "raw_held_by_paid_wallets": int(held.sum()),
+            "missing": [wallets[i] for i in missing],
+            "short": [{"wallet": wallets[i], "raw_paid": int(paid[i]), "raw_held": int(held[i])} for i in short],
+        }
+
+
+def payouts_from_outbox(path: str, decimals: int) -> Dict[str, int]:
+    """Raw amounts paid per wallet by the sent claims in a claim outbox log and its worker slots.
+
+    The outbox only keeps its most recent finished claims (``keep_done``)
+    after compaction, so older payouts are not counted.
+    """
+    from api.services.claim_service import outbox_paths
+    claims: Dict[str, dict] = {}
+    for slot_path in outbox_paths(path):
+        with open(slot_path, "rb") as f:
+            for line in f:
+                try:
+                    claim = json.loads(line)
+                except ValueError:
+                    break
+                claims[claim["id"]] = claim
+    paid: Dict[str, int] = {}
+    for claim in claims.values():
+        if claim["status"] == "sent":
+            paid[claim["wallet"]] = paid.get(claim["wallet"], 0) + claim["amount"] * 10 ** decimals
+    return paid
+
+
+def main() -> int:
+    from dotenv import load_dotenv
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    take = commands.add_parser("take", help="fetch every holder of MINT and write a snapshot")
+    take.add_argument("out")
+    diff = commands.add_parser("diff", help="list owners whose balance changed between two snapshots")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    diff.add_argument("--limit", type=int, default=20)
+    reconcile = commands.add_parser("reconcile", help="compare sent claims with the balances in a snapshot")
+    reconcile.add_argument("snapshot")
+    reconcile.add_argument("outbox", nargs="?", default=os.getenv("CLAIM_OUTBOX_PATH", os.path.join(os.getenv("POINTS_DATA_DIR", "data"), "claims.log")))
+    reconcile.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.command == "take":
+        from spl_token_utils import SPLTokenManager
+        manager = SPLTokenManager(
+            os.getenv("RPC_URL", "https://api.devnet.solana.com"),
+            os.getenv("MINT", "11111111111111111111111111111111"),
+            int(os.getenv("DECIMALS", "6")),
+        )
+        snapshot = manager.snapshot_holders()
+        snapshot.save(args.out)
+        result = snapshot.summary()
+    elif args.command == "diff":
+        changes = HolderSnapshot.load(args.old).diff(HolderSnapshot.load(args.new))
+        shown = slice(0, args.limit)
+        result = {
+            "changed": len(changes["owners"]),
+            "net_raw_change": int((changes["after"] - changes["before"]).sum()),
+            "largest": [
+                {"wallet": w, "raw_before": int(b), "raw_after": int(a)}
+                for w, b, a in zip(owner_strings(changes["owners"][shown]), changes["before"][shown], changes["after"][shown])
+            ],
+        }
+    else:
+        report = HolderSnapshot.load(args.snapshot).reconcile(payouts_from_outbox(args.outbox, int(os.getenv("DECIMALS", "6"))))
+        result = dict(report, missing_count=len(report["missing"]), short_count=len(report["short"]),
+                      missing=report["missing"][:args.limit], short=report["short"][:args.limit])
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
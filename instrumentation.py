@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import inspect
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Prometheus-style latency histogram with an error counter per label set.
+
+    ``observe`` is one bisect plus a few list increments under a lock, cheap
+    enough to leave on every RPC call and request.
+    """
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.errors_name = name.rsplit("_duration", 1)[0] + "_errors_total"
+        # label values -> [count per bucket..., count above last bucket, sum, errors]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values: Tuple[str, ...], seconds: float, error: bool = False) -> None:
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += seconds
+            if error:
+                series[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} histogram",
+        ]
+        errors = [
+            f"# HELP {self.errors_name} Failed calls counted in {self.name}",
+            f"# TYPE {self.errors_name} counter",
+        ]
+        for label_values, series in sorted(snapshot.items()):
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-2]}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+            errors.append(f"{self.errors_name}{{{labels}}} {series[-1]}")
+        return lines + errors
+
+
+RPC_LATENCY = Histogram("rpc_request_duration_seconds", "Solana RPC call latency by method", ("method",))
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "API request latency by route", ("method", "route"))
+_collectors: List[Callable[[], List[str]]] = []
+
+
+def register_collector(collector: Callable[[], List[str]]) -> None:
+    """Add a callable returning extra exposition lines (gauges, counters) to /metrics."""
+    _collectors.append(collector)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = RPC_LATENCY.render() + HTTP_LATENCY.render()
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# JSON-RPC method name per solders request class, e.g. SendVersionedTransaction -> sendTransaction
+_rpc_methods: Dict[type, str] = {}
+
+
+def _rpc_method(body) -> str:
+    method = _rpc_methods.get(type(body))
+    if method is None:
+        # Every request of a class carries the same method; read it from the first one
+        method = _rpc_methods[type(body)] = json.loads(body.to_json())["method"]
+    return method
+
+
+def instrument_provider(provider) -> None:
+    """Record the latency of every call made through a solana-py HTTP provider.
+
+    Calls are labelled by JSON-RPC method. Transport errors and JSON-RPC
+    error responses both count as errors; cancelled calls are not recorded.
+    """
+    make_request = provider.make_request
+
+    if inspect.iscoroutinefunction(make_request):
+        async def timed_request(body, parser):
+            started = time.perf_counter()
+            try:
+                result = await make_request(body, parser)
+            except Exception:
+                RPC_LATENCY.observe((_rpc_method(body),), time.perf_counter() - started, True)
+                raise
+            RPC_LATENCY.observe((_rpc_method(body),), time.perf_counter() - started, not isinstance(result, parser))
+            return result
+    else:
+        def timed_request(body, parser):
+            started = time.perf_counter()
+            try:
+                result = make_request(body, parser)
+            except Exception:
+                RPC_LATENCY.observe((_rpc_method(body),), time.perf_counter() - started, True)
+                raise
+            RPC_LATENCY.observe((_rpc_method(body),), time.perf_counter() - started, not isinstance(result, parser))
+            return result
+
+    provider.make_request = timed_request
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by method and route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            HTTP_LATENCY.observe((scope["method"], path), time.perf_counter() - started, status[0] >= 500)
+
+
+class EventLog:
+    """Structured JSON-lines logger with sampling of routine events.
+
+    Info events are kept with probability ``sample_rate``; warnings and
+    errors are always written.
+    """
+
+    def __init__(self, name: str = "tokens_demo", sample_rate: float = 1.0):
+        self.sample_rate = sample_rate
+        self.logger = logging.getLogger(name)
+        if not self.logger.handlers:
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger.addHandler(handler)
+            self.logger.setLevel(logging.INFO)
+            self.logger.propagate = False
+
+    def info(self, event: str, **fields) -> None:
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        self._write(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields) -> None:
+        self._write(logging.WARNING, event, fields)
+
+    def error(self, event: str, **fields) -> None:
+        self._write(logging.ERROR, event, fields)
+
+    def _write(self, level: int, event: str, fields: dict) -> None:
+        if not self.logger.isEnabledFor(level):
+            return
+        record = {"ts": round(time.time(), 3), "level": logging.getLevelName(level).lower(), "event": event}
+        record.update(fields)
+        self.logger.log(level, json.dumps(record, default=str))
+
+
+# Shared by every module that logs on the hot path
+log = EventLog(sample_rate=float(os.getenv("LOG_SAMPLE_RATE", "1.0")))
@@ -1,15 +1,32 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+import os
+import asyncio
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
-# Import API routes
-from api.routes.api_router import api_router
-
 # ============== ENV / SETUP ==============
+# Before anything reads configuration
 load_dotenv()
 
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from instrumentation import MetricsMiddleware
+
+# Import API routes; services are built on first use
+from api import services
+from api.routes.api_router import api_router
+
 # ============== APP ==============
-app = FastAPI(title="LYFLYNK Demo (FastAPI + Pinata + Solana)")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Serve at once; resume claims left in the outbox by a previous run in the background
+    startup = asyncio.create_task(services.start_payouts(warm_up=os.getenv("WARM_UP", "0") == "1"))
+    yield
+    # Close pooled RPC and Pinata connections and flush the points log on shutdown
+    startup.cancel()
+    await asyncio.gather(startup, return_exceptions=True)
+    await services.close()
+
+app = FastAPI(title="LYFLYNK Demo (FastAPI + Pinata + Solana)", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -19,6 +36,9 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+# Per-route latency histograms, served at /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Include API routes
 app.include_router(api_router)
 
@@ -1,14 +1,26 @@
 import json
-import base64
-from typing import Optional, Union
+import asyncio
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+import httpx
 from solana.rpc.api import Client
-from solana.rpc.types import TxOpts
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.providers.async_http import AsyncHTTPProvider
+from solana.rpc.providers.core import _after_request_unparsed
+from solana.rpc.types import DataSliceOpts, MemcmpOpts, TxOpts
 from solders.keypair import Keypair
 from solders.pubkey import Pubkey
+from solders.signature import Signature
+from solders.transaction_status import TransactionConfirmationStatus
 from solders.transaction import Transaction
+from solders.hash import Hash
+from solders.message import Message, to_bytes_versioned
 from solana.rpc.commitment import Commitment
-from solders.instruction import Instruction
-from solders.system_program import create_account, CreateAccountParams
+from solders.instruction import Instruction, AccountMeta
 from solders.transaction import VersionedTransaction
 from solders.message import MessageV0
 from solders.address_lookup_table_account import AddressLookupTableAccount
@@ -19,13 +31,59 @@ from spl.token.instructions import (
     TransferParams
 )
 from spl.token.constants import TOKEN_PROGRAM_ID, ASSOCIATED_TOKEN_PROGRAM_ID
+from solders.system_program import ID as SYS_PROGRAM_ID
+from solders.sysvar import RENT
+from instrumentation import instrument_provider, log
 
+if TYPE_CHECKING:
+    from holder_snapshot import HolderSnapshot
 
-class SPLTokenManager:
-    """Manages SPL token operations on Solana blockchain."""
+# Maximum serialized transaction size accepted by the cluster (bytes)
+PACKET_DATA_SIZE = 1232
+# Most accounts, static and loaded from lookup tables, one transaction may lock
+MAX_TX_ACCOUNT_LOCKS = 64
+# getMultipleAccounts accepts at most this many keys per call
+MAX_MULTIPLE_ACCOUNTS = 100
+# A blockhash stays valid for this many blocks after it is produced
+BLOCKHASH_VALID_BLOCKS = 150
+# Approximate block time used to estimate the current block height between refreshes
+SLOT_TIME_SECONDS = 0.4
+# getSignatureStatuses accepts at most this many signatures per call
+MAX_SIGNATURE_STATUSES = 256
+# Base fee charged per transaction signature
+LAMPORTS_PER_SIGNATURE = 5000
+# Rent-exempt deposit for a new 165-byte token account
+ATA_RENT_LAMPORTS = 2039280
+# Token account layout: mint (0:32), owner (32:64), amount (64:72, u64 little-endian)
+TOKEN_ACCOUNT_SIZE = 165
+TOKEN_ACCOUNT_OWNER_OFFSET = 32
+# Owner and amount, the part of each token account a holder snapshot reads
+HOLDER_SLICE_LENGTH = 40
+# Read-only RPC methods that are safe to send to a second endpoint while the first is slow
+HEDGED_RPC_METHODS = {
+    "GetAccountInfo",
+    "GetMultipleAccounts",
+    "GetBalance",
+    "GetTokenAccountBalance",
+    "GetSignatureStatuses",
+    "GetLatestBlockhash",
+    "GetBlockHeight",
+    "GetSlot",
+}
+# Transaction submissions, fanned out to several endpoints
+SEND_RPC_METHODS = {"SendRawTransaction", "SendLegacyTransaction", "SendVersionedTransaction"}
+ADDRESS_LOOKUP_TABLE_PROGRAM_ID = Pubkey.from_string("AddressLookupTab1e1111111111111111111111111")
+# Lookup table accounts start with a 56-byte LookupTableMeta header
+LOOKUP_TABLE_META_SIZE = 56
+LOOKUP_TABLE_MAX_ADDRESSES = 256
+# Addresses per ExtendLookupTable instruction that keep the transaction under the packet limit
+LOOKUP_TABLE_EXTEND_CHUNK = 20
+
+
+class BaseSPLTokenManager:
+    """Instruction building and account parsing shared by the sync and async managers."""
     
-    def __init__(self, rpc_url: str, mint_address: str, decimals: int = 6):
-        self.client = Client(rpc_url)
+    def __init__(self, mint_address: str, decimals: int = 6):
         self.mint_address = Pubkey.from_string(mint_address)
         self.decimals = decimals
         # SPL Token Program ID
@@ -33,6 +91,104 @@ class SPLTokenManager:
         # Associated Token Program ID
         self.associated_token_program_id = Pubkey.from_string("ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL")
     
+    def pack_transfer_instructions(
+        self,
+        payer: Pubkey,
+        payouts: List[Tuple[str, int]],
+        create_atas: Set[Pubkey],
+        lookup_tables: Optional[List[AddressLookupTableAccount]] = None,
+    ) -> List[Tuple[List[Instruction], List[int]]]:
+        """Greedily pack payouts into groups that each fit in a single transaction.
+
+        ``payer`` is both fee payer and source token account owner. Destinations
+        listed in ``create_atas`` get an idempotent ATA creation ahead of their
+        first transfer. With ``lookup_tables`` a v0 transaction using them is
+        measured instead of a legacy one. A group stays within both the packet
+        size and the runtime's account lock limit. Returns
+        ``(instructions, payout_indexes)`` per transaction.
+        """
+        from_ata = get_associated_token_address(payer, self.mint_address)
+        groups: List[Tuple[List[Instruction], List[int]]] = []
+        instructions: List[Instruction] = []
+        indexes: List[int] = []
+        pending_atas = set(create_atas)
+        
+        for i, (wallet, amount) in enumerate(payouts):
+            owner = Pubkey.from_string(wallet)
+            to_ata = get_associated_token_address(owner, self.mint_address)
+            payout_instructions = []
+            if to_ata in pending_atas:
+                payout_instructions.append(create_associated_token_account_idempotent(payer=payer, owner=owner, mint=self.mint_address))
+            payout_instructions.append(transfer(TransferParams(
+                source=from_ata,
+                dest=to_ata,
+                owner=payer,
+                amount=amount,
+                program_id=TOKEN_PROGRAM_ID
+            )))
+            
+            if instructions and not transaction_fits(payer, instructions + payout_instructions, lookup_tables):
+                groups.append((instructions, indexes))
+                instructions, indexes = [], []
+            if not transaction_fits(payer, payout_instructions, lookup_tables):
+                raise Exception(f"Payout to {wallet} does not fit in a single transaction")
+            
+            instructions.extend(payout_instructions)
+            indexes.append(i)
+            pending_atas.discard(to_ata)
+        
+        if instructions:
+            groups.append((instructions, indexes))
+        return groups
+    
+    def _build_transaction(self, payer: Keypair, instructions: List[Instruction], recent_blockhash: Hash) -> Transaction:
+        """Build a legacy transaction paid for and signed by ``payer``."""
+        return Transaction.new_signed_with_payer(instructions, payer.pubkey(), [payer], recent_blockhash)
+    
+    def parse_token_amount(self, account_data: bytes) -> int:
+        """Decode the balance of a token account from its raw data."""
+        if len(account_data) < 72:
+            return 0
+        # Token account balance is stored at offset 64-72 (8 bytes, little endian)
+        return int.from_bytes(account_data[64:72], byteorder='little')
+    
+    def parse_mint_info(self, account_data: bytes) -> dict:
+        """Decode mint account data (simplified - in production you'd use proper parsing)."""
+        if len(account_data) < 82:  # Minimum size for mint account
+            raise Exception("Invalid mint account data")
+        
+        # Extract supply (bytes 36-44, little endian)
+        supply_bytes = account_data[36:44]
+        supply = int.from_bytes(supply_bytes, byteorder='little')
+        
+        # Extract decimals (byte 44)
+        decimals = account_data[44]
+        
+        # Extract mint authority (bytes 4-36)
+        mint_authority_bytes = account_data[4:36]
+        mint_authority = Pubkey.from_bytes(mint_authority_bytes) if any(mint_authority_bytes) else None
+        
+        # Extract freeze authority (bytes 50-82)
+        freeze_authority_bytes = account_data[50:82]
+        freeze_authority = Pubkey.from_bytes(freeze_authority_bytes) if any(freeze_authority_bytes) else None
+        
+        return {
+            "mint_address": str(self.mint_address),
+            "supply": supply,
+            "decimals": decimals,
+            "mint_authority": str(mint_authority) if mint_authority else None,
+            "freeze_authority": str(freeze_authority) if freeze_authority else None,
+        }
+
+
+class SPLTokenManager(BaseSPLTokenManager):
+    """Manages SPL token operations on Solana blockchain."""
+    
+    def __init__(self, rpc_url: str, mint_address: str, decimals: int = 6):
+        super().__init__(mint_address, decimals)
+        self.client = Client(rpc_url)
+        instrument_provider(self.client._provider)
+    
     def get_token_balance(self, wallet_address: str) -> int:
         """Get token balance for a wallet address."""
         try:
@@ -49,18 +205,10 @@ class SPLTokenManager:
                 return 0
             
             # Parse the token account data
-            account_data = account_info.value.data
-            if len(account_data) < 64:
-                return 0
-                
-            # Token account balance is stored at offset 64-72 (8 bytes, little endian)
-            balance_bytes = account_data[64:72]
-            balance = int.from_bytes(balance_bytes, byteorder='little')
-            
-            return balance
+            return self.parse_token_amount(account_info.value.data)
             
         except Exception as e:
-            print(f"Error getting token balance: {e}")
+            log.warning("token_balance_failed", wallet=wallet_address, error=str(e))
             return 0
     
     def create_associated_token_account(self, payer: Keypair, owner: Pubkey) -> str:
@@ -72,7 +220,7 @@ class SPLTokenManager:
             # Check if ATA already exists
             account_info = self.client.get_account_info(ata_address)
             if account_info.value:
-                print(f"ATA already exists: {ata_address}")
+                log.info("ata_exists", ata=str(ata_address))
                 return str(ata_address)
             
             # Create the instruction to create the ATA
@@ -85,20 +233,13 @@ class SPLTokenManager:
             # Get recent blockhash
             recent_blockhash = self.client.get_latest_blockhash(commitment=Commitment("confirmed"))
             
-            # Create transaction
-            transaction = Transaction()
-            transaction.add(instruction)
-            transaction.recent_blockhash = recent_blockhash.value.blockhash
-            transaction.fee_payer = payer.pubkey()
-            
-            # Sign and send transaction
-            transaction.sign(payer)
+            # Create and sign transaction
+            transaction = self._build_transaction(payer, [instruction], recent_blockhash.value.blockhash)
             
             # Send transaction
-            result = self.client.send_transaction(transaction, opts=TxOpts(skip_preflight=False, preflight_commitment=Commitment("confirmed")))
+            result = self.client.send_raw_transaction(bytes(transaction), opts=TxOpts(skip_preflight=False, preflight_commitment=Commitment("confirmed")))
             
-            print(f"✅ Created ATA: {ata_address}")
-            print(f"📝 Transaction: {result.value}")
+            log.info("ata_created", ata=str(ata_address), tx=str(result.value))
             
             return str(ata_address)
             
@@ -117,7 +258,7 @@ class SPLTokenManager:
             # Check if destination ATA exists, create if not
             to_account_info = self.client.get_account_info(to_ata)
             if not to_account_info.value:
-                print(f"Creating ATA for destination: {to_ata}")
+                log.info("ata_create_needed", ata=str(to_ata))
                 self.create_associated_token_account(from_keypair, to_wallet_pubkey)
             
             # Create transfer instruction
@@ -133,20 +274,13 @@ class SPLTokenManager:
             # Get recent blockhash
             recent_blockhash = self.client.get_latest_blockhash(commitment=Commitment("confirmed"))
             
-            # Create transaction
-            transaction = Transaction()
-            transaction.add(transfer_instruction)
-            transaction.recent_blockhash = recent_blockhash.value.blockhash
-            transaction.fee_payer = from_keypair.pubkey()
-            
-            # Sign and send transaction
-            transaction.sign(from_keypair)
+            # Create and sign transaction
+            transaction = self._build_transaction(from_keypair, [transfer_instruction], recent_blockhash.value.blockhash)
             
             # Send transaction
-            result = self.client.send_transaction(transaction, opts=TxOpts(skip_preflight=False, preflight_commitment=Commitment("confirmed")))
+            result = self.client.send_raw_transaction(bytes(transaction), opts=TxOpts(skip_preflight=False, preflight_commitment=Commitment("confirmed")))
             
-            print(f"✅ Transferred {amount} tokens from {from_ata} to {to_ata}")
-            print(f"📝 Transaction: {result.value}")
+            log.info("transfer_sent", source=str(from_ata), dest=str(to_ata), amount=amount, tx=str(result.value))
             
             return str(result.value)
             
@@ -162,35 +296,1196 @@ class SPLTokenManager:
             if not mint_info.value:
                 raise Exception("Mint account not found")
             
-            # Parse mint data (simplified - in production you'd use proper parsing)
-            account_data = mint_info.value.data
-            if len(account_data) < 82:  # Minimum size for mint account
-                raise Exception("Invalid mint account data")
+            return self.parse_mint_info(mint_info.value.data)
+        except Exception as e:
+            raise Exception(f"Failed to get mint info: {str(e)}")
+    
+    def snapshot_holders(self) -> "HolderSnapshot":
+        """Fetch every token account of the mint as a columnar ``HolderSnapshot``.
+
+        One getProgramAccounts call, filtered by account size and mint, returns
+        just the owner and amount bytes of each account; the joined buffer is
+        decoded by NumPy views rather than per-account slicing.
+        """
+        # NumPy stays out of the API server's import path
+        from holder_snapshot import HolderSnapshot
+        slot = self.client.get_slot(commitment=Commitment("confirmed")).value
+        resp = self.client.get_program_accounts(
+            TOKEN_PROGRAM_ID,
+            commitment=Commitment("confirmed"),
+            encoding="base64",
+            data_slice=DataSliceOpts(offset=TOKEN_ACCOUNT_OWNER_OFFSET, length=HOLDER_SLICE_LENGTH),
+            filters=[TOKEN_ACCOUNT_SIZE, MemcmpOpts(offset=0, bytes=str(self.mint_address))],
+        )
+        buffer = b"".join(keyed.account.data for keyed in resp.value)
+        return HolderSnapshot.from_buffer(str(self.mint_address), buffer, slot)
+
+
+class PooledAsyncHTTPProvider(AsyncHTTPProvider):
+    """Async HTTP RPC provider backed by a pooled keep-alive httpx client."""
+    
+    def __init__(
+        self,
+        endpoint: str,
+        timeout: float = 10,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30,
+    ):
+        super().__init__(endpoint, timeout=timeout)
+        self.session = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
+
+
+class RPCEndpoint:
+    """One RPC node with its own connection pool and latency/error statistics."""
+    
+    def __init__(
+        self,
+        url: str,
+        session: httpx.AsyncClient,
+        alpha: float = 0.2,
+        window: int = 256,
+        error_penalty: float = 1.0,
+        error_half_life: float = 10.0,
+    ):
+        self.url = url
+        self.session = session
+        self.alpha = alpha
+        self.error_penalty = error_penalty
+        self.error_half_life = error_half_life
+        self.latency = 0.0  # EWMA of successful call latency, seconds
+        self._error_rate = 0.0  # EWMA of the failure indicator as of _error_at
+        self._error_at = time.monotonic()
+        self.samples: deque = deque(maxlen=window)
+        self.requests = 0
+        self.failures = 0
+    
+    @property
+    def error_rate(self) -> float:
+        """Failure EWMA, decaying while the endpoint is idle so it gets retried."""
+        return self._error_rate * 0.5 ** ((time.monotonic() - self._error_at) / self.error_half_life)
+    
+    def record(self, elapsed: float, ok: bool) -> None:
+        self.requests += 1
+        self._error_rate = self.error_rate + self.alpha * ((0.0 if ok else 1.0) - self.error_rate)
+        self._error_at = time.monotonic()
+        if ok:
+            self.latency = elapsed if not self.samples else self.latency + self.alpha * (elapsed - self.latency)
+            self.samples.append(elapsed)
+        else:
+            self.failures += 1
+    
+    def score(self) -> float:
+        """Expected time per successful call plus an error penalty; lower is better."""
+        error_rate = self.error_rate
+        return self.latency / max(1.0 - error_rate, 0.05) + error_rate * self.error_penalty
+    
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self.samples) < 10:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+    
+    def stats(self) -> dict:
+        return {
+            "url": self.url,
+            "latency_ms": round(self.latency * 1000, 2),
+            "p95_ms": round((self.percentile(0.95) or 0.0) * 1000, 2),
+            "error_rate": round(self.error_rate, 4),
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+class MultiEndpointAsyncHTTPProvider(AsyncHTTPProvider):
+    """Async HTTP RPC provider that spreads calls over several endpoints.
+
+    Each call goes to the endpoint with the best EWMA latency adjusted for its
+    error rate, failing over to the next one on transport or HTTP errors.
+    Idempotent reads (``HEDGED_RPC_METHODS``) are hedged: if the first
+    endpoint has not answered within its ``hedge_percentile`` latency, the
+    same request goes to the next endpoint and the first answer wins.
+    Transaction sends go to the ``send_fanout`` best endpoints at once.
+    """
+    
+    def __init__(
+        self,
+        endpoints: List[str],
+        timeout: float = 10,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30,
+        hedge_percentile: float = 0.95,
+        hedge_delay: float = 0.25,
+        min_hedge_delay: float = 0.02,
+        send_fanout: int = 2,
+    ):
+        super().__init__(endpoints[0], timeout=timeout)
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.endpoints = [RPCEndpoint(url, httpx.AsyncClient(timeout=timeout, limits=limits)) for url in endpoints]
+        self.session = self.endpoints[0].session
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.send_fanout = send_fanout
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._background: Set[asyncio.Task] = set()
+    
+    def __str__(self) -> str:
+        return f"Async HTTP RPC pool {[e.url for e in self.endpoints]}"
+    
+    async def make_request_unparsed(self, body) -> str:
+        method = type(body).__name__
+        content = body.to_json()
+        ranked = self.ranked()
+        if method in SEND_RPC_METHODS:
+            return await self._fan_out(content, ranked[:self.send_fanout], ranked[self.send_fanout:])
+        if method in HEDGED_RPC_METHODS:
+            return await self._race(content, ranked, self._hedge_delay(ranked[0]), max_hedges=1)
+        return await self._race(content, ranked, None, max_hedges=0)
+    
+    async def make_batch_request_unparsed(self, reqs) -> str:
+        content = self._before_batch_request(reqs)["content"]
+        return await self._race(content, self.ranked(), None, max_hedges=0)
+    
+    def ranked(self) -> List[RPCEndpoint]:
+        """Endpoints from best to worst."""
+        return sorted(self.endpoints, key=RPCEndpoint.score)
+    
+    def stats(self) -> dict:
+        return {
+            "endpoints": [e.stats() for e in self.ranked()],
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+    
+    async def close(self) -> None:
+        for task in list(self._background):
+            task.cancel()
+        for endpoint in self.endpoints:
+            await endpoint.session.aclose()
+    
+    def _hedge_delay(self, endpoint: RPCEndpoint) -> float:
+        observed = endpoint.percentile(self.hedge_percentile)
+        return self.hedge_delay if observed is None else max(observed, self.min_hedge_delay)
+    
+    async def _call(self, endpoint: RPCEndpoint, content: str) -> str:
+        headers = {"Content-Type": "application/json", **(self.extra_headers or {})}
+        started = time.perf_counter()
+        try:
+            raw = _after_request_unparsed(await endpoint.session.post(endpoint.url, headers=headers, content=content))
+        except httpx.HTTPError:
+            endpoint.record(time.perf_counter() - started, ok=False)
+            raise
+        endpoint.record(time.perf_counter() - started, ok=True)
+        return raw
+    
+    async def _race(self, content: str, ranked: List[RPCEndpoint], delay: Optional[float], max_hedges: int) -> str:
+        """Try endpoints in order, hedging after ``delay`` and failing over on errors."""
+        remaining = list(ranked)
+        first = remaining.pop(0)
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(self._call(first, content))
+        pending = {primary}
+        hedges = 0
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                timeout = delay if remaining and hedges < max_hedges else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # First endpoint is slower than usual: race the next one
+                    hedges += 1
+                    self.hedges += 1
+                    pending.add(asyncio.ensure_future(self._call(remaining.pop(0), content)))
+                    continue
+                for task in done:
+                    if task.exception() is None:
+                        if hedges and task is not primary:
+                            self.hedge_wins += 1
+                            if primary in pending:
+                                # Cancelled below, so _call never records it; the time it
+                                # had taken is a lower bound on its latency
+                                first.record(time.perf_counter() - started, ok=True)
+                        return task.result()
+                    error = task.exception()
+                if not pending and remaining:
+                    pending.add(asyncio.ensure_future(self._call(remaining.pop(0), content)))
+        finally:
+            for task in pending:
+                task.cancel()
+        raise error
+    
+    async def _fan_out(self, content: str, targets: List[RPCEndpoint], fallbacks: List[RPCEndpoint]) -> str:
+        """Send to every target at once; return the first success, letting the rest finish."""
+        pending = {asyncio.ensure_future(self._call(e, content)) for e in targets}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        # Extra copies of the transaction still propagate; keep them running
+                        self._background.add(other)
+                        other.add_done_callback(self._finish_background)
+                    return task.result()
+                error = task.exception()
+        if fallbacks:
+            return await self._race(content, fallbacks, None, max_hedges=0)
+        raise error
+    
+    def _finish_background(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled():
+            task.exception()
+
+
+class KnownATAIndex:
+    """Persistent set of wallets whose associated token account is known to exist.
+
+    Entries are appended to ``path`` (one wallet per line) as they are learned
+    and reloaded on startup. Owners can close their ATAs, so a wallet whose
+    payout fails is dropped again (a ``-wallet`` line) and its next payout
+    carries the idempotent create.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._wallets: Set[str] = set()
+        self._lock = threading.Lock()
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    wallet = line.strip()
+                    if wallet.startswith("-"):
+                        self._wallets.discard(wallet[1:])
+                    elif wallet:
+                        self._wallets.add(wallet)
+    
+    def __contains__(self, wallet: str) -> bool:
+        return wallet in self._wallets
+    
+    def __len__(self) -> int:
+        return len(self._wallets)
+    
+    def add(self, wallet: str) -> None:
+        """Record that ``wallet`` has an ATA."""
+        self.add_many([wallet])
+    
+    def add_many(self, wallets) -> None:
+        """Record several wallets at once, persisting only new entries."""
+        with self._lock:
+            new = [w for w in dict.fromkeys(wallets) if w not in self._wallets]
+            if not new:
+                return
+            self._wallets.update(new)
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write("".join(f"{w}\n" for w in new))
+    
+    def discard_many(self, wallets) -> None:
+        """Forget wallets whose ATA may no longer exist."""
+        with self._lock:
+            gone = [w for w in dict.fromkeys(wallets) if w in self._wallets]
+            if not gone:
+                return
+            self._wallets.difference_update(gone)
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write("".join(f"-{w}\n" for w in gone))
+
+
+class BalanceCache:
+    """TTL cache with bounded LRU eviction for token balances.
+
+    Concurrent misses for the same wallet share one in-flight load. Entries
+    invalidated while a load is in flight are not overwritten by its result.
+    """
+    
+    def __init__(self, ttl: float = 2.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+    
+    async def get(self, wallet: str, loader: Callable[[], Awaitable[int]]) -> int:
+        """Return the cached balance for ``wallet`` or load it with ``loader``."""
+        entry = self._entries.get(wallet)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(wallet)
+            self.hits += 1
+            return entry[1]
+        
+        task = self._in_flight.get(wallet)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(wallet, loader))
+            self._in_flight[wallet] = task
+        else:
+            self.coalesced += 1
+        # Shield so one cancelled caller does not cancel the shared load
+        return await asyncio.shield(task)
+    
+    def peek(self, wallet: str) -> Optional[int]:
+        """Return the cached balance for ``wallet`` if fresh, else None, counting a hit or miss."""
+        entry = self._entries.get(wallet)
+        if entry is None or entry[0] <= time.monotonic():
+            self.misses += 1
+            return None
+        self._entries.move_to_end(wallet)
+        self.hits += 1
+        return entry[1]
+    
+    async def _load(self, wallet: str, loader: Callable[[], Awaitable[int]]) -> int:
+        task = asyncio.current_task()
+        try:
+            value = await loader()
+        finally:
+            current = self._in_flight.get(wallet) is task
+            if current:
+                del self._in_flight[wallet]
+        if current:
+            self.put(wallet, value)
+        return value
+    
+    def put(self, wallet: str, balance: int) -> None:
+        """Store a freshly read balance."""
+        self._entries[wallet] = (time.monotonic() + self.ttl, balance)
+        self._entries.move_to_end(wallet)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def invalidate(self, *wallets: str) -> None:
+        """Drop cached and in-flight balances for ``wallets`` after a write."""
+        for wallet in wallets:
+            self._entries.pop(wallet, None)
+            self._in_flight.pop(wallet, None)
+    
+    def stats(self) -> dict:
+        """Hit/miss counters for TTL tuning."""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "ttl_seconds": self.ttl,
+        }
+
+
+class BlockhashProvider:
+    """Keeps a recent blockhash warm so transaction builders skip the fetch.
+
+    A background task refreshes the hash every ``refresh_interval`` seconds.
+    ``get`` serves the cached hash and only fetches synchronously when the
+    cached one is within ``expiry_margin`` blocks of its last valid height.
+    """
+    
+    def __init__(self, client: AsyncClient, refresh_interval: float = 1.0, expiry_margin: int = 30):
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self.expiry_margin = expiry_margin
+        self.blockhash: Optional[Hash] = None
+        self.last_valid_block_height = 0
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self) -> None:
+        """Start the background refresh loop on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Stop the background refresh loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def estimated_block_height(self) -> int:
+        """Estimate the current block height from the last fetch and elapsed time."""
+        fetched_height = self.last_valid_block_height - BLOCKHASH_VALID_BLOCKS
+        return fetched_height + int((time.monotonic() - self._fetched_at) / SLOT_TIME_SECONDS)
+    
+    def is_near_expiry(self) -> bool:
+        """Whether the cached blockhash is missing or about to expire."""
+        if self.blockhash is None:
+            return True
+        return self.last_valid_block_height - self.estimated_block_height() <= self.expiry_margin
+    
+    async def get(self) -> Tuple[Hash, int]:
+        """Return ``(blockhash, last_valid_block_height)`` for a new transaction."""
+        self.start()
+        if self.is_near_expiry():
+            await self.refresh()
+        return self.blockhash, self.last_valid_block_height
+    
+    async def refresh(self) -> None:
+        """Fetch the latest blockhash; concurrent callers share one request."""
+        fetched_at = time.monotonic()
+        async with self._lock:
+            # Another caller refreshed while we waited for the lock
+            if self._fetched_at >= fetched_at:
+                return
+            resp = await self.client.get_latest_blockhash(commitment=Commitment("confirmed"))
+            self.blockhash = resp.value.blockhash
+            self.last_valid_block_height = resp.value.last_valid_block_height
+            self._fetched_at = time.monotonic()
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                log.warning("blockhash_refresh_failed", error=str(e))
+            await asyncio.sleep(self.refresh_interval)
+
+
+class ConfirmationTracker:
+    """Tracks submitted transactions until they confirm, fail or expire.
+
+    A background task polls every in-flight signature with batched
+    getSignatureStatuses calls (256 per call). Unconfirmed transactions are
+    rebroadcast every ``rebroadcast_interval`` seconds while their blockhash is
+    still valid. A transaction is only declared expired once the chain is past
+    its last valid block height, two status polls taken after that find no
+    trace of it in the node's recent status cache, and a lookup through the
+    full transaction history finds none either; a signature with any status
+    is never replaced. The history lookup catches transactions that landed
+    but dropped out of the cache, e.g. during an RPC outage, so they are not
+    sent a second time. Expired
+    transactions are, up to ``max_resubmits`` times, re-signed with a fresh
+    blockhash through ``resubmit``; the replacement signature is recorded on
+    the expired one. Transactions tracked without a payer are never re-signed
+    here: their sender owns that decision and learns the outcome from
+    ``settled``.
+    """
+    
+    def __init__(
+        self,
+        client: AsyncClient,
+        poll_interval: float = 1.0,
+        rebroadcast_interval: float = 2.0,
+        max_resubmits: int = 2,
+        max_records: int = 100000,
+    ):
+        self.client = client
+        self.poll_interval = poll_interval
+        self.rebroadcast_interval = rebroadcast_interval
+        self.max_resubmits = max_resubmits
+        self.max_records = max_records
+        # Called as resubmit(payer, instructions, attempt) -> new signature
+        self.resubmit: Optional[Callable[..., Awaitable[str]]] = None
+        self._records: "OrderedDict[str, dict]" = OrderedDict()
+        # signature -> futures resolved with its record once it settles
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        # signature -> (raw transaction, payer, instructions, last sent time,
+        # unknown in a poll after expiry)
+        self._pending: Dict[str, list] = {}
+        self._task: Optional[asyncio.Task] = None
+    
+    def track(
+        self,
+        signature: str,
+        raw_transaction: Optional[bytes],
+        last_valid_block_height: int,
+        payer: Optional[Keypair],
+        instructions: Optional[List[Instruction]],
+        attempt: int = 0,
+    ) -> None:
+        """Start tracking a transaction that was just sent.
+
+        Without ``raw_transaction`` it is not rebroadcast; without ``payer``
+        it is not resubmitted once expired.
+        """
+        self._records[signature] = {
+            "signature": signature,
+            "status": "submitted",
+            "err": None,
+            "slot": None,
+            "submitted_at": time.time(),
+            "last_valid_block_height": last_valid_block_height,
+            "rebroadcasts": 0,
+            "attempt": attempt,
+            "replaced_by": None,
+        }
+        self._pending[signature] = [raw_transaction, payer, instructions, time.monotonic(), False]
+        # Forget the oldest settled records; in-flight ones are always kept
+        while len(self._records) > self.max_records:
+            oldest = next(iter(self._records))
+            if oldest in self._pending:
+                break
+            self._records.popitem(last=False)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    def status(self, signature: str) -> Optional[dict]:
+        """Latest known status for ``signature``, or None if it was never tracked."""
+        record = self._records.get(signature)
+        return dict(record) if record is not None else None
+    
+    def settled(self, signature: str) -> asyncio.Future:
+        """Future resolved with the record of tracked ``signature`` once it is confirmed, failed or expired."""
+        future = asyncio.get_running_loop().create_future()
+        if signature in self._pending:
+            self._waiters.setdefault(signature, []).append(future)
+        else:
+            future.set_result(dict(self._records[signature]))
+        return future
+    
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+    
+    async def stop(self) -> None:
+        """Stop the background polling loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def poll(self) -> None:
+        """Refresh statuses of all in-flight signatures, rebroadcasting or expiring as needed."""
+        if not self._pending:
+            return
+        # Read the height before the statuses: a signature still unknown after
+        # this height passed its last valid block height can no longer land
+        block_height = (await self.client.get_block_height(commitment=Commitment("confirmed"))).value
+        signatures = list(self._pending)
+        statuses = await self._get_statuses(signatures)
+        now = time.monotonic()
+        expired: List[str] = []
+        rebroadcast: List[str] = []
+        for signature, status in zip(signatures, statuses):
+            record = self._records[signature]
+            pending = self._pending[signature]
+            if status is not None:
+                # Seen by the cluster: never expired or replaced while it has a status
+                pending[4] = False
+                if self._apply_status(signature, status):
+                    continue
+            if block_height <= record["last_valid_block_height"]:
+                if pending[0] is not None and now - pending[3] >= self.rebroadcast_interval:
+                    rebroadcast.append(signature)
+            elif status is None:
+                if pending[4]:
+                    # Unknown in two polls taken after expiry
+                    expired.append(signature)
+                else:
+                    pending[4] = True
+
+        for signature in rebroadcast:
+            pending = self._pending[signature]
+            try:
+                await self.client.send_raw_transaction(pending[0], opts=TxOpts(skip_preflight=True, max_retries=0))
+                pending[3] = now
+                self._records[signature]["rebroadcasts"] += 1
+            except Exception as e:
+                log.warning("rebroadcast_failed", signature=signature, error=str(e))
+        if expired:
+            # The status cache only covers recent slots; a transaction that landed
+            # earlier is only found in the full history and must not be re-signed
+            history = await self._get_statuses(expired, search_transaction_history=True)
+            for signature, status in zip(expired, history):
+                if status is not None:
+                    self._pending[signature][4] = False
+                    self._apply_status(signature, status)
+            expired = [signature for signature, status in zip(expired, history) if status is None]
+        for signature in expired:
+            _, payer, instructions, _, _ = self._pending[signature]
+            record = self._records[signature]
+            record["status"] = "expired"
+            if payer is not None and self.resubmit is not None and record["attempt"] < self.max_resubmits:
+                try:
+                    record["replaced_by"] = await self.resubmit(payer, instructions, record["attempt"] + 1)
+                except Exception as e:
+                    log.warning("resubmit_failed", signature=signature, error=str(e))
+            self._settle(signature)
+    
+    async def _get_statuses(self, signatures: List[str], search_transaction_history: bool = False) -> list:
+        """Statuses of ``signatures`` in order, None for unknown ones, in chunks of 256."""
+        chunks = [signatures[i:i + MAX_SIGNATURE_STATUSES] for i in range(0, len(signatures), MAX_SIGNATURE_STATUSES)]
+        responses = await asyncio.gather(*(
+            self.client.get_signature_statuses(
+                [Signature.from_string(sig) for sig in chunk],
+                search_transaction_history=search_transaction_history,
+            )
+            for chunk in chunks
+        ))
+        return [status for resp in responses for status in resp.value]
+    
+    def _apply_status(self, signature: str, status) -> bool:
+        """Record a status seen for ``signature``; returns True if that settled it."""
+        record = self._records[signature]
+        record["slot"] = status.slot
+        if status.err is not None:
+            record["status"] = "failed"
+            record["err"] = str(status.err)
+            self._settle(signature)
+            return True
+        if status.confirmation_status in (TransactionConfirmationStatus.Confirmed, TransactionConfirmationStatus.Finalized):
+            record["status"] = "confirmed"
+            self._settle(signature)
+            return True
+        record["status"] = "processed"
+        return False
+    
+    def _settle(self, signature: str) -> None:
+        del self._pending[signature]
+        record = dict(self._records[signature])
+        for future in self._waiters.pop(signature, ()):
+            if not future.done():
+                future.set_result(record)
+    
+    async def _run(self) -> None:
+        while self._pending:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll()
+            except Exception as e:
+                log.warning("confirmation_poll_failed", error=str(e))
+
+
+class LookupTableManager:
+    """Creates, extends and caches address lookup tables for v0 payouts.
+
+    Tables are owned and paid for by ``authority`` (the treasury). The base
+    set - treasury ATA, mint and the token, system and ATA programs - goes in
+    first; destination ATAs are added once paid ``promote_after`` times.
+    Local table contents only ever come from on-chain reads, so compiled
+    indexes always match the chain. The verified contents are cached in
+    ``cache_path`` (JSON) so restarts need no lookup.
+    """
+    
+    def __init__(
+        self,
+        manager: "AsyncSPLTokenManager",
+        authority: Keypair,
+        cache_path: Optional[str] = None,
+        promote_after: int = 3,
+        warmup: float = 2.0,
+        extra_addresses: Optional[List[Pubkey]] = None,
+    ):
+        self.manager = manager
+        self.authority = authority
+        self.cache_path = cache_path
+        self.promote_after = promote_after
+        self.warmup = warmup
+        # table address -> addresses verified on chain, in table order
+        self._tables: Dict[Pubkey, List[Pubkey]] = {}
+        # table address -> addresses sent in extensions not yet verified
+        self._reserved: Dict[Pubkey, int] = {}
+        self._known: Set[Pubkey] = set()
+        self._payout_counts: Dict[Pubkey, int] = {}
+        self._lock = asyncio.Lock()
+        self._tasks: Set[asyncio.Task] = set()
+        self.base_addresses = [
+            get_associated_token_address(authority.pubkey(), manager.mint_address),
+            manager.mint_address,
+            TOKEN_PROGRAM_ID,
+            ASSOCIATED_TOKEN_PROGRAM_ID,
+            SYS_PROGRAM_ID,
+            RENT,
+        ] + list(extra_addresses or [])
+        if cache_path and os.path.dirname(cache_path):
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path) as f:
+                for table, addresses in json.load(f).items():
+                    self._tables[Pubkey.from_string(table)] = [Pubkey.from_string(a) for a in addresses]
+            for addresses in self._tables.values():
+                self._known.update(addresses)
+    
+    def accounts(self) -> List[AddressLookupTableAccount]:
+        """Lookup tables usable when compiling a v0 message."""
+        return [AddressLookupTableAccount(key, addresses) for key, addresses in self._tables.items() if addresses]
+    
+    def note_payouts(self, wallets: List[str]) -> None:
+        """Count payouts and schedule frequently paid ATAs (and the base set) for extension."""
+        promote = [a for a in self.base_addresses if a not in self._known]
+        for wallet in wallets:
+            ata = get_associated_token_address(Pubkey.from_string(wallet), self.manager.mint_address)
+            if ata in self._known:
+                continue
+            self._payout_counts[ata] = self._payout_counts.get(ata, 0) + 1
+            if self._payout_counts[ata] >= self.promote_after:
+                promote.append(ata)
+        if promote:
+            self._known.update(promote)
+            task = asyncio.get_running_loop().create_task(self._extend(list(dict.fromkeys(promote))))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def refresh(self, table: Pubkey) -> None:
+        """Reload ``table``'s contents from chain."""
+        resp = await self.manager.client.get_account_info(table, commitment=Commitment("confirmed"))
+        if resp.value is not None:
+            self._tables[table] = parse_lookup_table_addresses(resp.value.data)
+            self._known.update(self._tables[table])
+    
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+    
+    async def _extend(self, addresses: List[Pubkey]) -> None:
+        async with self._lock:
+            try:
+                for start in range(0, len(addresses), LOOKUP_TABLE_EXTEND_CHUNK):
+                    await self._extend_chunk(addresses[start:start + LOOKUP_TABLE_EXTEND_CHUNK])
+            except Exception as e:
+                log.warning("lookup_table_extend_failed", error=str(e))
+                # Forget the unverified addresses (and tables never created) so they are retried later
+                self._tables = {t: a for t, a in self._tables.items() if a}
+                self._known = {a for addresses in self._tables.values() for a in addresses}
+                self._reserved.clear()
+                return
+            self._save()
+    
+    async def _extend_chunk(self, chunk: List[Pubkey]) -> None:
+        payer = self.authority.pubkey()
+        table = next(
+            (t for t, a in self._tables.items() if len(a) + self._reserved.get(t, 0) + len(chunk) <= LOOKUP_TABLE_MAX_ADDRESSES),
+            None,
+        )
+        instructions = []
+        if table is None:
+            # New table: create and fill it in the same transaction
+            slot = (await self.manager.client.get_slot(commitment=Commitment("finalized"))).value
+            create, table = create_lookup_table_instruction(payer, payer, slot)
+            instructions.append(create)
+            self._tables[table] = []
+        instructions.append(extend_lookup_table_instruction(table, payer, payer, chunk))
+        self._reserved[table] = self._reserved.get(table, 0) + len(chunk)
+        
+        # Not re-signed on expiry: a create derives the table from a slot that is stale by then
+        signature = await self.manager._send_instructions(self.authority, instructions, resubmit=False)
+        record = await self.manager.confirmations.settled(signature)
+        if record["status"] != "confirmed":
+            raise Exception(f"Lookup table transaction {signature} {record['status']}")
+        log.info("lookup_table_extended", table=str(table), addresses=len(chunk), tx=signature)
+        # Extended addresses become usable a slot later; only trust what the chain returns
+        await asyncio.sleep(self.warmup)
+        await self.refresh(table)
+        self._reserved[table] -= len(chunk)
+    
+    def _save(self) -> None:
+        if not self.cache_path:
+            return
+        with open(self.cache_path + ".tmp", "w") as f:
+            json.dump({str(t): [str(a) for a in addresses] for t, addresses in self._tables.items() if addresses}, f)
+        os.replace(self.cache_path + ".tmp", self.cache_path)
+
+
+class AsyncSPLTokenManager(BaseSPLTokenManager):
+    """Async variant of SPLTokenManager sharing one pooled connection set per process."""
+    
+    def __init__(
+        self,
+        rpc_url: Union[str, List[str]],
+        mint_address: str,
+        decimals: int = 6,
+        timeout: float = 10,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        blockhash_refresh_interval: float = 1.0,
+        known_atas: Optional["KnownATAIndex"] = None,
+        balance_cache: Optional["BalanceCache"] = None,
+    ):
+        super().__init__(mint_address, decimals)
+        # Wallets whose ATA exists; transfers to them skip the existence probe
+        self.known_atas = known_atas if known_atas is not None else KnownATAIndex()
+        # Short-lived balance cache in front of get_token_balance
+        self.balance_cache = balance_cache if balance_cache is not None else BalanceCache()
+        # Several URLs get a latency-aware pool with hedged reads and send fan-out
+        rpc_urls = [rpc_url] if isinstance(rpc_url, str) else list(rpc_url)
+        self.client = AsyncClient(rpc_urls[0], timeout=timeout)
+        if len(rpc_urls) > 1:
+            self.client._provider = MultiEndpointAsyncHTTPProvider(
+                rpc_urls,
+                timeout=timeout,
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            )
+        else:
+            self.client._provider = PooledAsyncHTTPProvider(
+                rpc_urls[0],
+                timeout=timeout,
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            )
+        instrument_provider(self.client._provider)
+        # Shared by every transaction builder on this manager
+        self.blockhash = BlockhashProvider(self.client, refresh_interval=blockhash_refresh_interval)
+        # Sends return right away; landing is tracked in the background
+        self.confirmations = ConfirmationTracker(self.client)
+        self.confirmations.resubmit = self._send_instructions
+        # Set with enable_lookup_tables() to send v0 transactions
+        self.lookup_tables: Optional[LookupTableManager] = None
+        # Skip node-side simulation when the caller checks funds itself
+        self.skip_preflight = False
+    
+    def enable_lookup_tables(self, authority: Keypair, cache_path: Optional[str] = None, extra_addresses: Optional[List[Pubkey]] = None) -> None:
+        """Send v0 transactions through lookup tables owned by ``authority``.
+
+        ``extra_addresses`` (e.g. other treasuries' ATAs) join the base table set.
+        """
+        self.lookup_tables = LookupTableManager(self, authority, cache_path, extra_addresses=extra_addresses)
+    
+    async def close(self) -> None:
+        """Stop background work and close the pooled HTTP connections."""
+        if self.lookup_tables is not None:
+            await self.lookup_tables.stop()
+        await self.blockhash.stop()
+        await self.confirmations.stop()
+        await self.client.close()
+    
+    async def get_token_balance(self, wallet_address: str) -> int:
+        """Get token balance for a wallet address, served from the balance cache when fresh."""
+        try:
+            return await self.balance_cache.get(wallet_address, lambda: self._fetch_token_balance(wallet_address))
+        except Exception as e:
+            log.warning("token_balance_failed", wallet=wallet_address, error=str(e))
+            return 0
+    
+    async def _fetch_token_balance(self, wallet_address: str) -> int:
+        wallet_pubkey = Pubkey.from_string(wallet_address)
+        ata_address = get_associated_token_address(wallet_pubkey, self.mint_address)
+        
+        account_info = await self.client.get_account_info(ata_address, commitment=Commitment("confirmed"))
+        if not account_info.value:
+            # No associated token account exists
+            return 0
+        self.known_atas.add(wallet_address)
+        return self.parse_token_amount(account_info.value.data)
+    
+    async def get_token_balances(self, wallet_addresses: List[str], cached: bool = False) -> Dict[str, int]:
+        """Get token balances for many wallets with chunked getMultipleAccounts calls.
+
+        Chunks of up to 100 ATAs are fetched concurrently. Wallets without an
+        ATA report 0. With ``cached``, fresh balance cache entries are served
+        and only the rest are fetched.
+        """
+        balances: Dict[str, int] = {}
+        wallets = list(dict.fromkeys(wallet_addresses))
+        if cached:
+            for wallet in wallets:
+                balance = self.balance_cache.peek(wallet)
+                if balance is not None:
+                    balances[wallet] = balance
+            wallets = [w for w in wallets if w not in balances]
+            if not wallets:
+                return balances
+        atas = [get_associated_token_address(Pubkey.from_string(w), self.mint_address) for w in wallets]
+        chunks = [range(start, min(start + MAX_MULTIPLE_ACCOUNTS, len(atas))) for start in range(0, len(atas), MAX_MULTIPLE_ACCOUNTS)]
+        responses = await asyncio.gather(*(
+            self.client.get_multiple_accounts([atas[i] for i in chunk], commitment=Commitment("confirmed"))
+            for chunk in chunks
+        ))
+        
+        existing: List[str] = []
+        for chunk, resp in zip(chunks, responses):
+            for i, account in zip(chunk, resp.value):
+                if account is None:
+                    balances[wallets[i]] = 0
+                else:
+                    balances[wallets[i]] = self.parse_token_amount(account.data)
+                    existing.append(wallets[i])
+                self.balance_cache.put(wallets[i], balances[wallets[i]])
+        self.known_atas.add_many(existing)
+        return balances
+    
+    async def create_associated_token_account(self, payer: Keypair, owner: Pubkey) -> str:
+        """Create an associated token account for the given owner."""
+        try:
+            ata_address = get_associated_token_address(owner, self.mint_address)
+            
+            # Check if ATA already exists
+            account_info = await self.client.get_account_info(ata_address)
+            if account_info.value:
+                self.known_atas.add(str(owner))
+                log.info("ata_exists", ata=str(ata_address))
+                return str(ata_address)
             
-            # Extract supply (bytes 36-44, little endian)
-            supply_bytes = account_data[36:44]
-            supply = int.from_bytes(supply_bytes, byteorder='little')
+            instruction = create_associated_token_account(
+                payer=payer.pubkey(),
+                owner=owner,
+                mint=self.mint_address
+            )
+            result = await self._send_instructions(payer, [instruction])
             
-            # Extract decimals (byte 44)
-            decimals = account_data[44]
+            self._index_when_confirmed(result, [str(owner)])
+            log.info("ata_created", ata=str(ata_address), tx=result)
             
-            # Extract mint authority (bytes 4-36)
-            mint_authority_bytes = account_data[4:36]
-            mint_authority = Pubkey.from_bytes(mint_authority_bytes) if any(mint_authority_bytes) else None
+            return str(ata_address)
             
-            # Extract freeze authority (bytes 68-100)
-            freeze_authority_bytes = account_data[68:100]
-            freeze_authority = Pubkey.from_bytes(freeze_authority_bytes) if any(freeze_authority_bytes) else None
+        except Exception as e:
+            raise Exception(f"Failed to create ATA: {str(e)}")
+    
+    async def transfer_tokens(self, from_keypair: Keypair, to_wallet: str, amount: int) -> str:
+        """Transfer tokens from treasury to user wallet."""
+        try:
+            to_wallet_pubkey = Pubkey.from_string(to_wallet)
+            
+            from_ata = get_associated_token_address(from_keypair.pubkey(), self.mint_address)
+            to_ata = get_associated_token_address(to_wallet_pubkey, self.mint_address)
+            
+            instructions = []
+            if to_wallet not in self.known_atas:
+                # Unknown destination: create its ATA in the same transaction
+                instructions.append(create_associated_token_account_idempotent(
+                    payer=from_keypair.pubkey(),
+                    owner=to_wallet_pubkey,
+                    mint=self.mint_address
+                ))
+            instructions.append(transfer(TransferParams(
+                source=from_ata,
+                dest=to_ata,
+                owner=from_keypair.pubkey(),
+                amount=amount,
+                program_id=TOKEN_PROGRAM_ID
+            )))
+            try:
+                result = await self._send_instructions(from_keypair, instructions)
+            except Exception:
+                self.known_atas.discard_many([to_wallet])
+                raise
+            self._index_when_confirmed(result, [to_wallet])
+            self.balance_cache.invalidate(str(from_keypair.pubkey()), to_wallet)
+            
+            log.info("transfer_sent", source=str(from_ata), dest=str(to_ata), amount=amount, tx=result)
             
-            return {
-                "mint_address": str(self.mint_address),
-                "supply": supply,
-                "decimals": decimals,
-                "mint_authority": str(mint_authority) if mint_authority else None,
-                "freeze_authority": str(freeze_authority) if freeze_authority else None,
+            return result
+            
+        except Exception as e:
+            raise Exception(f"Transfer failed: {str(e)}")
+    
+    async def transfer_tokens_batch(
+        self,
+        from_keypair: Keypair,
+        payouts: List[Tuple[str, int]],
+        before_send: Optional[Callable[[List[int], str, int], Awaitable[None]]] = None,
+    ) -> List[Union[str, Exception]]:
+        """Transfer tokens to many wallets, packing as many payouts per transaction as fit.
+
+        Packed transactions are sent concurrently. Returns one entry per payout,
+        in input order: the signature of the transaction that carried it, or
+        the exception if that transaction failed. ``before_send`` gets
+        the indexes of the payouts in each transaction ahead of its signature
+        and last valid block height; see ``_send_instructions``.
+        """
+        try:
+            # Destinations not known to exist get an idempotent create instead of a probe
+            create_atas = {
+                get_associated_token_address(Pubkey.from_string(wallet), self.mint_address)
+                for wallet, _ in payouts
+                if wallet not in self.known_atas
             }
+            groups = self.pack_transfer_instructions(from_keypair.pubkey(), payouts, create_atas, self._lookup_accounts())
+        except Exception as e:
+            error = Exception(f"Batch transfer failed: {str(e)}")
+            return [error] * len(payouts)
+        
+        if self.lookup_tables is not None:
+            self.lookup_tables.note_payouts([wallet for wallet, _ in payouts])
+        outcomes = await asyncio.gather(
+            *(
+                self._send_instructions(from_keypair, instructions, before_send=functools.partial(before_send, indexes) if before_send else None)
+                for instructions, indexes in groups
+            ),
+            return_exceptions=True,
+        )
+        
+        results: List[Union[str, Exception]] = [None] * len(payouts)
+        for (_, indexes), outcome in zip(groups, outcomes):
+            if isinstance(outcome, Exception):
+                # A recipient may have closed its ATA since it was indexed
+                self.known_atas.discard_many([payouts[i][0] for i in indexes])
+                outcome = Exception(f"Batch transfer failed: {str(outcome)}")
+            else:
+                self._index_when_confirmed(outcome, [payouts[i][0] for i in indexes])
+                self.balance_cache.invalidate(str(from_keypair.pubkey()), *(payouts[i][0] for i in indexes))
+                log.info("batch_sent", transfers=len(indexes), tx=outcome)
+            for i in indexes:
+                results[i] = outcome
+        return results
+    
+    async def get_mint_info(self) -> dict:
+        """Get mint information."""
+        try:
+            mint_info = await self.client.get_account_info(self.mint_address, commitment=Commitment("confirmed"))
+            if not mint_info.value:
+                raise Exception("Mint account not found")
+            return self.parse_mint_info(mint_info.value.data)
         except Exception as e:
             raise Exception(f"Failed to get mint info: {str(e)}")
+    
+    def _index_when_confirmed(self, signature: str, wallets: List[str]) -> None:
+        """Record ``wallets``' ATAs as existing once the transaction creating or paying them confirms.
+
+        Follows replacements of an expired transaction. A failed one drops
+        them instead: a closed ATA fails the whole transaction, so the retry
+        has to create it again.
+        """
+        def settled(future: asyncio.Future) -> None:
+            if future.cancelled():
+                return
+            record = future.result()
+            if record["status"] == "confirmed":
+                self.known_atas.add_many(wallets)
+            elif record["status"] == "failed":
+                self.known_atas.discard_many(wallets)
+            elif record["replaced_by"] is not None:
+                self._index_when_confirmed(record["replaced_by"], wallets)
+        
+        self.confirmations.settled(signature).add_done_callback(settled)
+    
+    def _lookup_accounts(self) -> List[AddressLookupTableAccount]:
+        return self.lookup_tables.accounts() if self.lookup_tables is not None else []
+    
+    def _build_transaction(self, payer: Keypair, instructions: List[Instruction], recent_blockhash: Hash) -> Union[Transaction, VersionedTransaction]:
+        """Build a v0 transaction through the lookup tables when available, else a legacy one."""
+        lookup_tables = self._lookup_accounts()
+        if not lookup_tables:
+            return super()._build_transaction(payer, instructions, recent_blockhash)
+        message = MessageV0.try_compile(payer.pubkey(), instructions, lookup_tables, recent_blockhash)
+        return VersionedTransaction(message, [payer])
+    
+    async def _send_instructions(
+        self,
+        payer: Keypair,
+        instructions: List[Instruction],
+        attempt: int = 0,
+        before_send: Optional[Callable[[str, int], Awaitable[None]]] = None,
+        resubmit: bool = True,
+    ) -> str:
+        """Sign ``instructions`` into one transaction with the cached blockhash, send it and track it.
+
+        Returns the signature as soon as the node accepts the transaction;
+        confirmation is followed by ``self.confirmations``.
+
+        ``before_send(signature, last_valid_block_height)`` is awaited before
+        the transaction leaves, for callers that record it durably. Such
+        callers own re-signing: their transaction is never resubmitted by the
+        tracker, and one whose send failed is still tracked and rebroadcast,
+        since the node may have received it. With ``resubmit`` False the
+        tracker does not re-sign the transaction once it expires either.
+        """
+        recent_blockhash, last_valid_block_height = await self.blockhash.get()
+        transaction = self._build_transaction(payer, instructions, recent_blockhash)
+        raw_transaction = bytes(transaction)
+        signature = str(transaction.signatures[0])
+        if before_send is not None:
+            await before_send(signature, last_valid_block_height)
+        if before_send is not None or not resubmit:
+            payer, instructions = None, None
+        try:
+            await self.client.send_raw_transaction(raw_transaction, opts=TxOpts(skip_preflight=self.skip_preflight, preflight_commitment=Commitment("confirmed")))
+        except Exception:
+            if before_send is not None:
+                self.confirmations.track(signature, raw_transaction, last_valid_block_height, None, None, attempt)
+            raise
+        self.confirmations.track(signature, raw_transaction, last_valid_block_height, payer, instructions, attempt)
+        return signature
+
+
+def create_associated_token_account_idempotent(payer: Pubkey, owner: Pubkey, mint: Pubkey) -> Instruction:
+    """Like ``create_associated_token_account`` but succeeds if the ATA already exists."""
+    instruction = create_associated_token_account(payer=payer, owner=owner, mint=mint)
+    # Associated Token Program instruction 1 = CreateIdempotent
+    return Instruction(instruction.program_id, bytes([1]), instruction.accounts)
+
+
+def measure_transaction(
+    payer: Pubkey,
+    instructions: List[Instruction],
+    lookup_tables: Optional[List[AddressLookupTableAccount]] = None,
+) -> Tuple[int, int]:
+    """Serialized size in bytes and number of locked accounts of a signed transaction carrying ``instructions``.
+
+    Measures a v0 transaction when ``lookup_tables`` are given, else a legacy one.
+    """
+    if lookup_tables:
+        message = MessageV0.try_compile(payer, instructions, lookup_tables, Hash.default())
+        message_size = len(to_bytes_versioned(message))
+        loaded = sum(len(lookup.writable_indexes) + len(lookup.readonly_indexes) for lookup in message.address_table_lookups)
+    else:
+        message = Message.new_with_blockhash(instructions, payer, Hash.default())
+        message_size = len(bytes(message))
+        loaded = 0
+    # compact-u16 signature count followed by one 64-byte signature per signer
+    size = 1 + 64 * message.header.num_required_signatures + message_size
+    return size, len(message.account_keys) + loaded
+
+
+def transaction_fits(
+    payer: Pubkey,
+    instructions: List[Instruction],
+    lookup_tables: Optional[List[AddressLookupTableAccount]] = None,
+) -> bool:
+    """Whether a transaction carrying ``instructions`` is within the packet size and account lock limits."""
+    size, accounts = measure_transaction(payer, instructions, lookup_tables)
+    return size <= PACKET_DATA_SIZE and accounts <= MAX_TX_ACCOUNT_LOCKS
+
+
+def create_lookup_table_instruction(authority: Pubkey, payer: Pubkey, recent_slot: int) -> Tuple[Instruction, Pubkey]:
+    """Build a CreateLookupTable instruction; returns it with the new table's address."""
+    table, bump = Pubkey.find_program_address(
+        [bytes(authority), recent_slot.to_bytes(8, "little")],
+        ADDRESS_LOOKUP_TABLE_PROGRAM_ID,
+    )
+    data = (0).to_bytes(4, "little") + recent_slot.to_bytes(8, "little") + bytes([bump])
+    instruction = Instruction(ADDRESS_LOOKUP_TABLE_PROGRAM_ID, data, [
+        AccountMeta(pubkey=table, is_signer=False, is_writable=True),
+        AccountMeta(pubkey=authority, is_signer=True, is_writable=False),
+        AccountMeta(pubkey=payer, is_signer=True, is_writable=True),
+        AccountMeta(pubkey=SYS_PROGRAM_ID, is_signer=False, is_writable=False),
+    ])
+    return instruction, table
+
+
+def extend_lookup_table_instruction(table: Pubkey, authority: Pubkey, payer: Pubkey, addresses: List[Pubkey]) -> Instruction:
+    """Build an ExtendLookupTable instruction appending ``addresses`` to ``table``."""
+    data = (2).to_bytes(4, "little") + len(addresses).to_bytes(8, "little") + b"".join(bytes(a) for a in addresses)
+    return Instruction(ADDRESS_LOOKUP_TABLE_PROGRAM_ID, data, [
+        AccountMeta(pubkey=table, is_signer=False, is_writable=True),
+        AccountMeta(pubkey=authority, is_signer=True, is_writable=False),
+        AccountMeta(pubkey=payer, is_signer=True, is_writable=True),
+        AccountMeta(pubkey=SYS_PROGRAM_ID, is_signer=False, is_writable=False),
+    ])
+
+
+def parse_lookup_table_addresses(account_data: bytes) -> List[Pubkey]:
+    """Decode the addresses stored in a lookup table account."""
+    body = account_data[LOOKUP_TABLE_META_SIZE:]
+    return [Pubkey.from_bytes(body[i:i + 32]) for i in range(0, len(body) - len(body) % 32, 32)]
 
 
 def load_keypair_from_env(env_var: str) -> Keypair:
@@ -214,6 +1509,25 @@ def load_keypair_from_env(env_var: str) -> Keypair:
         raise Exception(f"Failed to load keypair from {env_var}: {str(e)}")
 
 
+def load_keypairs_from_env(env_var: str) -> List[Keypair]:
+    """Load several keypairs from an environment variable containing a JSON array of arrays."""
+    keypairs_json = os.getenv(env_var)
+    if not keypairs_json:
+        raise Exception(f"Environment variable {env_var} not set")
+    
+    try:
+        keypairs_data = json.loads(keypairs_json)
+        if not isinstance(keypairs_data, list) or not keypairs_data:
+            raise Exception("Expected a non-empty JSON array of keypairs")
+        for keypair_data in keypairs_data:
+            if not isinstance(keypair_data, list) or len(keypair_data) != 64:
+                raise Exception("Invalid keypair format")
+        return [Keypair.from_bytes(bytes(keypair_data)) for keypair_data in keypairs_data]
+        
+    except Exception as e:
+        raise Exception(f"Failed to load keypairs from {env_var}: {str(e)}")
+
+
 def create_demo_keypair() -> tuple[Keypair, str]:
     """Create a demo keypair and return both keypair and JSON string."""
     keypair = Keypair()
@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+from spl_token_utils import BalanceCache
+
+
+class Chain:
+    """Balance loader that counts reads and can hold them until released."""
+
+    def __init__(self, balance=100):
+        self.balance = balance
+        self.reads = 0
+        self.release = None
+
+    async def load(self):
+        self.reads += 1
+        balance = self.balance
+        if self.release is not None:
+            await self.release.wait()
+        return balance
+
+
+def test_concurrent_misses_share_one_load_and_hits_skip_it():
+    chain, cache = Chain(), BalanceCache(ttl=60)
+
+    async def run():
+        chain.release = asyncio.Event()
+        waiting = [asyncio.ensure_future(cache.get("alice", chain.load)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        chain.release.set()
+        assert await asyncio.gather(*waiting) == [100] * 5
+        assert await cache.get("alice", chain.load) == 100
+
+    asyncio.run(run())
+    assert chain.reads == 1
+    assert (cache.misses, cache.coalesced, cache.hits) == (1, 4, 1)
+
+
+def test_expired_entries_are_reloaded_and_lru_entries_evicted():
+    chain, cache = Chain(), BalanceCache(ttl=0.01, max_entries=2)
+
+    async def run():
+        await cache.get("alice", chain.load)
+        await asyncio.sleep(0.02)
+        assert cache.peek("alice") is None
+        chain.balance = 200
+        assert await cache.get("alice", chain.load) == 200
+        cache.ttl = 60
+        for wallet in ("bob", "carol"):
+            await cache.get(wallet, chain.load)
+
+    asyncio.run(run())
+    assert chain.reads == 4
+    assert cache.evictions == 1 and cache.peek("alice") is None
+
+
+def test_invalidate_during_a_load_keeps_its_stale_result_out():
+    chain, cache = Chain(), BalanceCache(ttl=60)
+
+    async def run():
+        chain.release = asyncio.Event()
+        stale = asyncio.ensure_future(cache.get("alice", chain.load))
+        await asyncio.sleep(0.01)
+        # A payout lands while the old balance is being read
+        cache.invalidate("alice")
+        chain.balance = 150
+        chain.release.set()
+        assert await stale == 100
+        assert cache.peek("alice") is None
+        chain.release = None
+        return await cache.get("alice", chain.load)
+
+    assert asyncio.run(run()) == 150
+    assert chain.reads == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_load():
+    chain, cache = Chain(), BalanceCache(ttl=60)
+
+    async def run():
+        chain.release = asyncio.Event()
+        first = asyncio.ensure_future(cache.get("alice", chain.load))
+        second = asyncio.ensure_future(cache.get("alice", chain.load))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        chain.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == 100
+    assert chain.reads == 1 and cache.peek("alice") == 100
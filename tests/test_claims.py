@@ -0,0 +1,120 @@
+import asyncio
+from solders.keypair import Keypair
+from api.services.claim_service import PENDING, ClaimOutboxes, ClaimService
+from api.services.token_service import ClaimSettlementEngine
+
+
+class FakeConfirmations:
+    def status(self, signature):
+        return None
+
+    def track(self, *args):
+        pass
+
+    def settled(self, signature):
+        # Never settles: the test only looks at how claims are batched
+        return asyncio.get_running_loop().create_future()
+
+
+class FakeTokenManager:
+    def __init__(self):
+        self.known_atas = set()
+        self.confirmations = FakeConfirmations()
+        self.batches = []
+        self.flushed = asyncio.Event()
+
+    async def transfer_tokens_batch(self, keypair, payouts, before_send):
+        self.batches.append(len(payouts))
+        self.flushed.set()
+        signature = str(Keypair().sign_message(b"batch"))
+        await before_send(list(range(len(payouts))), signature, 1150)
+        return [signature] * len(payouts)
+
+
+class FakeTreasuries:
+    shard = type("Shard", (), {"keypair": Keypair(), "wallet": "treasury"})()
+
+    def estimate_lamports(self, wallets):
+        return 0
+
+    async def acquire(self, raw_amount, lamports=0):
+        return self.shard
+
+    def release(self, *args):
+        pass
+
+
+class FakePointsService:
+    def claim_points(self, wallet, wait=True):
+        return 1
+
+    def wait_durable(self):
+        pass
+
+
+class FakeTokenService:
+    def __init__(self, max_batch):
+        self.token_manager = FakeTokenManager()
+        # Long window: a batch only goes out early once it is full
+        self.settlement = ClaimSettlementEngine(self.token_manager, FakeTreasuries(), max_batch=max_batch, window_ms=60000)
+
+    async def settle_claim(self, wallet, whole_tokens, on_signed=None):
+        return await self.settlement.submit(wallet, whole_tokens, on_signed)
+
+
+def test_flush_carries_a_full_batch(tmp_path, monkeypatch):
+    monkeypatch.setenv("CLAIM_OUTBOX_PATH", str(tmp_path / "claims.log"))
+    monkeypatch.delenv("CLAIM_WORKERS", raising=False)
+
+    async def run():
+        token_service = FakeTokenService(max_batch=5)
+        claims = ClaimService(token_service, FakePointsService())
+        try:
+            for _ in range(12):
+                await claims.claim(str(Keypair().pubkey()))
+            await asyncio.wait_for(token_service.token_manager.flushed.wait(), 5)
+            return token_service.token_manager.batches
+        finally:
+            await claims.close()
+
+    batches = asyncio.run(run())
+    assert batches[0] == 5
+
+
+def test_claim_workers_setting_is_honored(tmp_path, monkeypatch):
+    monkeypatch.setenv("CLAIM_OUTBOX_PATH", str(tmp_path / "claims.log"))
+    monkeypatch.setenv("CLAIM_WORKERS", "3")
+    claims = ClaimService(FakeTokenService(max_batch=20), FakePointsService())
+    claims.outbox.close()
+    assert claims.workers == 3
+
+
+def pending_claim(wallet):
+    return {"id": wallet + "-claim", "wallet": wallet, "amount": 1, "status": PENDING, "attempts": 0,
+            "next_attempt_at": 0, "tx": None, "last_valid_block_height": None, "error": None, "created_at": 0}
+
+
+def test_each_worker_owns_a_slot_and_gone_workers_claims_are_adopted(tmp_path):
+    path = str(tmp_path / "claims.log")
+    first, second = ClaimOutboxes(path), ClaimOutboxes(path)
+    assert (first.own.path, second.own.path) == (path, str(tmp_path / "claims.1.log"))
+
+    wal, lsn = second.write(pending_claim("bob"))
+    wal.wait_durable(lsn)
+    # Claims of another worker can still be looked up
+    assert first.find("bob-claim")["wallet"] == "bob"
+
+    # Both exit with the claim unpaid; the next worker to start takes slot 0 and resumes it
+    first.close()
+    second.close()
+    third = ClaimOutboxes(path)
+    assert third.own.path == path
+    assert [c["id"] for c in third.pending()] == ["bob-claim"]
+    # Paid claims go back to the slot they came from
+    wal, lsn = third.write(dict(third.claims["bob-claim"], status="sent"))
+    wal.wait_durable(lsn)
+    third.close()
+    fourth = ClaimOutboxes(path)
+    assert fourth.pending() == []
+    assert fourth.find("bob-claim")["status"] == "sent"
+    fourth.close()
@@ -0,0 +1,48 @@
+import asyncio
+from types import SimpleNamespace
+from solders.keypair import Keypair
+from solders.transaction_status import TransactionConfirmationStatus
+from spl_token_utils import ConfirmationTracker
+
+
+class HistoryOnlyClient:
+    """Past every blockhash's validity; the landed transaction is only in the history."""
+
+    def __init__(self):
+        self.history_lookups = 0
+
+    async def get_block_height(self, commitment=None):
+        return SimpleNamespace(value=1000)
+
+    async def get_signature_statuses(self, signatures, search_transaction_history=False):
+        if not search_transaction_history:
+            return SimpleNamespace(value=[None] * len(signatures))
+        self.history_lookups += 1
+        status = SimpleNamespace(slot=42, err=None, confirmation_status=TransactionConfirmationStatus.Finalized)
+        return SimpleNamespace(value=[status] * len(signatures))
+
+
+def test_transaction_found_only_in_history_is_not_re_signed():
+    async def run():
+        client = HistoryOnlyClient()
+        tracker = ConfirmationTracker(client, poll_interval=3600)
+        resubmitted = []
+
+        async def resubmit(payer, instructions, attempt):
+            resubmitted.append(attempt)
+            return "replacement"
+
+        tracker.resubmit = resubmit
+        signature = str(Keypair().sign_message(b"claim"))
+        tracker.track(signature, None, 900, Keypair(), [], 0)
+        settled = tracker.settled(signature)
+        for _ in range(3):
+            await tracker.poll()
+        await tracker.stop()
+        return client, resubmitted, await settled
+
+    client, resubmitted, record = asyncio.run(run())
+    assert client.history_lookups == 1
+    assert resubmitted == []
+    assert record["status"] == "confirmed"
+    assert record["replaced_by"] is None
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from api.services.ingest_service import ALREADY_COMPLETED, EventIngestService
+from api.services.quest_service import QuestCompletionIndex, QuestService
+
+WALLET = "9WzDXwBbmkg8ZTbNMqUxvQRAyrZzDsGYdLVL9zYtAWWM"
+
+
+class FailingPointsService:
+    def __init__(self):
+        self.fail = True
+        self.awarded = {}
+
+    def add_points_many(self, amounts):
+        if self.fail:
+            raise RuntimeError("points store unavailable")
+        self.awarded.update(amounts)
+        return amounts
+
+
+def make_quest_service(path):
+    quest_service = QuestService.__new__(QuestService)
+    quest_service.completions = QuestCompletionIndex(str(path))
+    return quest_service
+
+
+async def body():
+    yield f'{{"wallet":"{WALLET}","quest_type":"daily"}}\n'.encode()
+
+
+def test_failed_points_update_frees_quest_caps(tmp_path):
+    points_service = FailingPointsService()
+    quest_service = make_quest_service(tmp_path / "quests.log")
+    ingest = EventIngestService(points_service, quest_service)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(ingest.ingest(body()))
+    assert not quest_service.completions.completed(WALLET, "daily")
+
+    # The retry is not rejected as already completed, and the revert survives a restart
+    quest_service.close()
+    quest_service = make_quest_service(tmp_path / "quests.log")
+    assert not quest_service.completions.completed(WALLET, "daily")
+    points_service.fail = False
+    statuses, summary = asyncio.run(EventIngestService(points_service, quest_service).ingest(body()))
+    quest_service.close()
+    assert ALREADY_COMPLETED not in statuses
+    assert points_service.awarded == {WALLET: 10}
+
+
+def test_failed_quest_reward_frees_the_daily_cap(tmp_path):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from api.routes import quest
+    from api.services import get_points_service, get_quest_service
+
+    class FailingPoints:
+        fail = True
+
+        def add_points(self, wallet, amount):
+            if self.fail:
+                raise RuntimeError("points store unavailable")
+            return amount
+
+    points_service = FailingPoints()
+    quest_service = make_quest_service(tmp_path / "quests.log")
+    app = FastAPI()
+    app.include_router(quest.router)
+    app.dependency_overrides[get_points_service] = lambda: points_service
+    app.dependency_overrides[get_quest_service] = lambda: quest_service
+    client = TestClient(app, raise_server_exceptions=False)
+
+    assert client.post("/quest/complete?quest_type=daily", json={"wallet": WALLET}).status_code == 500
+    assert not quest_service.completions.completed(WALLET, "daily")
+    points_service.fail = False
+    assert client.post("/quest/complete?quest_type=daily", json={"wallet": WALLET}).json()["points_awarded"] == 10
+    quest_service.close()
@@ -0,0 +1,59 @@
+import asyncio
+import base64
+from solders.keypair import Keypair
+from solders.transaction import Transaction
+from benchmarks.stubs import StubRPCServer
+from spl_token_utils import AsyncSPLTokenManager, KnownATAIndex
+
+MINT = str(Keypair().pubkey())
+
+
+class ClosedATAServer(StubRPCServer):
+    """Every transaction fails on chain while ``fail`` is set; keeps the sent transactions."""
+
+    fail = False
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    def _result(self, request):
+        if request["method"] == "sendTransaction":
+            self.sent.append(Transaction.from_bytes(base64.b64decode(request["params"][0])))
+        if request["method"] == "getSignatureStatuses" and self.fail:
+            status = {"slot": 1000, "confirmations": None, "err": {"InstructionError": [0, "InvalidAccountData"]},
+                      "status": {"Err": {"InstructionError": [0, "InvalidAccountData"]}}, "confirmationStatus": "finalized"}
+            return {"jsonrpc": "2.0", "id": request["id"], "result": {"context": {"slot": 1000}, "value": [status for _ in request["params"][0]]}}
+        return super()._result(request)
+
+
+def test_failed_payout_drops_the_wallet_so_the_retry_creates_its_ata(tmp_path):
+    server = ClosedATAServer().start()
+    wallet = str(Keypair().pubkey())
+    path = str(tmp_path / "known_atas.txt")
+
+    async def run():
+        manager = AsyncSPLTokenManager(server.url, MINT, known_atas=KnownATAIndex(path))
+        manager.known_atas.add(wallet)
+        treasury = Keypair()
+        try:
+            # The owner closed the ATA after it was indexed: the transfer alone fails on chain
+            server.fail = True
+            await manager.transfer_tokens_batch(treasury, [(wallet, 5)])
+            await manager.confirmations.poll()
+            await asyncio.sleep(0)
+            server.fail = False
+            await manager.transfer_tokens_batch(treasury, [(wallet, 5)])
+        finally:
+            await manager.close()
+        return manager
+
+    try:
+        manager = asyncio.run(run())
+    finally:
+        server.stop()
+    first, retry = server.sent
+    assert len(first.message.instructions) == 1
+    assert len(retry.message.instructions) == 2
+    assert wallet not in manager.known_atas
+    assert wallet not in KnownATAIndex(path)
@@ -0,0 +1,31 @@
+from api.services.leaderboard import Leaderboard
+
+
+def test_ranks_ties_and_zero_scores():
+    board = Leaderboard([("alice", 30), ("bob", 50), ("carol", 30), ("dave", 0)])
+    assert [(e["rank"], e["wallet"]) for e in board.top(10)] == [(1, "bob"), (2, "alice"), (2, "carol")]
+    assert board.top(1, offset=2) == [{"rank": 2, "wallet": "carol", "points": 30}]
+    assert board.rank("dave") is None
+
+    totals = {"alice": 60, "bob": 0}
+    board.sync(totals, totals.get)
+    assert board.rank("alice") == {"rank": 1, "wallet": "alice", "points": 60, "total": 2}
+    assert board.rank("bob") is None
+    assert len(board) == 2
+
+
+def test_sync_during_a_rebuild_is_not_overwritten_by_the_stale_read():
+    totals = {"alice": 10, "bob": 20}
+    board = Leaderboard(totals.items())
+
+    def load():
+        # The store is read, then another thread adds to alice and syncs
+        # before the rebuilt index is swapped in
+        stale = list(totals.items())
+        totals["alice"] = 99
+        board.sync(["alice"], totals.get)
+        return stale
+
+    board.rebuild(load, totals.get)
+    assert board.rank("alice")["points"] == 99
+    assert board.rank("bob")["rank"] == 2
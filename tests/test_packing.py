@@ -0,0 +1,30 @@
+from solders.address_lookup_table_account import AddressLookupTableAccount
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+from spl.token.instructions import get_associated_token_address
+from spl_token_utils import MAX_TX_ACCOUNT_LOCKS, PACKET_DATA_SIZE, BaseSPLTokenManager, measure_transaction
+
+MINT = str(Keypair().pubkey())
+
+
+def test_lookup_table_groups_stay_within_account_lock_limit():
+    manager = BaseSPLTokenManager(MINT)
+    payer = Keypair().pubkey()
+    wallets = [str(Keypair().pubkey()) for _ in range(64)]
+    mint = Pubkey.from_string(MINT)
+    # Source and every destination ATA come from the table: 64 transfers fit in
+    # a packet but would lock 2 static + 65 loaded accounts
+    table = AddressLookupTableAccount(
+        Keypair().pubkey(),
+        [get_associated_token_address(payer, mint)] + [get_associated_token_address(Pubkey.from_string(w), mint) for w in wallets],
+    )
+
+    groups = manager.pack_transfer_instructions(payer, [(w, 1) for w in wallets], set(), [table])
+
+    assert [len(indexes) for _, indexes in groups] == [61, 3]
+    for instructions, _ in groups:
+        size, accounts = measure_transaction(payer, instructions, [table])
+        assert size <= PACKET_DATA_SIZE
+        assert accounts <= MAX_TX_ACCOUNT_LOCKS
+    # The first group is filled right up to the limit
+    assert measure_transaction(payer, groups[0][0], [table])[1] == MAX_TX_ACCOUNT_LOCKS
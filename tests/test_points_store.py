@@ -0,0 +1,68 @@
+import os
+import pytest
+from api.services.points_store import WALPointsBackend
+
+
+def test_restart_replays_the_log(tmp_path):
+    backend = WALPointsBackend(str(tmp_path))
+    backend.add("alice", 101)
+    backend.add("bob", 7)
+    backend.add_many({"alice": 4, "carol": 9})
+    assert backend.claim("bob") == 7
+    backend.close()
+
+    backend = WALPointsBackend(str(tmp_path))
+    assert (backend.get("alice"), backend.get("bob"), backend.get("carol")) == (105, 0, 9)
+    backend.close()
+
+
+def test_snapshot_drops_covered_segments_and_restarts_from_it(tmp_path):
+    backend = WALPointsBackend(str(tmp_path))
+    backend.add("alice", 101)
+    backend.snapshot()
+    backend.add("alice", 1)
+    backend.close()
+    assert sorted(os.listdir(tmp_path)) == ["points.snapshot", "points.wal.1", "points.wal.lock"]
+
+    backend = WALPointsBackend(str(tmp_path))
+    assert backend.get("alice") == 102
+    assert backend.generation == 1
+    backend.close()
+
+
+def test_snapshots_taken_by_the_flusher_keep_every_update(tmp_path):
+    backend = WALPointsBackend(str(tmp_path), snapshot_every=50)
+    for i in range(2000):
+        backend.add(f"w{i % 30}", 1)
+    backend.wait_durable()
+    expected = dict(backend.points)
+    backend.close()
+
+    backend = WALPointsBackend(str(tmp_path))
+    assert backend.points == expected
+    backend.close()
+
+
+def test_torn_tail_is_dropped_and_later_appends_survive(tmp_path):
+    backend = WALPointsBackend(str(tmp_path))
+    backend.add("alice", 5)
+    backend.close()
+    with open(tmp_path / "points.wal.0", "a") as f:
+        f.write("A alice 10")
+
+    backend = WALPointsBackend(str(tmp_path))
+    assert backend.get("alice") == 5
+    backend.add("alice", 1)
+    backend.close()
+    backend = WALPointsBackend(str(tmp_path))
+    assert backend.get("alice") == 6
+    backend.close()
+
+
+def test_second_process_cannot_share_the_log(tmp_path):
+    backend = WALPointsBackend(str(tmp_path))
+    with pytest.raises(RuntimeError):
+        WALPointsBackend(str(tmp_path))
+    backend.close()
+    # Released on close
+    WALPointsBackend(str(tmp_path)).close()
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import httpx
+import pytest
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.rpc.requests import GetLatestBlockhash, GetSlot, GetVersion, SendRawTransaction
+from solders.transaction import Transaction
+from benchmarks.stubs import StubRPCServer
+from spl_token_utils import MultiEndpointAsyncHTTPProvider, RPCEndpoint
+
+
+def endpoint(**kwargs):
+    return RPCEndpoint("http://unused", session=None, **kwargs)
+
+
+def test_scores_follow_latency_and_penalize_errors_until_they_decay():
+    fast, slow, flaky = endpoint(), endpoint(), endpoint(error_half_life=10.0)
+    for _ in range(20):
+        fast.record(0.01, ok=True)
+        slow.record(0.05, ok=True)
+        flaky.record(0.01, ok=True)
+    for _ in range(5):
+        flaky.record(0.0, ok=False)
+    assert sorted([flaky, slow, fast], key=RPCEndpoint.score) == [fast, slow, flaky]
+    assert flaky.failures == 5 and flaky.requests == 25
+
+    # Idle for ten half-lives: the errors have all but decayed and it is tried again
+    flaky._error_at -= 100.0
+    assert flaky.error_rate < 0.001
+    assert sorted([slow, flaky], key=RPCEndpoint.score) == [flaky, slow]
+
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(**kwargs):
+        server = StubRPCServer(**kwargs).start()
+        started.append(server)
+        return server
+
+    yield start
+    for server in started:
+        server.stop()
+
+
+def run_with(urls, calls, **kwargs):
+    async def run():
+        provider = MultiEndpointAsyncHTTPProvider(urls, **kwargs)
+        try:
+            return provider, [await call(provider) for call in calls]
+        finally:
+            await provider.close()
+
+    return asyncio.run(run())
+
+
+def test_failing_endpoint_is_failed_over_and_ranked_last(servers):
+    down, up = servers(error_rate=1.0), servers()
+
+    provider, results = run_with([down.url, up.url], [lambda p: p.make_request_unparsed(GetSlot())] * 3)
+    assert [json.loads(r)["result"] for r in results] == [1000] * 3
+    # Only the first call tried the failing endpoint; its error rate then ranks it last
+    assert down.counts == {} and up.counts == {"getSlot": 3}
+    assert [e.url for e in provider.ranked()] == [up.url, down.url]
+    assert provider.endpoints[0].failures == 1
+
+
+def test_every_endpoint_failing_raises(servers):
+    urls = [servers(error_rate=1.0).url, servers(error_rate=1.0).url]
+    with pytest.raises(httpx.HTTPStatusError):
+        run_with(urls, [lambda p: p.make_request_unparsed(GetSlot())])
+
+
+def test_slow_read_is_hedged_to_the_next_endpoint(servers):
+    slow, fast = servers(latency_ms=500), servers()
+
+    provider, results = run_with(
+        [slow.url, fast.url],
+        [lambda p: p.make_request_unparsed(GetLatestBlockhash())],
+        hedge_delay=0.05,
+    )
+    assert "blockhash" in results[0]
+    assert (provider.hedges, provider.hedge_wins) == (1, 1)
+    # The cancelled primary is charged at least the time it had taken
+    assert provider.endpoints[0].latency >= 0.05
+    assert [e.url for e in provider.ranked()] == [fast.url, slow.url]
+
+
+def test_unhedged_methods_wait_for_the_first_endpoint(servers):
+    slow, fast = servers(latency_ms=200), servers()
+
+    provider, _ = run_with([slow.url, fast.url], [lambda p: p.make_request_unparsed(GetVersion())], hedge_delay=0.05)
+    assert provider.hedges == 0
+    assert fast.counts == {}
+
+
+def test_transactions_are_sent_to_the_best_endpoints_at_once(servers):
+    first, second, third = servers(), servers(latency_ms=100), servers()
+    payer = Keypair()
+    tx = Transaction.new_signed_with_payer([], payer.pubkey(), [payer], Hash.default())
+
+    async def send(provider):
+        result = await provider.make_request_unparsed(SendRawTransaction(bytes(tx)))
+        # The slower copy keeps propagating after the first answer
+        await asyncio.sleep(0.3)
+        return result
+
+    _, results = run_with([first.url, second.url, third.url], [send], send_fanout=2)
+    assert json.loads(results[0])["result"] == str(tx.signatures[0])
+    assert first.counts == second.counts == {"sendTransaction": 1}
+    assert third.counts == {}
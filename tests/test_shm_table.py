@@ -0,0 +1,96 @@
+import multiprocessing
+import pytest
+from api.services.points_shm import SharedMemoryPointsBackend
+from api.services.quest_service import QUEST_BITS
+from api.services.quest_shm import SharedQuestCompletionIndex
+
+
+def add_points(path, wallets, times):
+    table = SharedMemoryPointsBackend(path)
+    for _ in range(times):
+        table.add_many({wallet: 1 for wallet in wallets})
+        table.add(wallets[0], 1)
+    table.close()
+
+
+def test_points_add_claim_and_reopen(tmp_path):
+    path = str(tmp_path / "points.table")
+    table = SharedMemoryPointsBackend(path, capacity=64)
+    assert table.add("alice", 30) == 30
+    assert table.add_many({"alice": 5, "bob": 7}) == {"alice": 35, "bob": 7}
+    assert table.claim("bob") == 7
+    assert (table.get("bob"), table.claim("bob"), table.get("nobody")) == (0, 0, 0)
+    table.reset("alice")
+    table.add("carol", 3)
+    table.close()
+
+    table = SharedMemoryPointsBackend(path, capacity=8)
+    # The capacity the file was created with wins
+    assert table.capacity == 64
+    assert sorted(table.items()) == [("alice", 0), ("bob", 0), ("carol", 3)]
+    assert table.count == 3
+    table.close()
+
+
+def test_points_table_rejects_long_keys_and_refuses_to_overfill(tmp_path):
+    table = SharedMemoryPointsBackend(str(tmp_path / "points.table"), capacity=10)
+    with pytest.raises(ValueError):
+        table.add("w" * 64, 1)
+    assert table.get("w" * 64) == 0
+    for n in range(9):
+        table.add(f"wallet{n}", 1)
+    with pytest.raises(RuntimeError):
+        table.add("one-too-many", 1)
+    assert table.count == 9
+    table.close()
+
+
+def test_points_table_rejects_another_table_file(tmp_path):
+    path = str(tmp_path / "quests.table")
+    SharedQuestCompletionIndex(path, capacity=8).close()
+    with pytest.raises(ValueError):
+        SharedMemoryPointsBackend(path)
+
+
+def test_workers_updating_the_same_wallets_lose_no_points(tmp_path):
+    path = str(tmp_path / "points.table")
+    wallets = [f"wallet{n}" for n in range(50)]
+    SharedMemoryPointsBackend(path, capacity=1024).close()
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=add_points, args=(path, wallets, 200)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    table = SharedMemoryPointsBackend(path)
+    points = dict(table.items())
+    assert points[wallets[0]] == 4 * 200 * 2
+    assert all(points[wallet] == 4 * 200 for wallet in wallets[1:])
+    table.close()
+
+
+def test_quest_caps_are_shared_between_opened_tables(tmp_path):
+    path = str(tmp_path / "quests.table")
+    first = SharedQuestCompletionIndex(path, window_days=7, capacity=64)
+    second = SharedQuestCompletionIndex(path, window_days=30, capacity=64)
+    # The window the file was created with wins
+    assert second.window == 7
+
+    assert first.complete("alice", "daily", day=100)
+    assert not second.complete("alice", "daily", day=100)
+    assert second.complete_many([("alice", "social"), ("alice", "social"), ("bob", "daily")], day=100) == [True, False, True]
+    assert first.completed("alice", "social", day=100)
+
+    second.revert_many([("alice", "daily")], day=100)
+    assert first.complete("alice", "daily", day=100)
+
+    # Day 107 reuses day 100's slot in the ring, which starts cleared; day 100 has expired
+    assert first.complete("alice", "daily", day=107)
+    assert first.day_bits("alice", 107) == QUEST_BITS["daily"]
+    assert first.day_bits("alice", 100) == 0
+    assert not first.complete("alice", "daily", day=100)
+    assert first.stats() == {"wallets": 2, "window_days": 7, "bitmap_bytes": 14}
+    first.close()
+    second.close()
@@ -0,0 +1,50 @@
+import asyncio
+from types import SimpleNamespace
+from solders.keypair import Keypair
+from api.services.token_service import TreasuryPool
+
+
+class FakeChain:
+    """Token and SOL balances of the treasury wallets, moved by ``transfer_tokens``."""
+
+    def __init__(self, balances):
+        self.balances = balances
+        self.known_atas = set()
+        self.reads = 0
+        self.transfers = []
+        self.client = self
+
+    async def get_token_balances(self, wallets):
+        self.reads += 1
+        return {w: self.balances[w] for w in wallets}
+
+    async def get_multiple_accounts(self, pubkeys, commitment=None):
+        return SimpleNamespace(value=[SimpleNamespace(lamports=10 ** 9) for _ in pubkeys])
+
+    async def transfer_tokens(self, keypair, wallet, amount):
+        self.balances[str(keypair.pubkey())] -= amount
+        self.balances[wallet] += amount
+        self.transfers.append((str(keypair.pubkey()), wallet, amount))
+        return "rebalance-tx"
+
+
+def test_background_upkeep_reconciles_and_rebalances_without_payouts():
+    rich, poor = Keypair(), Keypair()
+    chain = FakeChain({str(rich.pubkey()): 1000, str(poor.pubkey()): 0})
+
+    async def run():
+        pool = TreasuryPool(chain, [rich, poor], refresh_interval=0.01)
+        pool.start()
+        try:
+            for _ in range(200):
+                await asyncio.sleep(0.01)
+                if chain.transfers and chain.reads >= 3:
+                    break
+        finally:
+            await pool.stop()
+        return pool
+
+    pool = asyncio.run(run())
+    assert chain.reads >= 3
+    assert chain.transfers == [(str(rich.pubkey()), str(poor.pubkey()), 500)]
+    assert [s["raw_balance"] for s in pool.info()] == [500, 500]
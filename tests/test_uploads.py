@@ -0,0 +1,104 @@
+import hashlib
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from benchmarks.stubs import StubPinataServer
+from api.routes import upload
+from api.services import get_points_service, get_upload_service
+from api.services.upload_service import CIDIndex, UploadService
+
+WALLET = "9WzDXwBbmkg8ZTbNMqUxvQRAyrZzDsGYdLVL9zYtAWWM"
+
+
+def entry(n):
+    return hashlib.sha256(str(n).encode()).hexdigest(), "Qm" + hashlib.sha256(b"cid%d" % n).hexdigest()[:44]
+
+
+def test_cid_index_survives_restart_evicts_and_compacts(tmp_path):
+    path = str(tmp_path / "cid_index.txt")
+    index = CIDIndex(path, max_entries=3)
+    for n in range(7):
+        index.put(*entry(n))
+    # The seventh put found 6 lines, twice max_entries, and rewrote the file with the live 3
+    with open(path) as f:
+        assert len(f.readlines()) == 3
+    assert index.get(entry(0)[0]) is None
+
+    reloaded = CIDIndex(path, max_entries=3)
+    assert [reloaded.get(entry(n)[0]) for n in (4, 5, 6)] == [entry(n)[1] for n in (4, 5, 6)]
+
+
+def test_cid_index_drops_a_torn_tail(tmp_path):
+    path = str(tmp_path / "cid_index.txt")
+    CIDIndex(path).put(*entry(1))
+    with open(path, "a") as f:
+        f.write(entry(2)[0][:20])
+    index = CIDIndex(path)
+    assert index.get(entry(1)[0]) == entry(1)[1]
+    index.put(*entry(3))
+    assert CIDIndex(path).get(entry(3)[0]) == entry(3)[1]
+
+
+class Points:
+    def add_points(self, wallet, amount):
+        return amount
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    pinata = StubPinataServer().start()
+    monkeypatch.setenv("PINATA_URL", pinata.url)
+    monkeypatch.setenv("PINATA_JWT", "test")
+    monkeypatch.setenv("MAX_UPLOAD_MB", "1")
+    monkeypatch.setenv("UPLOAD_INDEX_PATH", str(tmp_path / "cid_index.txt"))
+    service = UploadService()
+    app = FastAPI()
+    app.include_router(upload.router)
+    app.dependency_overrides[get_points_service] = Points
+    app.dependency_overrides[get_upload_service] = lambda: service
+    with TestClient(app) as test_client:
+        test_client.pinata = pinata
+        yield test_client
+        test_client.portal.call(service.close)
+    pinata.stop()
+
+
+def test_repeat_upload_is_served_from_the_index(client):
+    content = b"hello ipfs" * 1000
+    first = client.post(f"/upload/file?wallet={WALLET}", files={"file": ("a.txt", content)})
+    second = client.post(f"/upload/file?wallet={WALLET}", files={"file": ("b.txt", content)})
+    assert first.status_code == second.status_code == 200
+    assert first.json()["cid"] == second.json()["cid"]
+    assert client.pinata.counts == {"pinFileToIPFS": 1}
+    assert client.get("/upload/stats").json()["hits"] == 1
+
+
+def test_streamed_upload_reaches_pinata_whole_and_size_limit_holds(client):
+    content = bytes(range(256)) * 2048
+    response = client.post(f"/upload/file?wallet={WALLET}", files={"file": ("big.bin", content)})
+    assert response.status_code == 200
+    # A Pinata failure would fall back to the mock CID derived from the hash
+    assert response.json()["cid"] != "Qm" + hashlib.sha256(content).hexdigest()[:44]
+    assert client.pinata.counts == {"pinFileToIPFS": 1}
+    too_big = client.post(f"/upload/file?wallet={WALLET}", files={"file": ("huge.bin", b"x" * (1024 * 1024 + 1))})
+    assert too_big.status_code == 400
+
+
+def multipart(content, boundary="b0undary", close=True):
+    yield f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="f.bin"\r\n\r\n'.encode()
+    for start in range(0, len(content), 65536):
+        yield content[start:start + 65536]
+    if close:
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+
+def test_size_limit_holds_without_a_content_length_and_torn_bodies_are_rejected(client):
+    url = f"/upload/file?wallet={WALLET}"
+    headers = {"Content-Type": "multipart/form-data; boundary=b0undary"}
+    # A generator body goes out chunked, so only the streamed byte count can catch it
+    too_big = client.post(url, content=multipart(b"x" * (1024 * 1024 + 1)), headers=headers)
+    assert too_big.status_code == 400 and too_big.json()["detail"] == "Max 1MB"
+    torn = client.post(url, content=multipart(b"x" * 1000, close=False), headers=headers)
+    assert torn.status_code == 400
+    assert client.post(url, content=b"file", headers={"Content-Type": "text/plain"}).status_code == 400
+    assert client.pinata.counts == {}